@@ -1,15 +1,21 @@
-from flask import Flask, render_template, request, jsonify
-from src.clustering import create_tx_graph
+from flask import Flask, Response, render_template, request, jsonify
+from src import analysis_stages
+from src.analysis_stages import get_cpu_pool
 from src.data_fetching import get_balance_data,flipside_api_results, get_price_data
-from src.data_processing import (get_comprehensive_tx_history, construct_tx_dataset, 
-                                 get_summary_stats, jsonify_safe, merge_datasets)
-from src.entity_labeling import add_entity_labels
-from src.wallet_analysis import WalletAnalysis
-
-from concurrent.futures import ThreadPoolExecutor
+from src.data_processing import get_comprehensive_tx_history, build_balance_index, jsonify_safe
+from src.fund_tracing import trace_funds
+from src.entity_labeling import load_label_maps, get_label_index
+from src.job_registry import PRIORITIES, JobRegistry, QueueFull
+from src.metrics import render_metrics
+from src.profiling import (PROFILE_SORT_KEYS, JobProfile, parse_profile_flag, profile_path, should_profile,
+                           top_functions)
+from src.result_store import get_result_store
+from src.pipeline import Stage, StageError, run_stages
+from src.wallet_graph import get_wallet_graph
 
 import os
 import json
+from functools import partial
 import time
 import pandas as pd
 from dotenv import load_dotenv
@@ -20,57 +26,104 @@ load_dotenv()
 HELIUS_API_KEY = os.getenv('HELIUS_API_KEY')
 
 use_cache = False # For testing
+HELIUS_CONCURRENCY = int(os.getenv('HELIUS_CONCURRENCY', 4))
+MAX_TRACE_HOPS = int(os.getenv('MAX_TRACE_HOPS', 6))
 test_address = 'AGPZnBZUxmhAtcp8XjT4n8bCia9dEYhhm16M2sfFvmTU'
 
 ROOT_DIR = os.getcwd()
 DATA_DIR = os.path.join(ROOT_DIR, 'data', 'processed', 'backend_response.json')
 
-def retry_call(fn, retries=3, delay=2, *args, **kwargs):
-    last_exception = None
-    for attempt in range(retries):
-        try:
-            return fn(*args, **kwargs)
-        except Exception as e:
-            print(f"[Retry {attempt+1}/{retries}] {fn.__name__} failed: {e}")
-            last_exception = e
-            time.sleep(delay)
-    raise last_exception
-
-def run_analysis_logic(address, job_id):
+def build_analysis_stages(address, cpu_pool=None, on_progress=None):
+    """
+    Stage DAG for one wallet.  Helius history, Flipside balances and label loading have no
+    dependencies on each other and start together; prices only wait for the balance mints.
+    With a `cpu_pool`, dataset construction, labeling, clustering and summary stats run in worker
+    processes; those build their own balance index and use their own label index.
+    `on_progress` receives Helius ingest counters while tx_history runs.
+    """
+    def balance_data():
+        return get_balance_data(address, use_cache=use_cache, paginated=True)
+
+    def price_data(balances):
+        token_portfolio = balances['MINT'].unique()
+        start_date = pd.to_datetime(balances['BLOCK_TIMESTAMP'].min()).strftime('%Y-%m-%d %H:%M:%S')
+        return get_price_data(token_portfolio, start_date, use_cache=use_cache)
+
+    if cpu_pool is None:
+        dataset_deps, labeled_deps = ['tx_history', 'balances', 'balance_index', 'prices'], ['dataset', 'labels']
+    else:
+        dataset_deps, labeled_deps = ['tx_history', 'balances', 'prices'], ['dataset']
+
+    stages = [
+        Stage('tx_history', lambda: get_comprehensive_tx_history(address, HELIUS_API_KEY, use_cache=use_cache,
+                                                                 pipelined=True, concurrency=HELIUS_CONCURRENCY,
+                                                                 on_progress=on_progress),
+              retries=2, timeout=900),
+        Stage('balances', balance_data, retries=2, timeout=900),
+        Stage('prices', price_data, deps=['balances'], retries=2, timeout=900),
+        Stage('dataset', partial(analysis_stages.tx_dataset, address), deps=dataset_deps, cpu=True),
+        Stage('labeled', partial(analysis_stages.labeled_dataset, address), deps=labeled_deps, cpu=True),
+        Stage('tx_graph', analysis_stages.tx_graph, deps=['labeled'], cpu=True),
+        Stage('wallet_analysis', partial(analysis_stages.wallet_analysis, address), deps=['labeled'], cpu=True),
+        Stage('wallet_graph', lambda labeled: get_wallet_graph().merge_transactions(address, labeled),
+              deps=['labeled'], retries=1, optional=True),
+    ]
+    if cpu_pool is None:
+        stages += [
+            Stage('labels', load_label_maps, retries=1),
+            Stage('balance_index', lambda balances: build_balance_index(balances), deps=['balances']),
+        ]
+    return stages
+
+def write_timeline(job_id, timeline):
+    timeline_path = os.path.join('jobs', 'processed', f'{job_id}_timeline.json')
+    with open(timeline_path, 'w') as f:
+        json.dump(timeline, f)
+
+# Stages whose output is part of the final result and is streamed to the client as soon as it is ready
+PUBLISHED_STAGES = ('wallet_analysis', 'tx_graph')
+
+def stage_publisher(publish, total_stages):
+    """
+    on_stage_done hook forwarding each finished stage to the job's event stream: its timeline
+    entry (timing, resource usage, row count) and the partial result for PUBLISHED_STAGES.
+    """
+    completed = []
+
+    def on_stage_done(entry, result):
+        completed.append(entry['stage'])
+        event = dict(entry, completed=len(completed), total=total_stages)
+        if entry['status'] == 'done' and entry['stage'] in PUBLISHED_STAGES:
+            event['result'] = jsonify_safe(result)
+        publish('stage', event)
+
+    return on_stage_done
+
+def run_analysis_logic(address, job_id, publish=None, profile=False):
     try:
         print(f'running analysis for {address}')
-        print(f'Getting Parsed History')
-        parsed_transaction_history = retry_call(get_comprehensive_tx_history, 3, 2, address, HELIUS_API_KEY, use_cache=use_cache)
-        print(f'Getting Balance Data')
-        balance_df = retry_call(get_balance_data, 3, 2, address, use_cache=use_cache)
-        token_portfolio = balance_df['MINT'].unique()
-        start_date = pd.to_datetime(balance_df['BLOCK_TIMESTAMP'].min()).strftime('%Y-%m-%d %H:%M:%S')
-        print(f'Getting Price Data')
-        prices_data = retry_call(get_price_data, 3, 2, token_portfolio, start_date, use_cache=use_cache)
-        print(f'Constructing Dataset')
-        tx_level_data = construct_tx_dataset(parsed_transaction_history, prices_data, address, balance_df)
-        print(f'Adding labels')
-        tx_level_data_complete, wallet_stats = add_entity_labels(tx_level_data, address)
-        tx_level_data_complete = merge_datasets(tx_level_data_complete, wallet_stats)
-        print(f'Creating tx graph')
-        tx_graph = create_tx_graph(tx_level_data_complete)
-        print(f'Getting summary stats')
-        wallet_analysis_df = get_summary_stats(tx_level_data_complete, address)
-        wallet_analysis_obj = WalletAnalysis(wallet_analysis_df)
-
-        funding_sources = wallet_analysis_obj.track_funding_sources_and_flow(address).astype(object).where(pd.notnull).to_dict(orient='records')
-        transaction_history = wallet_analysis_obj.transaction_history(address)
-        activity_patterns = wallet_analysis_obj.key_activity_patterns_and_risk_factors(address)
-
-        complete_wallet_analysis = {
-            'funding_sources': funding_sources,
-            'transaction_history': transaction_history,
-            'activity_patterns': activity_patterns
-        }
+        profiler = JobProfile() if profile else None
+        try:
+            cpu_pool = get_cpu_pool()
+            on_progress = (lambda **counts: publish('progress', dict(stage='tx_history', **counts))) if publish else None
+            stages = build_analysis_stages(address, cpu_pool, on_progress)
+            on_stage_done = stage_publisher(publish, len(stages)) if publish else None
+            stage_results, timeline = run_stages(stages, process_pool=cpu_pool, on_stage_done=on_stage_done,
+                                                 profiler=profiler)
+        except StageError as e:
+            write_timeline(job_id, getattr(e, 'timeline', []))
+            raise
+        finally:
+            # Kept for failed runs too, that is often when the profile is wanted
+            if profiler is not None and profiler.save(profile_path(job_id)):
+                print(f'Profile written to {profile_path(job_id)}')
+
+        for entry in timeline:
+            print(f"[{job_id}] {entry['stage']}: {entry['start']:.2f}s -> {entry['end']:.2f}s ({entry['status']})")
 
         results = {
-            'wallet_analysis': complete_wallet_analysis,
-            'tx_graph': tx_graph
+            'wallet_analysis': stage_results['wallet_analysis'],
+            'tx_graph': stage_results['tx_graph']
         }
 
         print(f'Writing results to {job_id}.json')
@@ -78,9 +131,8 @@ def run_analysis_logic(address, job_id):
         json_results = jsonify_safe(results)
 
         # Save result to per-job file
-        job_path = os.path.join('jobs', 'processed', f'{job_id}.json')
-        with open(job_path, 'w') as f:
-            json.dump(json_results, f)
+        get_result_store().put(job_id, json_results)
+        write_timeline(job_id, timeline)
 
     except Exception as e:
         print(f'[Threaded Analysis Error]: {e}')
@@ -88,11 +140,62 @@ def run_analysis_logic(address, job_id):
         error_path = os.path.join('jobs', 'processed', f'{job_id}_error.txt')
         with open(error_path, 'w') as f:
             f.write(str(e))
+        raise
+
+def run_trace_logic(address, job_id, max_hops, direction):
+    try:
+        print(f'tracing funds for {address} ({direction}, {max_hops} hops)')
+        trace = trace_funds(address, HELIUS_API_KEY, max_hops=max_hops, direction=direction,
+                            concurrency=HELIUS_CONCURRENCY)
+
+        get_result_store().put(job_id, jsonify_safe(trace))
+
+    except Exception as e:
+        print(f'[Threaded Trace Error]: {e}')
+        error_path = os.path.join('jobs', 'processed', f'{job_id}_error.txt')
+        with open(error_path, 'w') as f:
+            f.write(str(e))
+        raise
 
 def create_app():
     app = Flask(__name__)
 
-    executor = ThreadPoolExecutor(max_workers=4) 
+    registry = JobRegistry(max_workers=4)
+
+    # Build the shared label index once at startup instead of per job
+    try:
+        get_label_index()
+    except Exception as e:
+        print(f'Label index not loaded at startup, will retry on first job: {e}')
+
+    results = get_result_store()
+
+    def result_response(stored):
+        body, etag = stored
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, status=200, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def submit_job(job_id, priority, message, fn, *args):
+        if priority not in PRIORITIES:
+            return jsonify({"error": f"priority must be one of {sorted(PRIORITIES)}"}), 400
+        try:
+            job, created = registry.submit(job_id, fn, *args, priority=priority)
+        except QueueFull as e:
+            response = jsonify({"error": str(e), "retry_after": e.retry_after})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+
+        return jsonify({
+            "status": "processing",
+            "state": job.state,
+            "job_id": job_id,
+            "message": message if created else f"Already {job.state}: {job_id}"
+        }), 202
 
     @app.route('/')
     def home():
@@ -107,28 +210,29 @@ def create_app():
             return jsonify({"error": "Must Pass Address"}), 400
 
         job_id = address
-        result_path = os.path.join('jobs', 'processed', f'{job_id}.json')
+        priority = data.get('priority', 'interactive')
+        try:
+            profile = parse_profile_flag(data.get('profile', False))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         error_path = os.path.join('jobs', 'processed', f'{job_id}_error.txt')
 
-        # If cached result exists, return it immediately
-        if os.path.exists(result_path):
-            with open(result_path) as f:
-                result = json.load(f)
-            return jsonify(result), 200
+        job = registry.get(job_id)
+        if job is None or job.state in ('done', 'failed'):
+            # If cached result exists, return it immediately
+            stored = results.get(job_id)
+            if stored is not None:
+                return result_response(stored)
 
-        # If a previous error occurred, return it
-        if os.path.exists(error_path):
-            with open(error_path) as f:
-                error_msg = f.read()
-            return jsonify({"error": error_msg}), 500
+            # If a previous error occurred, return it
+            if os.path.exists(error_path):
+                with open(error_path) as f:
+                    error_msg = f.read()
+                return jsonify({"error": error_msg}), 500
 
-        # If not cached, start new analysis in background
-        executor.submit(run_analysis_logic, address, job_id)
-        return jsonify({
-            "status": "processing",
-            "job_id": job_id,
-            "message": f"Started analysis for {address}"
-        }), 202
+        # If not cached, start new analysis in background (or join the one already running)
+        return submit_job(job_id, priority, f"Started analysis for {address}", run_analysis_logic, address, job_id,
+                          partial(registry.publish, job_id), should_profile(profile))
 
     @app.route('/api/get_results', methods=['GET'])
     def get_results():
@@ -136,13 +240,19 @@ def create_app():
         if not job_id:
             return jsonify({"error": "Missing job_id"}), 400
 
-        result_path = os.path.join('jobs', 'processed', f'{job_id}.json')
         error_path = os.path.join('jobs', 'processed', f'{job_id}_error.txt')
 
-        if os.path.exists(result_path):
-            with open(result_path) as f:
-                result = json.load(f)
-            return jsonify(result)
+        job = registry.get(job_id)
+        if job is not None:
+            # Answered from the registry and the result store's memory tier
+            if job.state in ('queued', 'running'):
+                return jsonify({"status": "processing", "state": job.state}), 202
+            if job.state == 'failed':
+                return jsonify({"error": job.error}), 500
+
+        stored = results.get(job_id)
+        if stored is not None:
+            return result_response(stored)
 
         elif os.path.exists(error_path):
             with open(error_path) as f:
@@ -151,10 +261,123 @@ def create_app():
 
         else:
             return jsonify({"status": "processing"}), 202
-    
+
+    @app.route('/api/profile', methods=['GET'])
+    def profile():
+        """
+        Hot functions of a profiled analysis job (POST /api/analyze_address with "profile": true,
+        or sampled through PROFILE_SAMPLE_RATE).
+        """
+        job_id = request.args.get('job_id')
+        if not job_id:
+            return jsonify({"error": "Missing job_id"}), 400
+
+        sort = request.args.get('sort', 'tottime')
+        if sort not in PROFILE_SORT_KEYS:
+            return jsonify({"error": f"sort must be one of {list(PROFILE_SORT_KEYS)}"}), 400
+        try:
+            top = int(request.args.get('top', 25))
+        except ValueError:
+            top = 0
+        if top < 1:
+            return jsonify({"error": "top must be a positive integer"}), 400
+
+        path = profile_path(job_id)
+        if not os.path.exists(path):
+            job = registry.get(job_id)
+            if job is not None and job.state in ('queued', 'running'):
+                return jsonify({"status": "processing", "state": job.state}), 202
+            return jsonify({"error": f"No profile for {job_id}"}), 404
+
+        summary = top_functions(path, top=top, sort=sort)
+        return jsonify(dict(summary, job_id=job_id)), 200
+
+    @app.route('/api/stream', methods=['GET'])
+    def stream():
+        """
+        Server-sent events for a job: 'progress' and 'stage' events as the analysis runs (stage
+        events for wallet_analysis and tx_graph carry their result), then 'done' or 'failed'.
+        Reconnecting clients resume after Last-Event-ID.  Stage results are only kept while the
+        job runs; after 'done' the full result is at /api/get_results.
+        """
+        job_id = request.args.get('job_id')
+        if not job_id:
+            return jsonify({"error": "Missing job_id"}), 400
+
+        job = registry.get(job_id)
+        if job is None:
+            if results.get(job_id) is None:
+                return jsonify({"error": f"Unknown job {job_id}"}), 404
+            events = iter([f'id: 0\nevent: done\ndata: {json.dumps({"job_id": job_id, "error": None})}\n\n'])
+            return Response(events, mimetype='text/event-stream')
+
+        try:
+            start = max(int(request.headers.get('Last-Event-ID', -1)) + 1, 0)
+        except ValueError:
+            # Malformed header: replay the stream from the start
+            start = 0
+
+        def event_stream():
+            index = start
+            while True:
+                events, finished = registry.wait_events(job, index)
+                for event, data in events:
+                    yield f'id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+                    index += 1
+                if finished and not events:
+                    return
+                if not events:
+                    yield ': keep-alive\n\n'
+
+        return Response(event_stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/api/trace_funds', methods=['POST'])
+    def trace_funds_route():
+        data = request.get_json()
+        address = data.get('address')
+        if not address:
+            return jsonify({"error": "Must Pass Address"}), 400
+
+        try:
+            max_hops = int(data.get('max_hops', 3))
+        except (TypeError, ValueError):
+            return jsonify({"error": "max_hops must be an integer"}), 400
+        if max_hops < 1:
+            return jsonify({"error": "max_hops must be at least 1"}), 400
+        max_hops = min(max_hops, MAX_TRACE_HOPS)
+        direction = data.get('direction', 'both')
+        if direction not in ('upstream', 'downstream', 'both'):
+            return jsonify({"error": "direction must be upstream, downstream or both"}), 400
+
+        job_id = f'{address}_trace_{direction}_{max_hops}'
+        stored = results.get(job_id)
+        if stored is not None:
+            return result_response(stored)
+
+        return submit_job(job_id, data.get('priority', 'interactive'), f"Started fund trace for {address}",
+                          run_trace_logic, address, job_id, max_hops, direction)
+
+    @app.route('/api/related_wallets', methods=['GET'])
+    def related_wallets():
+        address = request.args.get('address')
+        if not address:
+            return jsonify({"error": "Missing address"}), 400
+
+        wallet_graph = get_wallet_graph()
+        return jsonify({
+            "address": address,
+            "related_analyzed_wallets": wallet_graph.cluster_peers(address),
+            "neighbors": [{"wallet": wallet, "tx_count": count} for wallet, count in wallet_graph.neighbors(address)]
+        }), 200
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), status=200, mimetype='text/plain; version=0.0.4')
+
     @app.route('/api/clear_cache', methods=['GET'])
     def clear_cache():
-        cleared = []
+        cleared = results.clear()
         errors = []
         cache_path = os.path.join('jobs', 'processed')
 
@@ -168,6 +391,8 @@ def create_app():
                 print(f"Error deleting file {file_path}: {e}")
                 errors.append({"file": filename, "error": str(e)})
 
+        registry.forget_finished()
+
         return jsonify({
             "status": "cache_cleared",
             "files_deleted": cleared,
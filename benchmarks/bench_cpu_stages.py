@@ -0,0 +1,115 @@
+"""
+Benchmark for CPU stages on the process pool: `jobs` concurrent analyses of the same synthetic
+wallet run through run_stages with every stage on threads, then with the CPU stages
+(dataset, labeled, tx_graph, wallet_analysis) on a process pool of `workers` processes.  Both
+modes must produce the same results.  Also compares moving the labeled frame across the process
+boundary pickled as a DataFrame and in src.columnar form.
+
+Label maps are handed to the labeled stage in both modes, so no label files are needed and the
+outputs match.  Process-pool gains need more than one core; cpu_count is printed with the table.
+
+Run from the project root:
+    python -m benchmarks.bench_cpu_stages
+    python -m benchmarks.bench_cpu_stages --transactions 50000 --jobs 8 --workers auto
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from benchmarks.synthetic import generate_workload
+from src import analysis_stages
+from src.analysis_stages import parse_cpu_stage_workers
+from src.columnar import decode_frame, encode_frame
+from src.pipeline import Stage, run_stages
+
+
+def analysis_stage_dag(workload):
+    wallet = workload['wallet']
+    return [
+        Stage('tx_history', lambda: workload['transactions']),
+        Stage('balances', lambda: workload['balances']),
+        Stage('prices', lambda: workload['prices']),
+        Stage('labels', lambda: workload['label_maps']),
+        Stage('dataset', partial(analysis_stages.tx_dataset, wallet), deps=['tx_history', 'balances', 'prices'],
+              cpu=True),
+        Stage('labeled', partial(analysis_stages.labeled_dataset, wallet), deps=['dataset', 'labels'], cpu=True),
+        Stage('tx_graph', analysis_stages.tx_graph, deps=['labeled'], cpu=True),
+        Stage('wallet_analysis', partial(analysis_stages.wallet_analysis, wallet), deps=['labeled'], cpu=True),
+    ]
+
+
+def silence_worker():
+    sys.stdout = open(os.devnull, 'w')
+
+
+def run_jobs(workload, jobs, process_pool=None):
+    def job():
+        results, _ = run_stages(analysis_stage_dag(workload), process_pool=process_pool)
+        return results['tx_graph'], results['wallet_analysis']
+
+    # Stage logging is not what is being timed
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(jobs) as pool:
+        start = time.perf_counter()
+        outputs = list(pool.map(lambda _: job(), range(jobs)))
+        return time.perf_counter() - start, outputs
+
+
+def transfer_costs(frame, repeat=3):
+    """
+    (bytes, seconds for dumps + loads) of the frame pickled as is and in columnar form.
+    """
+    costs = {}
+    for name, encode, decode in [('pickle', lambda: frame, lambda value: value),
+                                 ('columnar', lambda: encode_frame(frame), decode_frame)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            payload = pickle.dumps(encode(), protocol=pickle.HIGHEST_PROTOCOL)
+            decode(pickle.loads(payload))
+        costs[name] = len(payload), (time.perf_counter() - start) / repeat
+    return costs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--jobs', type=int, default=4, help='concurrent analyses, like registry job workers')
+    parser.add_argument('--workers', default='auto', help="process pool size, or 'auto' for one per core")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    workers = parse_cpu_stage_workers(args.workers) or 1
+
+    workload = generate_workload(args.transactions, seed=args.seed)
+    threads_s, expected = run_jobs(workload, args.jobs)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=silence_worker) as pool:
+        # Spawning and importing in the workers is a one-off cost, keep it out of the timing
+        list(pool.map(abs, range(workers)))
+        processes_s, outputs = run_jobs(workload, args.jobs, pool)
+    assert outputs == expected
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        labeled = analysis_stages.labeled_dataset(
+            workload['wallet'], analysis_stages.tx_dataset(workload['wallet'], workload['transactions'],
+                                                           workload['balances'], workload['prices']),
+            workload['label_maps'])
+    costs = transfer_costs(labeled)
+
+    print(f"{args.transactions} transactions, {args.jobs} concurrent jobs, {workers} workers, "
+          f"cpu_count {os.cpu_count()}")
+    print(f"{'threads_s':>10} {'processes_s':>12} {'speedup':>8}")
+    print(f'{threads_s:10.2f} {processes_s:12.2f} {threads_s / processes_s:7.2f}x')
+    print(f"labeled frame: {len(labeled)} rows")
+    print(f"{'form':>9} {'MiB':>7} {'move_s':>7}")
+    for name, (size, seconds) in costs.items():
+        print(f'{name:>9} {size / 2**20:7.1f} {seconds:7.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark for entity labeling: per-row lambda/apply versus label-once-per-distinct-address.
+
+Run from the project root:
+    python -m benchmarks.bench_entity_labels
+    python -m benchmarks.bench_entity_labels --sizes 10000 1000000 --distinct 5000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_address_frame, synthetic_address_labels
+from src.entity_labeling import classify_category, classify_labels, label_addresses
+
+def legacy_label(df, label_map):
+    out = {}
+    for column in ['sender', 'receiver', 'counterparty']:
+        names = df[column].astype(str).str.lower().map(lambda addr: label_map.get(addr, 'Unknown Address'))
+        out[f'{column}_name'] = names
+        out[f'{column}_category'] = names.apply(classify_category.__wrapped__)
+    return out
+
+
+def unique_label(df, label_map):
+    out = {}
+    for column in ['sender', 'receiver', 'counterparty']:
+        names = label_addresses(df[column], label_map, 'Unknown Address')
+        out[f'{column}_name'] = names
+        out[f'{column}_category'] = classify_labels(names)
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--distinct', type=int, default=20000, help='distinct addresses per frame')
+    args = parser.parse_args()
+
+    addresses, label_map = synthetic_address_labels(args.distinct)
+    print(f"{'rows':>9} {'unique_s':>9} {'legacy_s':>9} {'speedup':>8}")
+    for n in args.sizes:
+        df = synthetic_address_frame(n, addresses)
+        classify_category.cache_clear()
+        unique, new = timed(unique_label, df, label_map)
+        legacy, old = timed(legacy_label, df, label_map)
+        for key in old:
+            assert (old[key].to_numpy() == new[key].to_numpy()).all(), key
+        print(f'{n:>9} {unique:9.3f} {legacy:9.3f} {legacy / unique:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
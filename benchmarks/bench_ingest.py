@@ -0,0 +1,107 @@
+"""
+Benchmark for Helius ingest against a local stand-in with fixed per-request latency: paging every
+signature first and then hydrating them (get_all_signatures + v0_transactions_all) versus
+pipelined_transactions, which hydrates each page while the next one is fetched.  Both must return
+the same transactions.
+
+Run from the project root:
+    python -m benchmarks.bench_ingest
+    python -m benchmarks.bench_ingest --signatures 2000 --latency 0.3 --concurrency 4
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import WALLET, synthetic_transactions
+from src import data_fetching, http_client
+
+
+def stand_in(txs, latency):
+    """
+    HTTP server answering getSignaturesForAddress (newest first, `before`/`until`/`limit`) and
+    v0/transactions for `txs`, sleeping `latency` seconds per request.
+    """
+    signatures = [tx['signature'] for tx in txs]
+    by_signature = {tx['signature']: tx for tx in txs}
+    index = {signature: i for i, signature in enumerate(signatures)}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(latency)
+            if 'method' in body:
+                options = body['params'][1]
+                start = index[options['before']] + 1 if 'before' in options else 0
+                page = signatures[start:start + options['limit']]
+                if options.get('until') in page:
+                    page = page[:page.index(options['until'])]
+                out = {'jsonrpc': '2.0', 'id': '1', 'result': [
+                    {'signature': s, 'slot': by_signature[s]['slot'], 'blockTime': by_signature[s]['timestamp']}
+                    for s in page]}
+            else:
+                out = [by_signature[s] for s in body['transactions']]
+            payload = json.dumps(out).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sequential_ingest(wallet, max_pages):
+    signatures = data_fetching.get_all_signatures(wallet, 'bench', max_pages=max_pages)
+    return data_fetching.v0_transactions_all([s['signature'] for s in signatures], 'bench')
+
+
+def pipelined_ingest(wallet, max_pages, concurrency):
+    return data_fetching.pipelined_transactions(wallet, 'bench', concurrency=concurrency, max_pages=max_pages)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--signatures', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds the stand-in takes per request')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate-limit', type=float, default=100, help='Helius requests per second allowed')
+    args = parser.parse_args()
+
+    txs = synthetic_transactions(args.signatures)
+    server = stand_in(txs, args.latency)
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    data_fetching.HELIUS_RPC_URL = data_fetching.HELIUS_API_URL = url
+    http_client.configure_limit('helius', args.rate_limit)
+    max_pages = args.signatures // 100 + 1
+
+    try:
+        sequential, old = timed(sequential_ingest, WALLET, max_pages)
+        pipelined, new = timed(pipelined_ingest, WALLET, max_pages, args.concurrency)
+    finally:
+        server.shutdown()
+    assert old == new and len(new) == args.signatures
+
+    pages = -(-args.signatures // 100)
+    print(f'{args.signatures} signatures, {pages} pages, {args.latency}s latency per request')
+    print(f"{'sequential_s':>13} {'pipelined_s':>12} {'paging_only_s':>14}")
+    print(f'{sequential:13.2f} {pipelined:12.2f} {pages * args.latency:14.2f}')
+
+
+if __name__ == '__main__':
+    main()
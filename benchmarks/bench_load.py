@@ -0,0 +1,99 @@
+"""
+Load test for a running app: submit analyses for many wallets at once and measure throughput,
+queueing (429s) and end-to-end latency until each result is ready.
+
+Run offline by recording cassettes once (UPSTREAM_TRANSPORT=record) and starting the app with
+UPSTREAM_TRANSPORT=replay, or against src.cassette_server.  From the project root:
+    python -m benchmarks.bench_load --addresses wallets.txt --concurrency 200 --output load.json
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+def run_job(base_url, address, poll_interval, timeout, priority):
+    """
+    Submit one analysis and poll until it finishes.  Returns the job's measurements.
+    """
+    session = requests.Session()
+    start = time.perf_counter()
+    rejected = 0
+    deadline = start + timeout
+
+    while True:
+        response = session.post(f'{base_url}/api/analyze_address', json={'address': address, 'priority': priority})
+        if response.status_code != 429:
+            break
+        rejected += 1
+        if time.perf_counter() > deadline:
+            return {'address': address, 'status': 'rejected', 'rejected': rejected,
+                    'seconds': time.perf_counter() - start}
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+    accepted = time.perf_counter()
+
+    status = response.status_code
+    while status == 202 and time.perf_counter() < deadline:
+        time.sleep(poll_interval)
+        status = session.get(f'{base_url}/api/get_results', params={'job_id': address}).status_code
+
+    finished = time.perf_counter()
+    outcome = {200: 'done', 202: 'timeout'}.get(status, 'failed')
+    return {'address': address, 'status': outcome, 'rejected': rejected, 'queued_seconds': accepted - start,
+            'seconds': finished - start}
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    return {f'p{p}': float(np.percentile(values, p)) for p in (50, 90, 95, 99)} | {'max': float(max(values))}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:5025')
+    parser.add_argument('--addresses', required=True, help='file with one wallet address per line')
+    parser.add_argument('--concurrency', type=int, default=100, help='jobs submitted at once')
+    parser.add_argument('--priority', default='interactive')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=1800, help='seconds per job before giving up')
+    parser.add_argument('--keep-cache', action='store_true', help='do not clear cached results first')
+    parser.add_argument('--output', help='write the per-job results and summary as JSON to this path')
+    args = parser.parse_args()
+
+    with open(args.addresses) as f:
+        addresses = [line.strip() for line in f if line.strip()]
+    if not args.keep_cache:
+        requests.get(f'{args.url}/api/clear_cache')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        jobs = list(pool.map(lambda address: run_job(args.url, address, args.poll_interval, args.timeout,
+                                                     args.priority), addresses))
+    wall = time.perf_counter() - start
+
+    done = [job for job in jobs if job['status'] == 'done']
+    summary = {
+        'jobs': len(jobs),
+        'done': len(done),
+        'failed': sum(job['status'] == 'failed' for job in jobs),
+        'timed_out': sum(job['status'] in ('timeout', 'rejected') for job in jobs),
+        'rejections_429': sum(job['rejected'] for job in jobs),
+        'wall_seconds': wall,
+        'jobs_per_minute': 60 * len(done) / wall if wall else None,
+        'latency_seconds': percentiles([job['seconds'] for job in done]),
+        'admission_seconds': percentiles([job['queued_seconds'] for job in done]),
+    }
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'summary': summary, 'jobs': jobs, 'concurrency': args.concurrency}, f, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Offline benchmark of the analysis pipeline on synthetic Helius/Flipside workloads.
+
+Times every stage (dataset build, labeling, merge, clustering, stats, JSON) and, in a second
+pass, records each stage's peak traced memory.  No network or label files are needed.
+
+Run from the project root:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 1000000 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_workload
+from src.analysis_stages import wallet_analysis
+from src.clustering import create_tx_graph
+from src.data_processing import construct_tx_dataset, jsonify_safe, merge_datasets
+from src.entity_labeling import add_entity_labels, classify_category
+
+STAGES = ['dataset', 'labeling', 'merge', 'clustering', 'stats', 'json']
+
+
+def run_stages(workload, measure):
+    """
+    Runs the pipeline once.  `measure(stage, fn, *args)` calls fn and records what it wants.
+    """
+    wallet = workload['wallet']
+    dataset = measure('dataset', construct_tx_dataset, workload['transactions'], workload['prices'], wallet,
+                      workload['balances'])
+    labeled, wallet_stats = measure('labeling', add_entity_labels, dataset, wallet, workload['label_maps'])
+    merged = measure('merge', merge_datasets, labeled, wallet_stats)
+    cluster_data = measure('clustering', create_tx_graph, merged)
+    analysis = measure('stats', wallet_analysis, wallet, merged)
+    result = {'cluster_data': cluster_data, **analysis}
+    measure('json', lambda: json.dumps(jsonify_safe(result)))
+    return len(dataset)
+
+
+def timed_run(workload):
+    seconds = {}
+
+    def measure(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds[stage] = time.perf_counter() - start
+        return result
+
+    rows = run_stages(workload, measure)
+    return rows, seconds
+
+
+def memory_run(workload):
+    peaks = {}
+
+    def measure(stage, fn, *args):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        peaks[stage] = tracemalloc.get_traced_memory()[1] - before
+        return result
+
+    tracemalloc.start()
+    try:
+        run_stages(workload, measure)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def quiet(fn, *args):
+    # Stages still print short progress lines (frames only with DEBUG_LOGGING); keep them out of the table
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'txs':>8} {'rows':>8} " + ' '.join(f'{stage:>10}' for stage in STAGES) + f" {'total_s':>8}")
+    for n in args.sizes:
+        start = time.perf_counter()
+        workload = generate_workload(n, seed=args.seed)
+        generate_seconds = time.perf_counter() - start
+
+        classify_category.cache_clear()
+        rows, seconds = quiet(timed_run, workload)
+        peaks = None if args.no_memory else quiet(memory_run, workload)
+
+        print(f'{n:>8} {rows:>8} ' + ' '.join(f'{seconds[stage]:10.3f}' for stage in STAGES)
+              + f' {sum(seconds.values()):8.3f}')
+        if peaks:
+            print(f"{'peak MiB':>17} " + ' '.join(f'{peaks[stage] / 2**20:10.1f}' for stage in STAGES))
+
+        results.append({
+            'transactions': n,
+            'rows': rows,
+            'generate_seconds': generate_seconds,
+            'seconds': seconds,
+            'peak_bytes': peaks,
+        })
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'seed': args.seed, 'results': results}, f, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for transaction parsing: a dict per transfer row (base.copy() + update()) versus slotted
+TransferRecords feeding column buffers that keep transaction fields once per transaction.
+
+Run from the project root:
+    python -m benchmarks.bench_transfer_records
+    python -m benchmarks.bench_transfer_records --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_workload
+from src.data_processing import (TX_COLUMNS, add_balance_data, build_balance_index, build_tx_frame,
+                                 get_instruction_data, summarize_transaction)
+from src.metadata import LAMPORT_SCALE
+
+
+def dict_rows_build(txs, wallet, balance_index):
+    # build_tx_frame as it was before TransferRecords: one dict per row, appended column by column
+    columns = {col: [] for col in TX_COLUMNS + ['tx_fee', 'program_id']}
+    symbols = []
+    has_symbol = False
+
+    for tx in txs:
+        tx_summary = summarize_transaction(tx, wallet)
+        if not tx_summary:
+            continue
+
+        instructions_data = get_instruction_data(tx, wallet)
+        tx_fee = tx.get('fee') / LAMPORT_SCALE
+        tx_status = "failed" if tx.get("transactionError") else "success"
+
+        for row in tx_summary:
+            for col in TX_COLUMNS:
+                columns[col].append(row[col])
+            columns['tx_status'][-1] = tx_status
+            columns['block_number'][-1] = tx.get('slot')
+            columns['tx_fee'].append(tx_fee)
+            columns['program_id'].append(instructions_data.get('programId'))
+            symbols.append(row.get('symbol', np.nan))
+            has_symbol = has_symbol or 'symbol' in row
+
+    token_tx_df = pd.DataFrame(columns)
+    if has_symbol:
+        token_tx_df['symbol'] = symbols
+    combined_df = add_balance_data(token_tx_df, balance_index)
+    if has_symbol:
+        combined_df['symbol'] = combined_df.pop('symbol')
+    return combined_df
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'txs':>8} {'records_s':>10} {'dicts_s':>8} {'records_MiB':>12} {'dicts_MiB':>10}")
+    for n in args.sizes:
+        workload = generate_workload(n)
+        balance_index = build_balance_index(workload['balances'])
+        txs, wallet = workload['transactions'], workload['wallet']
+
+        new_s, new_peak, new = measure(build_tx_frame, txs, wallet, balance_index)
+        old_s, old_peak, old = measure(dict_rows_build, txs, wallet, balance_index)
+        pd.testing.assert_frame_equal(old, new)
+        print(f'{n:>8} {new_s:10.3f} {old_s:8.3f} {new_peak / 2**20:12.1f} {old_peak / 2**20:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
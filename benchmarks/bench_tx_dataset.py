@@ -0,0 +1,52 @@
+"""
+Scaling benchmark for the transaction dataset builder.
+
+Run from the project root:
+    python -m benchmarks.bench_tx_dataset
+    python -m benchmarks.bench_tx_dataset --sizes 1000 10000 100000 --legacy-max 5000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import WALLET, synthetic_balances, synthetic_transactions
+from src.data_processing import build_balance_index, build_tx_frame, create_row
+
+
+def legacy_build(txs, wallet, balance_df):
+    frame = pd.DataFrame()
+    for tx in txs:
+        frame = pd.concat([frame, create_row(tx, wallet, balance_df)])
+    return frame
+
+
+def columnar_build(txs, wallet, balance_df):
+    return build_tx_frame(txs, wallet, build_balance_index(balance_df))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help='largest size to also time with the per-transaction concat builder')
+    args = parser.parse_args()
+
+    print(f"{'txs':>8} {'columnar_s':>11} {'us/tx':>8} {'legacy_s':>10}")
+    for n in args.sizes:
+        txs = synthetic_transactions(n)
+        balance_df = synthetic_balances(txs)
+        columnar = timed(columnar_build, txs, WALLET, balance_df)
+        legacy = timed(legacy_build, txs, WALLET, balance_df) if n <= args.legacy_max else None
+        legacy_str = f'{legacy:10.2f}' if legacy is not None else f"{'-':>10}"
+        print(f'{n:>8} {columnar:11.3f} {columnar / n * 1e6:8.1f} {legacy_str}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for v0/transactions ingest: json.loads of whole batch responses collected into one list
+(every field kept) versus streaming each response through src.tx_stream, keeping only the fields
+the analysis reads and handing them to build_tx_frame one by one.  Both frames must match.
+
+Synthetic transactions are padded with what real Helius payloads carry but the pipeline never
+reads (innerInstructions, tokenBalanceChanges, descriptions, instruction data, extra accounts).
+
+Run from the project root:
+    python -m benchmarks.bench_v0_ingest
+    python -m benchmarks.bench_v0_ingest --sizes 10000 100000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_workload, pad_transaction
+from src.data_fetching import V0_BATCH_SIZE
+from src.data_processing import build_balance_index, build_tx_frame
+from src.tx_stream import STREAM_CHUNK_SIZE, stream_transactions
+
+
+def response_bodies(txs):
+    return [json.dumps(txs[i:i + V0_BATCH_SIZE]).encode('utf-8') for i in range(0, len(txs), V0_BATCH_SIZE)]
+
+
+def chunks(body):
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[i:i + STREAM_CHUNK_SIZE]
+
+
+def full_ingest(bodies, wallet, balance_index):
+    txs = []
+    for body in bodies:
+        txs.extend(json.loads(body))
+    return build_tx_frame(txs, wallet, balance_index)
+
+
+def streamed_ingest(bodies, wallet, balance_index):
+    # Trimmed transactions go straight into the builder, as TxStore.address_history feeds them
+    txs = (tx for body in bodies for tx in stream_transactions(chunks(body)))
+    return build_tx_frame(txs, wallet, balance_index)
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'txs':>8} {'body_MiB':>9} {'stream_s':>9} {'full_s':>7} {'stream_MiB':>11} {'full_MiB':>9}")
+    for n in args.sizes:
+        workload = generate_workload(n, seed=args.seed)
+        rng = random.Random(args.seed)
+        bodies = response_bodies([pad_transaction(tx, rng) for tx in workload['transactions']])
+        del workload['transactions']
+        balance_index = build_balance_index(workload['balances'])
+        wallet = workload['wallet']
+
+        new_s, new_peak, new = measure(streamed_ingest, bodies, wallet, balance_index)
+        old_s, old_peak, old = measure(full_ingest, bodies, wallet, balance_index)
+        pd.testing.assert_frame_equal(old, new)
+        body_mib = sum(map(len, bodies)) / 2**20
+        print(f'{n:>8} {body_mib:9.1f} {new_s:9.3f} {old_s:7.3f} {new_peak / 2**20:11.1f} {old_peak / 2**20:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Synthetic Helius / Flipside workload for offline benchmarks.
+
+generate_workload(n) returns parsed Helius transactions for one wallet (native and token
+transfers, swaps, compressed NFT mints, accountData-only transactions, some failed), the
+matching Flipside balance rows, a daily price table for every mint and label maps shaped like
+load_label_maps().  Everything is deterministic for a given seed.
+"""
+import random
+
+import numpy as np
+import pandas as pd
+
+from src.metadata import LAMPORT_SCALE, NATIVE_SOL
+
+WALLET = 'BenchWa11et1111111111111111111111111111111'
+START_TS = 1701388800  # 2023-12-01
+SPAN_SECONDS = 365 * 86400
+
+# mint: (symbol, name, starting price)
+TOKENS = {
+    'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': ('USDC', 'USD Coin', 1.0),
+    'JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN': ('JUP', 'Jupiter', 0.6),
+    'bSo13r4TkiE4KumL71LsHTPpL2euBYLFx6h9HP3piy1': ('BSOL', 'BlazeStake Staked SOL', 70.0),
+    'KMNo3nJsBXfcpJTVhZcXLW7RmTwTt4GVFE7suUBo9sS': ('KMNO', 'Kamino', 0.05),
+    'WENWENvqqNya429ubCdR81ZmD69brwQaaBYY6p3LCpk': ('$WEN', 'Wen', 0.0001),
+    'DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263': ('BONK', 'Bonk', 0.00002),
+}
+PROGRAMS = {
+    '11111111111111111111111111111111': 'System Program',
+    'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA': 'Token Program',
+    'JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4': 'Jupiter Aggregator v6',
+    'KLend2g3cP87fffoy8q1mQqGKjrxjC8boSyAYavgmjD': 'Kamino Lend',
+    'BGUMAp9Gq7iTEuizy4pqaxsTyUCBK68MDfK752saRPUY': 'Bubblegum',
+}
+LABEL_NAMES = ['Raydium Authority', 'Magic Eden v2', 'Coinbase Hot Wallet', 'Kamino Lend Vault', 'Meme Coin Deployer',
+               'Allbridge Core', 'Pengu Airdrop', 'Treasury']
+NFT_TREE_DELEGATE = 'TreeDe1egate111111111111111111111111111111'
+
+
+def synthetic_address(prefix, i):
+    return f'{prefix}{i:0{43 - len(prefix)}d}'
+
+
+def account_entry(account, native_change=0, token_changes=None):
+    return {'account': account, 'nativeBalanceChange': native_change, 'tokenBalanceChanges': token_changes or []}
+
+
+def synthetic_transactions(n, wallet=WALLET, seed=0):
+    """
+    `n` parsed transactions, newest first like getSignaturesForAddress + v0/transactions.
+    """
+    rng = random.Random(seed)
+    counterparties = [synthetic_address('Cp', i) for i in range(max(n // 20, 50))]
+    # Heavy-tailed: a few counterparties see most of the activity
+    weights = [1 / (i + 1) for i in range(len(counterparties))]
+    picks = rng.choices(counterparties, weights=weights, k=n)
+    mints = list(TOKENS)
+    timestamps = sorted((START_TS + rng.randrange(SPAN_SECONDS) for _ in range(n)), reverse=True)
+
+    txs = []
+    for i in range(n):
+        other = picks[i]
+        sent = rng.random() < 0.5
+        sender, receiver = (wallet, other) if sent else (other, wallet)
+        tx = {
+            'description': '',
+            'type': 'TRANSFER',
+            'source': 'SYSTEM_PROGRAM',
+            'fee': 5000,
+            'feePayer': wallet,
+            'signature': f'{i:064d}{seed:024d}',
+            'slot': 240000000 + n - i,
+            'timestamp': timestamps[i],
+            'tokenTransfers': [],
+            'nativeTransfers': [],
+            'accountData': [],
+            'transactionError': {'InstructionError': [0, 'Custom']} if rng.random() < 0.02 else None,
+            'instructions': [],
+            'events': {},
+        }
+        kind = rng.random()
+        if kind < 0.40:
+            lamports = rng.randint(10**5, 10**10)
+            tx['nativeTransfers'].append({'fromUserAccount': sender, 'toUserAccount': receiver, 'amount': lamports})
+            tx['accountData'] = [account_entry(sender, -lamports - 5000), account_entry(receiver, lamports)]
+            program_id = '11111111111111111111111111111111'
+        elif kind < 0.75:
+            mint = rng.choice(mints)
+            amount = round(rng.random() * 1000, 6)
+            tx['source'] = 'SOLANA_PROGRAM_LIBRARY'
+            tx['tokenTransfers'].append({'fromUserAccount': sender, 'toUserAccount': receiver, 'fromTokenAccount': '',
+                                         'toTokenAccount': '', 'tokenAmount': amount, 'mint': mint})
+            tx['accountData'] = [account_entry(wallet, -5000, [{'userAccount': wallet, 'mint': mint,
+                                                                'rawTokenAmount': {'tokenAmount': str(int(amount)),
+                                                                                   'decimals': 0}}])]
+            program_id = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+        elif kind < 0.85:
+            mint_out, mint_in = rng.sample(mints, 2)
+            tx['type'], tx['source'] = 'SWAP', 'JUPITER'
+            tx['tokenTransfers'] = [
+                {'fromUserAccount': wallet, 'toUserAccount': other, 'tokenAmount': round(rng.random() * 100, 6),
+                 'mint': mint_out},
+                {'fromUserAccount': other, 'toUserAccount': wallet, 'tokenAmount': round(rng.random() * 100, 6),
+                 'mint': mint_in},
+            ]
+            tx['accountData'] = [account_entry(wallet, -5000)]
+            program_id = 'JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4'
+        elif kind < 0.95:
+            tx['type'], tx['source'] = 'COMPRESSED_NFT_MINT', 'BUBBLEGUM'
+            tx['events'] = {'compressed': [{'type': 'COMPRESSED_NFT_MINT', 'treeId': '', 'assetId': '',
+                                            'newLeafOwner': wallet, 'treeDelegate': NFT_TREE_DELEGATE,
+                                            'metadata': {'name': f'Synthetic NFT #{i}', 'symbol': 'SYN'}}]}
+            tx['accountData'] = [account_entry(wallet, 0)]
+            program_id = 'BGUMAp9Gq7iTEuizy4pqaxsTyUCBK68MDfK752saRPUY'
+        else:
+            # No transfers: only the wallet's native balance change is visible
+            tx['type'], tx['source'] = 'UNKNOWN', 'UNKNOWN'
+            tx['accountData'] = [account_entry(wallet, rng.randint(-10**8, 10**8))]
+            program_id = 'KLend2g3cP87fffoy8q1mQqGKjrxjC8boSyAYavgmjD'
+
+        tx['instructions'] = [{'accounts': [wallet, other], 'data': '3Bxs', 'programId': program_id,
+                               'innerInstructions': []}]
+        txs.append(tx)
+    return txs
+
+
+def pad_transaction(tx, rng):
+    """
+    Add what real Helius payloads carry but the pipeline never reads (innerInstructions,
+    tokenBalanceChanges, descriptions, instruction data, extra accounts), roughly the shape and
+    size of an enhanced transaction touching a dozen accounts.  `rng` is a random.Random.
+    """
+    accounts = [synthetic_address('Acct', rng.randrange(10**6)) for _ in range(12)]
+    tx['description'] = f"{tx['feePayer']} transferred funds to {accounts[0]}."
+    tx['accountData'] += [{'account': account, 'nativeBalanceChange': 0, 'tokenBalanceChanges': [
+        {'userAccount': account, 'tokenAccount': accounts[-1], 'mint': accounts[-2],
+         'rawTokenAmount': {'tokenAmount': str(rng.randrange(10**9)), 'decimals': 6}}]} for account in accounts]
+    for instruction in tx['instructions']:
+        instruction['accounts'] += accounts[:4]
+        instruction['data'] = ''.join(rng.choices('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz', k=64))
+        instruction['innerInstructions'] = [{'accounts': accounts[i:i + 6], 'data': instruction['data'][:40],
+                                             'programId': accounts[i]} for i in range(6)]
+    tx['events'].setdefault('setAuthority', [])
+    return tx
+
+
+def synthetic_balances(txs, wallet=WALLET):
+    """
+    Flipside wallet_balances rows for every (transaction, mint) the wallet touched.
+    """
+    rows = []
+    running = {}
+    for tx in reversed(txs):  # oldest first so balances accumulate
+        ts = pd.Timestamp(tx['timestamp'], unit='s').strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        changes = {t['mint']: t['tokenAmount'] * (1 if t['toUserAccount'] == wallet else -1)
+                   for t in tx['tokenTransfers']}
+        for t in tx['nativeTransfers']:
+            changes[NATIVE_SOL] = t['amount'] / LAMPORT_SCALE * (1 if t['toUserAccount'] == wallet else -1)
+        for mint, change in changes.items():
+            pre = running.get(mint, 0.0)
+            running[mint] = max(pre + change, 0.0)
+            symbol, name, _ = TOKENS.get(mint, (None, None, None))
+            rows.append({'BLOCK_TIMESTAMP': ts, 'OWNER': wallet, 'MINT': mint, 'PRE_BALANCE': pre,
+                         'BALANCE': running[mint], 'TX_ID': tx['signature'], 'SUCCEEDED': tx['transactionError'] is None,
+                         'SYMBOL': symbol, 'NAME': name})
+    return pd.DataFrame(rows, columns=['BLOCK_TIMESTAMP', 'OWNER', 'MINT', 'PRE_BALANCE', 'BALANCE', 'TX_ID',
+                                       'SUCCEEDED', 'SYMBOL', 'NAME'])
+
+
+def synthetic_prices(txs, seed=0):
+    """
+    Daily price rows (dt, symbol, token_address, price) for SOL and every token, shaped like
+    the price store's output, as a random walk over the transactions' date range.
+    """
+    rng = np.random.default_rng(seed)
+    first = pd.Timestamp(min(tx['timestamp'] for tx in txs), unit='s').normalize()
+    last = pd.Timestamp(max(tx['timestamp'] for tx in txs), unit='s').normalize()
+    days = pd.date_range(first, last, freq='D')
+    frames = []
+    for mint, (symbol, _, start) in {NATIVE_SOL: ('SOL', 'Solana', 60.0), **TOKENS}.items():
+        walk = start * np.exp(np.cumsum(rng.normal(0, 0.03, len(days))))
+        frames.append(pd.DataFrame({'dt': days.strftime('%Y-%m-%d'), 'symbol': symbol,
+                                    'token_address': mint, 'price': walk}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_label_maps(txs, wallet=WALLET, labeled_share=0.2, seed=0):
+    """
+    (address labels, program labels) keyed by lowercased address, like load_label_maps().
+    """
+    rng = random.Random(seed)
+    addresses = {wallet, NFT_TREE_DELEGATE}
+    for tx in txs:
+        for t in tx['nativeTransfers'] + tx['tokenTransfers']:
+            addresses.update((t['fromUserAccount'], t['toUserAccount']))
+    address_labels = {address.lower(): f'{rng.choice(LABEL_NAMES)} {i}'
+                      for i, address in enumerate(sorted(addresses)) if rng.random() < labeled_share}
+    program_labels = {program_id.lower(): name for program_id, name in PROGRAMS.items()}
+    return address_labels, program_labels
+
+
+def synthetic_address_labels(distinct, labeled_share=1 / 3, seed=0):
+    """
+    `distinct` addresses and a label map (lowercased address -> label) covering `labeled_share`
+    of them, about what the real label sets cover.
+    """
+    rng = np.random.default_rng(seed)
+    addresses = [synthetic_address('Addr', i) for i in range(distinct)]
+    known = rng.choice(distinct, size=int(distinct * labeled_share), replace=False)
+    label_map = {addresses[i].lower(): f'{LABEL_NAMES[i % len(LABEL_NAMES)]} {i}' for i in known}
+    return addresses, label_map
+
+
+def synthetic_address_frame(n, addresses, columns=('sender', 'receiver', 'counterparty'), seed=0):
+    """
+    `n` rows of address columns drawn uniformly from `addresses`.
+    """
+    rng = np.random.default_rng(seed)
+    pool = np.array(addresses, dtype=object)
+    return pd.DataFrame({name: pool[rng.integers(0, len(pool), n)] for name in columns})
+
+
+def generate_workload(n, wallet=WALLET, seed=0):
+    txs = synthetic_transactions(n, wallet, seed)
+    return {
+        'wallet': wallet,
+        'transactions': txs,
+        'balances': synthetic_balances(txs, wallet),
+        'prices': synthetic_prices(txs, seed),
+        'label_maps': synthetic_label_maps(txs, wallet, seed=seed),
+    }
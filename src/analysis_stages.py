@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.clustering import create_tx_graph
+from src.data_processing import construct_tx_dataset, get_summary_stats, jsonify_safe, merge_datasets
+from src.entity_labeling import add_entity_labels, get_label_index
+from src.wallet_analysis import WalletAnalysis
+
+# CPU-bound analysis stages.  They are module-level so the stage DAG can hand them to a process
+# pool (see Stage(cpu=True)); bind the wallet with functools.partial.
+
+def parse_cpu_stage_workers(value):
+    """
+    Worker processes for CPU stages from CPU_STAGE_WORKERS: a count, 0 to keep every stage on
+    threads, or 'auto' (also -1) for one worker per core.
+    """
+    text = str(value).strip().lower()
+    if text in ('auto', '-1'):
+        return os.cpu_count() or 1
+    try:
+        workers = int(text)
+    except ValueError:
+        workers = None
+    if workers is None or workers < 0:
+        raise ValueError(f"CPU_STAGE_WORKERS must be a non-negative integer or 'auto', got {value!r}")
+    return workers
+
+CPU_STAGE_WORKERS = parse_cpu_stage_workers(os.getenv('CPU_STAGE_WORKERS', '0'))
+
+def tx_dataset(address, tx_history, balances, prices, balance_index=None):
+    return construct_tx_dataset(tx_history, prices, address, balances, balance_index)
+
+def labeled_dataset(address, dataset, labels=None):
+    # Without labels (process workers) the worker's own shared label index is used
+    tx_level_data_complete, wallet_stats = add_entity_labels(dataset, address, labels)
+    return merge_datasets(tx_level_data_complete, wallet_stats)
+
+def tx_graph(labeled):
+    return jsonify_safe(create_tx_graph(labeled))
+
+def wallet_analysis(address, labeled):
+    wallet_analysis_df = get_summary_stats(labeled.copy(), address)
+    wallet_analysis_obj = WalletAnalysis(wallet_analysis_df)
+
+    funding_sources = wallet_analysis_obj.track_funding_sources_and_flow(address).astype(object).where(pd.notnull).to_dict(orient='records')
+    transaction_history = wallet_analysis_obj.transaction_history(address)
+    activity_patterns = wallet_analysis_obj.key_activity_patterns_and_risk_factors(address)
+
+    return jsonify_safe({
+        'funding_sources': funding_sources,
+        'transaction_history': transaction_history,
+        'activity_patterns': activity_patterns
+    })
+
+def warm_worker():
+    try:
+        get_label_index()
+    except Exception as e:
+        print(f'Label index not loaded in worker, will retry on first job: {e}')
+
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+
+def get_cpu_pool(workers=CPU_STAGE_WORKERS):
+    """
+    Shared process pool for CPU stages, or None when disabled.  Workers are spawned rather than
+    forked because the web process is multi-threaded.
+    """
+    global _cpu_pool
+    if workers <= 0:
+        return None
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=warm_worker)
+        return _cpu_pool
@@ -0,0 +1,73 @@
+"""
+Local stand-in for the upstream APIs, serving recorded cassettes over HTTP.
+
+Point the providers at it and run the app (or many app processes) fully offline:
+    python -m src.cassette_server --port 8900 --latency-scale 0.5 --error-rate 0.01
+    HELIUS_RPC_URL=http://127.0.0.1:8900 HELIUS_API_URL=http://127.0.0.1:8900 \\
+    FLIPSIDE_API_URL=http://127.0.0.1:8900 VYBE_API_URL=http://127.0.0.1:8900 \\
+    BLOCKSEC_API_URL=http://127.0.0.1:8900 python app.py
+
+Cassettes are recorded with UPSTREAM_TRANSPORT=record; requests that were never recorded get a 404.
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.transport import CASSETTE_PATH, CassetteMiss, CassetteStore, Replayer
+
+def make_handler(replayer):
+    class CassetteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real providers
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, headers, body):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else None
+            try:
+                status, headers, payload = replayer.respond(self.command, self.path, body)
+            except CassetteMiss as e:
+                status, headers = 404, {'Content-Type': 'application/json'}
+                payload = json.dumps({'error': {'message': str(e)}}).encode('utf-8')
+            self._reply(status, headers, payload)
+
+        do_GET = _handle
+        do_POST = _handle
+
+    return CassetteHandler
+
+def serve(host, port, replayer):
+    server = ThreadingHTTPServer((host, port), make_handler(replayer))
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--cassettes', default=CASSETTE_PATH)
+    parser.add_argument('--latency', type=float, help='fixed seconds per response instead of the recorded latency')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiplier for recorded latencies')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of responses replaced by an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    store = CassetteStore(args.cassettes)
+    replayer = Replayer(store, latency=args.latency, latency_scale=args.latency_scale, error_rate=args.error_rate,
+                        error_status=args.error_status, seed=args.seed)
+    server = serve(args.host, args.port, replayer)
+    print(f'Serving {store.stats()} from {args.cassettes} on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
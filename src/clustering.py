@@ -1,116 +1,139 @@
-from src.data_processing import build_tx_graph, clean_tx_data
-import json
+from src.metrics import DEBUG_LOGGING
+import numpy as np
 import pandas as pd
-import networkx as nx
 
-# def create_tx_graph(tx_level_data):
-#     tx_level_data_clean = clean_tx_data(tx_level_data)
-#     tx_graph = build_tx_graph(tx_level_data_clean)
-    
-#     # with open("../data/tx_graph.json", "w") as f:
-#     #     json.dump(tx_graph, f, indent=2, default=str)
-
-#     return tx_graph
+# # Define thresholds
+HIGH_DENSITY_THRESHOLD = 0.3
+SMALL_CLUSTER_THRESHOLD = 5
+HIGH_TX_RATE_THRESHOLD = 5  # transactions per wallet
+HIGH_CENTRALITY_RATIO = 0.5  # one wallet handles >50% of edges
+
+CLUSTER_COLUMNS = ['cluster_id', 'wallets_in_cluster', 'total_transactions',
+                   'cluster_start_time', 'cluster_end_time', 'cluster_size',
+                   'cluster_type', 'avg_degree', 'density', 'central_wallets', 'flags']
+
+def union_find_components(left, right, n_nodes):
+    """
+    Component label for each of `n_nodes` integer-coded nodes given edge endpoint arrays.
+    Components are numbered by their lowest node code, so with nodes coded in order of first
+    appearance the numbering matches networkx.connected_components.
+    """
+    parent = np.arange(n_nodes)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in zip(left.tolist(), right.tolist()):
+        root_u, root_v = find(u), find(v)
+        if root_u != root_v:
+            # Keep the lower code as root so roots are each component's first-seen node
+            if root_u < root_v:
+                parent[root_v] = root_u
+            else:
+                parent[root_u] = root_v
+
+    roots = np.array([find(x) for x in range(n_nodes)], dtype=np.int64)
+    components, _ = pd.factorize(roots)
+    return components
+
+def classify_flags(density, cluster_size, total_transactions, max_degree):
+    flags = []
+
+    # High density + small cluster (potential wash trading or bot rings)
+    if density > HIGH_DENSITY_THRESHOLD and cluster_size < SMALL_CLUSTER_THRESHOLD:
+        flags.append('Dense Small Cluster')
+
+    # High transaction rate
+    if total_transactions / cluster_size > HIGH_TX_RATE_THRESHOLD:
+        flags.append('High Tx Rate')
+
+    # Check for centralization
+    if max_degree / (2 * total_transactions) > HIGH_CENTRALITY_RATIO:
+        flags.append('Centralized Flow')
+
+    return flags if flags else ['Normal']
 
 def create_tx_graph(tx_level_data):
-    # Initialize a graph
-    G = nx.Graph()
-
-    # Add edges from each transaction's sender and receiver
-    for _, row in tx_level_data.iterrows():
-        sender = row['sender']
-        receiver = row['receiver']
-        G.add_edge(sender, receiver)
+    """
+    Cluster wallets into connected components of the sender/receiver graph and describe each
+    cluster.  Wallets are integer-coded in order of first appearance, components come from a
+    single union-find pass over the distinct edges and every per-cluster metric is computed
+    with grouped aggregations instead of per-cluster scans of the transaction table.
+    """
+    if tx_level_data.empty:
+        return []
+
+    # Interleave so codes follow the sender, receiver, sender, ... order edges were seen in
+    endpoints = np.column_stack([tx_level_data['sender'].to_numpy(dtype=object),
+                                 tx_level_data['receiver'].to_numpy(dtype=object)]).ravel()
+    codes, wallets = pd.factorize(endpoints, use_na_sentinel=False)
+    n_wallets = len(wallets)
+    sender_codes, receiver_codes = codes[0::2], codes[1::2]
+
+    # Distinct undirected edges (a simple graph, self-loops counted once)
+    low = np.minimum(sender_codes, receiver_codes).astype(np.int64)
+    high = np.maximum(sender_codes, receiver_codes).astype(np.int64)
+    edge_keys = np.unique(low * n_wallets + high)
+    edge_low, edge_high = edge_keys // n_wallets, edge_keys % n_wallets
+
+    components = union_find_components(edge_low, edge_high, n_wallets)
+    # A self-loop adds 2 to its wallet's degree, as in networkx
+    degrees = np.bincount(np.concatenate([edge_low, edge_high]), minlength=n_wallets)
+
+    nodes = pd.DataFrame({'component': components, 'wallet': wallets, 'degree': degrees})
+    node_stats = nodes.groupby('component').agg(
+        wallets_in_cluster=('wallet', list),
+        cluster_size=('wallet', 'size'),
+        degree_sum=('degree', 'sum'),
+        max_degree=('degree', 'max'),
+    )
+    node_stats['edges'] = np.bincount(components[edge_low], minlength=len(node_stats))
+    # Degree centrality, ties kept in first-seen order
+    central = nodes.sort_values(['component', 'degree'], ascending=[True, False], kind='stable')
+    node_stats['central_wallets'] = central.groupby('component').head(3).groupby('component')['wallet'].agg(list)
+
+    rows = tx_level_data[['signature', 'timestamp', 'entity_label']].assign(component=components[sender_codes])
+    tx_stats = rows.groupby('component').agg(
+        total_transactions=('signature', 'nunique'),
+        cluster_start_time=('timestamp', 'min'),
+        cluster_end_time=('timestamp', 'max'),
+        n_entities=('entity_label', 'nunique'),
+        first_entity=('entity_label', 'first'),
+    )
+    stats = node_stats.join(tx_stats)
 
-    # Extract connected components as clusters
-    clusters = list(nx.connected_components(G))
-
-    # Prepare the cluster data
     cluster_data = []
-    for cluster_id, wallets in enumerate(clusters):
-        # Filter transactions involving cluster wallets
-        mask = tx_level_data['sender'].isin(wallets) | tx_level_data['receiver'].isin(wallets)
-        cluster_txs = tx_level_data[mask]
-        #cluster_txs = tx_level_data['signature'].nunique()
-        unique_entities = cluster_txs['entity_label'].dropna().unique().tolist()
-
+    for cluster_id, cluster in enumerate(stats.itertuples()):
         # Optionally infer cluster type based on entities present
-        if len(unique_entities) == 1:
-            cluster_type = unique_entities[0]
-        elif len(unique_entities) == 0:
+        if cluster.n_entities == 1:
+            cluster_type = cluster.first_entity
+        elif cluster.n_entities == 0:
             cluster_type = "Unknown"
         else:
             cluster_type = "Mixed"
 
+        cluster_size = int(cluster.cluster_size)
+        total_transactions = int(cluster.total_transactions)
+        density = 2 * int(cluster.edges) / (cluster_size * (cluster_size - 1)) if cluster_size > 1 else 0
 
-        # Aggregate metrics
-        cluster_entry = {
+        cluster_data.append({
             'cluster_id': cluster_id,
-            'wallets_in_cluster': list(wallets),
-            'total_transactions': cluster_txs['signature'].nunique(),
-            'cluster_start_time': cluster_txs['timestamp'].min(),
-            'cluster_end_time': cluster_txs['timestamp'].max(),
-            'cluster_size': len(wallets),
-            'cluster_type': cluster_type  # Placeholder for further analysis
-        }
-        cluster_data.append(cluster_entry)
-
-    # Create the DataFrame
-    cluster_df = pd.DataFrame(cluster_data)[
-        ['cluster_id', 'wallets_in_cluster', 'total_transactions',
-        'cluster_start_time', 'cluster_end_time', 'cluster_size', 'cluster_type']
-    ]
-
-    # Add graph metrics to each cluster
-    for cluster in cluster_data:
-        wallets = cluster['wallets_in_cluster']
-        subgraph = G.subgraph(wallets)
-        
-        degrees = dict(subgraph.degree())
-        avg_degree = sum(degrees.values()) / len(degrees)
-        
-        # Degree centrality
-        central_wallets = sorted(degrees.items(), key=lambda x: x[1], reverse=True)[:3]
-        central_wallets = [wallet for wallet, _ in central_wallets]
-        
-        cluster['avg_degree'] = avg_degree
-        cluster['density'] = nx.density(subgraph)
-        cluster['central_wallets'] = central_wallets
-
-    # Define thresholds
-    high_density_threshold = 0.3
-    small_cluster_threshold = 5
-    high_tx_rate_threshold = 5  # transactions per wallet
-    high_centrality_ratio = 0.5  # one wallet handles >50% of edges
-
-    for cluster in cluster_data:
-        flags = []
-
-        # High density + small cluster (potential wash trading or bot rings)
-        if cluster['density'] > high_density_threshold and cluster['cluster_size'] < small_cluster_threshold:
-            flags.append('Dense Small Cluster')
-
-        # High transaction rate
-        tx_rate = cluster['total_transactions'] / cluster['cluster_size']
-        if tx_rate > high_tx_rate_threshold:
-            flags.append('High Tx Rate')
-
-        # Check for centralization
-        wallets = cluster['wallets_in_cluster']
-        subgraph = G.subgraph(wallets)
-        degrees = dict(subgraph.degree())
-        max_deg = max(degrees.values())
-        if max_deg / (2 * cluster['total_transactions']) > high_centrality_ratio:
-            flags.append('Centralized Flow')
-
-        cluster['flags'] = flags if flags else ['Normal']
-
-        final_cluster_df = pd.DataFrame(cluster_data)[
-        ['cluster_id', 'wallets_in_cluster', 'total_transactions',
-        'cluster_start_time', 'cluster_end_time', 'cluster_size',
-        'cluster_type', 'avg_degree', 'density', 'central_wallets', 'flags']
-    ]
-
-    print(final_cluster_df.head())
+            'wallets_in_cluster': cluster.wallets_in_cluster,
+            'total_transactions': total_transactions,
+            'cluster_start_time': cluster.cluster_start_time,
+            'cluster_end_time': cluster.cluster_end_time,
+            'cluster_size': cluster_size,
+            'cluster_type': cluster_type,
+            'avg_degree': int(cluster.degree_sum) / cluster_size,
+            'density': density,
+            'central_wallets': cluster.central_wallets,
+            'flags': classify_flags(density, cluster_size, total_transactions, int(cluster.max_degree)),
+        })
+
+    if DEBUG_LOGGING:
+        print(pd.DataFrame(cluster_data)[CLUSTER_COLUMNS].head())
 
     return cluster_data
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+def _encode_column(series):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {'kind': 'category', 'codes': series.cat.codes.to_numpy(), 'categories': series.cat.categories.to_numpy(),
+                'ordered': dtype.ordered}
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return {'kind': 'datetimetz', 'values': series.dt.tz_localize(None).to_numpy(), 'tz': str(dtype.tz)}
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return {'kind': 'numpy', 'values': series.to_numpy()}
+
+    # Strings and other objects: dictionary-encode, addresses and symbols repeat heavily
+    try:
+        codes, uniques = pd.factorize(series)
+    except TypeError:
+        return {'kind': 'object', 'values': series.to_numpy(dtype=object), 'dtype': dtype}
+    # factorize codes missing values as -1; keep the column's own missing value (None or NaN) for them
+    missing = codes < 0
+    na = series.iloc[int(missing.argmax())] if missing.any() else np.nan
+    return {'kind': 'dictionary', 'codes': codes.astype(np.int32), 'uniques': np.asarray(uniques, dtype=object),
+            'na': na, 'dtype': dtype}
+
+def _decode_column(column, index):
+    kind = column['kind']
+    if kind == 'category':
+        values = pd.Categorical.from_codes(column['codes'], column['categories'], ordered=column['ordered'])
+        return pd.Series(values, index=index)
+    if kind == 'datetimetz':
+        return pd.Series(column['values'], index=index).dt.tz_localize(column['tz'])
+    if kind == 'numpy':
+        return pd.Series(column['values'], index=index)
+    if kind == 'object':
+        return pd.Series(column['values'], index=index, dtype=column['dtype'])
+
+    codes = column['codes']
+    uniques = np.empty(len(column['uniques']) + 1, dtype=object)
+    uniques[:-1] = column['uniques']
+    uniques[-1] = column.get('na', np.nan)
+    values = uniques[codes]
+    return pd.Series(values, index=index, dtype=column['dtype'])
+
+def encode_frame(df):
+    """
+    Compact columnar form of a DataFrame for handing to another process: numeric and datetime
+    columns as plain numpy buffers, categoricals as codes, strings dictionary-encoded as int32
+    codes plus the distinct values.  Only the default RangeIndex is kept as a range.
+    """
+    if isinstance(df.index, pd.RangeIndex):
+        index = {'kind': 'range', 'start': df.index.start, 'stop': df.index.stop, 'step': df.index.step}
+    else:
+        index = {'kind': 'index', 'values': df.index}
+    return {
+        'index': index,
+        'names': list(df.columns),
+        'columns': [_encode_column(df.iloc[:, i]) for i in range(df.shape[1])],
+    }
+
+def decode_frame(encoded):
+    index = encoded['index']
+    if index['kind'] == 'range':
+        index = pd.RangeIndex(index['start'], index['stop'], index['step'])
+    else:
+        index = index['values']
+    columns = [_decode_column(column, index) for column in encoded['columns']]
+    frame = pd.concat(columns, axis=1) if columns else pd.DataFrame(index=index)
+    frame.columns = encoded['names']
+    return frame
+
+def encode_value(value):
+    if isinstance(value, pd.DataFrame):
+        return ('frame', encode_frame(value))
+    if isinstance(value, tuple):
+        return ('tuple', [encode_value(v) for v in value])
+    return ('raw', value)
+
+def decode_value(encoded):
+    kind, payload = encoded
+    if kind == 'frame':
+        return decode_frame(payload)
+    if kind == 'tuple':
+        return tuple(decode_value(v) for v in payload)
+    return payload
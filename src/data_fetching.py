@@ -1,10 +1,18 @@
 import pandas as pd
+import numpy as np
 import json
-import requests
+from src import http_client
 import time
 import os
-from src.metadata import LAMPORT_SCALE, WRAPPED_SOL, NATIVE_SOL
-from src.sql import wallet_balances, token_prices
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from src.sql import wallet_balances, token_prices, wallet_balance_bounds, wallet_balances_page
+from src.query_cache import get_query_cache
+from src.price_store import GapCoalescer, get_price_store, resolve_alias
+from src.metrics import DEBUG_LOGGING, UPSTREAM_RETRIES
+from src.tx_stream import STREAM_CHUNK_SIZE, TX_FIELDS, NotJSONArray, stream_transactions
 
 
 from dotenv import load_dotenv
@@ -18,23 +26,53 @@ FLIPSIDE_API_KEY = os.getenv('FLIPSIDE_API_KEY')
 
 VYBE_API_KEY = os.getenv('VYBE_API_KEY')
 
-def get_all_signatures(account_address, helius_api_key, max_pages=20, limit=100, max_retries=5, sleep_seconds=5):
-    url = f"https://mainnet.helius-rpc.com/?api-key={helius_api_key}"
-    collected = []
-    before = None
+# Overridable so ingest can run against local stand-ins for the upstream endpoints
+HELIUS_RPC_URL = os.getenv('HELIUS_RPC_URL', 'https://mainnet.helius-rpc.com')
+HELIUS_API_URL = os.getenv('HELIUS_API_URL', 'https://api.helius.xyz')
+FLIPSIDE_API_URL = os.getenv('FLIPSIDE_API_URL', 'https://api-v2.flipsidecrypto.xyz')
+VYBE_API_URL = os.getenv('VYBE_API_URL', 'https://api.vybenetwork.xyz')
+BLOCKSEC_API_URL = os.getenv('BLOCKSEC_API_URL', 'https://aml.blocksec.com')
+
+# 'pipeline' streams v0 batches and keeps only the fields the analysis reads (src.tx_stream.TX_FIELDS),
+# 'full' keeps whole parsed transactions
+HELIUS_TX_FIELDS = os.getenv('HELIUS_TX_FIELDS', 'pipeline')
+V0_FIELDS = None if HELIUS_TX_FIELDS == 'full' else TX_FIELDS
+# Also keep every hydrated transaction's raw JSON, compressed in the TxStore, for audit
+TX_RAW_AUDIT = os.getenv('TX_RAW_AUDIT', '').lower() in ('1', 'true', 'yes')
+V0_BATCH_SIZE = 100
+
+def iter_signature_pages(account_address, helius_api_key, max_pages=20, limit=100, max_retries=5, sleep_seconds=5,
+                         until=None, raise_on_error=False, before=None, status=None):
+    """
+    Yield getSignaturesForAddress pages (newest first) as soon as each one arrives.  Pacing between
+    pages comes from the shared Helius rate limiter.  `until` stops paging at an already seen
+    signature and `before` starts below one.  raise_on_error=True raises instead of silently
+    ending on a failed page.
+
+    A `status` dict receives 'complete' (True once paging reached `until` or the end of the
+    history, False when it stopped at max_pages or on an error) and 'last' (the oldest signature
+    yielded, i.e. where to resume).
+    """
+    url = f"{HELIUS_RPC_URL}/?api-key={helius_api_key}"
+    if status is None:
+        status = {}
+    status.update(complete=False, last=before)
 
     for _ in range(max_pages):
         payload = {
             "jsonrpc": "2.0",
             "id": "1",
             "method": "getSignaturesForAddress",
-            "params": [account_address, {"limit": limit, **({"before": before} if before else {})}]
+            "params": [account_address, {"limit": limit,
+                                         **({"before": before} if before else {}),
+                                         **({"until": until} if until else {})}]
         }
 
         success = False
         for attempt in range(max_retries):
             try:
-                response = requests.post(
+                response = http_client.post(
+                    'helius',
                     url,
                     headers={"Content-Type": "application/json"},
                     data=json.dumps(payload),
@@ -46,17 +84,21 @@ def get_all_signatures(account_address, helius_api_key, max_pages=20, limit=100,
                     print(f"❌ Error: {data['error']['message']}")
                     if attempt < max_retries - 1:
                         print(f"Retrying... (attempt {attempt+1}/{max_retries})")
+                        UPSTREAM_RETRIES.inc(provider='helius', reason='error')
                         time.sleep(sleep_seconds)
                         continue
+                    elif raise_on_error:
+                        raise Exception(f"getSignaturesForAddress failed: {data['error']['message']}")
                     else:
-                        return collected  # Exit if max retries hit
+                        return  # Exit if max retries hit
 
                 batch = data.get("result", [])
                 if not batch:
-                    return collected  # No more results
+                    status['complete'] = True
+                    return  # No more results
 
-                collected.extend(batch)
-                before = batch[-1]["signature"]
+                yield batch
+                before = status['last'] = batch[-1]["signature"]
                 success = True
                 break
 
@@ -64,72 +106,316 @@ def get_all_signatures(account_address, helius_api_key, max_pages=20, limit=100,
                 print(f"Exception: {e}")
                 if attempt < max_retries - 1:
                     print(f"Retrying after error... (attempt {attempt+1}/{max_retries})")
+                    UPSTREAM_RETRIES.inc(provider='helius', reason='error')
                     time.sleep(sleep_seconds)
+                elif raise_on_error:
+                    raise
                 else:
-                    return collected  # Exit if max retries hit
+                    return  # Exit if max retries hit
 
         if not success:
             break  # Stop paging if failed to fetch this page
 
-        time.sleep(0.5)  # Rate-limit protection between *successful* pages
+def get_all_signatures(account_address, helius_api_key, max_pages=20, limit=100, max_retries=5, sleep_seconds=5,
+                       until=None, raise_on_error=False, before=None, status=None):
+    collected = []
+    for batch in iter_signature_pages(account_address, helius_api_key, max_pages, limit, max_retries, sleep_seconds,
+                                      until=until, raise_on_error=raise_on_error, before=before, status=status):
+        collected.extend(batch)
 
     return collected
 
-def v0_transactions_all(signatures, helius_api_key):
-    import time
-    url = f"https://api.helius.xyz/v0/transactions?api-key={helius_api_key}"
+def v0_transactions_batch(batch, helius_api_key, batch_number=0, fields=V0_FIELDS, raw=None):
+    """
+    Hydrate up to 100 signatures through the v0 parsed transactions endpoint.  With `fields`
+    (see src.tx_stream.TX_FIELDS) the response is parsed as it streams in and each transaction
+    is trimmed to those fields; fields=None returns whole payloads.  A `raw` list collects each
+    transaction's (signature, raw JSON bytes) for TxStore.put_raw_many.
+    """
+    url = f"{HELIUS_API_URL}/v0/transactions?api-key={helius_api_key}"
     headers = {"Content-Type": "application/json"}
+    payload = json.dumps({"transactions": batch})
+    streamed = fields is not None or raw is not None
+
+    response = http_client.post('helius', url, headers=headers, data=payload, stream=streamed)
 
+    try:
+        if streamed:
+            try:
+                return list(stream_transactions(response.iter_content(STREAM_CHUNK_SIZE), fields, raw))
+            except NotJSONArray as e:
+                data = e.value
+        else:
+            data = response.json()
+        if isinstance(data, dict) and "error" in data:
+            print(f"❌ Error at batch {batch_number}: {data['error']}")
+            return []
+
+        return data
+
+    except Exception as e:
+        print(f"❌ Exception during batch {batch_number}: {e}")
+        return []
+    finally:
+        response.close()
+
+def v0_transactions_all(signatures, helius_api_key, fields=V0_FIELDS):
     all_results = []
-    batch_size = 100
+    batch_size = V0_BATCH_SIZE
 
     for i in range(0, len(signatures), batch_size):
         batch = signatures[i:i+batch_size]
-        payload = json.dumps({"transactions": batch})
+        all_results.extend(v0_transactions_batch(batch, helius_api_key, i // batch_size, fields))
+
+    return all_results
+
+def hydrate_batch_into(store, batch, helius_api_key, batch_number=0, fields=V0_FIELDS, audit=TX_RAW_AUDIT):
+    """
+    Hydrate one v0 batch straight into the TxStore (plus raw payloads when auditing).  Returns
+    the number of transactions stored.
+    """
+    raw = [] if audit else None
+    stored = store.put_many(v0_transactions_batch(batch, helius_api_key, batch_number, fields, raw))
+    if raw:
+        store.put_raw_many(raw)
+    return stored
+
+def v0_transactions_into(store, signatures, helius_api_key, fields=V0_FIELDS):
+    """
+    v0_transactions_all written to the TxStore batch by batch instead of collected in memory.
+    """
+    stored = 0
+    for i in range(0, len(signatures), V0_BATCH_SIZE):
+        stored += hydrate_batch_into(store, signatures[i:i + V0_BATCH_SIZE], helius_api_key, i // V0_BATCH_SIZE,
+                                     fields)
+    return stored
+
+def pipelined_transactions(account_address, helius_api_key, concurrency=4, max_pages=20, limit=100,
+                           until=None, store=None, on_progress=None, before=None, status=None):
+    """
+    Producer/consumer ingest.  Each signature page is handed to a bounded pool of v0 hydration
+    workers as soon as it arrives, so paging and hydration overlap.  Results are returned in
+    signature order (newest first), same as v0_transactions_all(get_all_signatures(...)).
 
-        response = requests.post(url, headers=headers, data=payload)
+    With a TxStore, pages are linked to the address, only signatures missing from the store are
+    hydrated, and hydrated transactions are written back as each batch completes instead of being
+    returned (read them back with TxStore.address_history).
 
+    `on_progress(pages=..., signatures=..., transactions=...)` is called after every page and
+    every hydrated batch.  `before`, `until` and `status` are passed to iter_signature_pages.
+    """
+    seen = set()
+    progress = {'pages': 0, 'signatures': 0, 'transactions': 0}
+    progress_lock = threading.Lock()
+
+    def report(**increments):
+        if on_progress is None:
+            return
+        with progress_lock:
+            for key, value in increments.items():
+                progress[key] += value
+            on_progress(**progress)
+
+    futures = []
+    in_flight = threading.BoundedSemaphore(concurrency * 2)  # Backpressure on the pager
+
+    def hydrate(batch, batch_number):
         try:
-            data = response.json()
-            if isinstance(data, dict) and "error" in data:
-                print(f"❌ Error at batch {i // batch_size}: {data['error']}")
+            if store is not None:
+                report(transactions=hydrate_batch_into(store, batch, helius_api_key, batch_number))
+                return []
+            results = v0_transactions_batch(batch, helius_api_key, batch_number)
+            report(transactions=len(results))
+            return results
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for page in iter_signature_pages(account_address, helius_api_key, max_pages, limit, until=until,
+                                         raise_on_error=store is not None, before=before, status=status):
+            if store is not None:
+                store.add_address_signatures(account_address, page)
+            report(pages=1, signatures=len(page))
+            batch = []
+            for sig in page:
+                signature_str = sig.get('signature')
+                if signature_str not in seen:
+                    seen.add(signature_str)
+                    batch.append(signature_str)
+            if store is not None:
+                batch = store.missing(batch)
+            if not batch:
                 continue
+            in_flight.acquire()
+            futures.append(pool.submit(hydrate, batch, len(futures)))
 
-            all_results.extend(data)
+        all_results = []
+        for future in futures:
+            all_results.extend(future.result())
 
-        except Exception as e:
-            print(f"❌ Exception during batch {i // batch_size}: {e}")
+    return all_results
 
-        time.sleep(0.3)  # Optional rate limit buffer
+KEYSET_TS_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+BALANCE_COLUMNS = ['BLOCK_TIMESTAMP', 'OWNER', 'MINT', 'PRE_BALANCE', 'BALANCE', 'TX_ID', 'SUCCEEDED', 'SYMBOL', 'NAME']
 
-    return all_results
+def flipside_cached(query):
+    return get_query_cache().get_or_fetch(query, flipside_api_results)
+
+def naive_utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tzinfo else ts
 
-def get_balance_data(account_address=None, use_cache=False):
+def split_time_windows(first_ts, last_ts, n_windows):
     """
-    For testing we are using CSV and test address
+    Half-open [start, end) windows covering first_ts..last_ts inclusive.
     """
+    first_ts = naive_utc(first_ts)
+    end = naive_utc(last_ts) + pd.Timedelta(microseconds=1)
+    edges = list(pd.date_range(first_ts, end, periods=n_windows + 1)) if n_windows > 1 else [first_ts, end]
+    edges[-1] = end
+    return [(edges[i].strftime(KEYSET_TS_FORMAT), edges[i + 1].strftime(KEYSET_TS_FORMAT)) for i in range(len(edges) - 1)]
 
-    if not use_cache:
+def balance_window_chunks(account_address, window_start, window_end, chunk_size):
+    """
+    Keyset-paginate one time window in (block_timestamp, tx_id) order.  A page is cut back to
+    its last complete transaction so no transaction is ever split across pages.
+    """
+    chunks = []
+    after = None
+    limit = chunk_size
+
+    while True:
+        page = flipside_cached(wallet_balances_page(account_address, window_start, window_end, after, limit))
+        page.columns = page.columns.str.upper()
+        page = page.drop(columns=['__ROW_INDEX'], errors='ignore')
+
+        if len(page) < limit:
+            if len(page):
+                chunks.append(page)
+            return chunks
+
+        last_ts, last_tx = page['BLOCK_TIMESTAMP'].iloc[-1], page['TX_ID'].iloc[-1]
+        complete = ~((page['BLOCK_TIMESTAMP'] == last_ts) & (page['TX_ID'] == last_tx))
+        if not complete.any():
+            limit *= 2  # One transaction is larger than the page
+            continue
+
+        page = page[complete]
+        chunks.append(page)
+        after = (naive_utc(page['BLOCK_TIMESTAMP'].iloc[-1]).strftime(KEYSET_TS_FORMAT), page['TX_ID'].iloc[-1])
+        limit = chunk_size
+
+def iter_ordered_windows(windows, fetch_window, concurrency):
+    """
+    Fetch windows on a bounded pool and yield their chunks in window order.  At most
+    `concurrency` windows are in flight or buffered at once.
+    """
+    windows = iter(windows)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = deque(pool.submit(fetch_window, *window) for window in islice(windows, concurrency))
+        while futures:
+            chunks = futures.popleft().result()
+            next_window = next(windows, None)
+            if next_window is not None:
+                futures.append(pool.submit(fetch_window, *next_window))
+            yield from chunks
+
+def iter_wallet_balance_chunks(account_address, chunk_size=10000, concurrency=4, max_windows=64):
+    """
+    Stream a wallet's complete balance history (no LIMIT truncation) as DataFrame chunks in
+    (block_timestamp, tx_id) order.  The history is split into time windows of roughly
+    `chunk_size` rows that are fetched in parallel and keyset-paginated inside each window.
+    """
+    bounds = flipside_api_results(wallet_balance_bounds(account_address))
+    bounds.columns = bounds.columns.str.upper()
+    if bounds.empty or not bounds['N_ROWS'].iloc[0]:
+        return
 
-        balance_data_query = wallet_balances(account_address)
+    n_windows = min(max_windows, max(1, -(-int(bounds['N_ROWS'].iloc[0]) // chunk_size)))
+    windows = split_time_windows(bounds['FIRST_TS'].iloc[0], bounds['LAST_TS'].iloc[0], n_windows)
 
-        try:
+    def fetch_window(window_start, window_end):
+        return balance_window_chunks(account_address, window_start, window_end, chunk_size)
+
+    yield from iter_ordered_windows(windows, fetch_window, concurrency)
+
+def price_window_chunks(token_addresses, window_start, window_end, chunk_size):
+    """
+    Prices for one day window.  A full page means the window may be truncated, so it is split
+    in half (by days, then by tokens) until every query comes back under the cap.
+    """
+    prices = flipside_cached(token_prices(token_addresses, window_start, end_date=window_end, limit=chunk_size))
+    if len(prices) < chunk_size:
+        return [prices.drop(columns=['__row_index'], errors='ignore')] if len(prices) else []
+
+    start_dt, end_dt = pd.Timestamp(window_start), pd.Timestamp(window_end)
+    days = (end_dt - start_dt).days
+    if days > 1:
+        mid = (start_dt + pd.Timedelta(days=days // 2)).strftime('%Y-%m-%d %H:%M:%S')
+        return (price_window_chunks(token_addresses, window_start, mid, chunk_size) +
+                price_window_chunks(token_addresses, mid, window_end, chunk_size))
+    if len(token_addresses) > 1:
+        half = len(token_addresses) // 2
+        chunks = (price_window_chunks(token_addresses[:half], window_start, window_end, chunk_size) +
+                  price_window_chunks(token_addresses[half:], window_start, window_end, chunk_size))
+        return [pd.concat(chunks, ignore_index=True).sort_values(['dt', 'symbol', 'token_address'])] if chunks else []
+    raise ValueError(f'More than {chunk_size} price rows for one token-day in {window_start}')
+
+def iter_price_chunks(token_addresses, start_date, chunk_size=10000, concurrency=4, end_date=None):
+    """
+    Stream daily prices from start_date's day to end_date (default: tomorrow) in day windows
+    sized so each query stays under `chunk_size` rows, fetched in parallel.
+    """
+    token_addresses = list(token_addresses)
+    if not token_addresses:
+        return
+
+    start_day = naive_utc(start_date).normalize()
+    end_day = naive_utc(end_date or pd.Timestamp.now('UTC')).normalize() + pd.Timedelta(days=0 if end_date else 1)
+    days_per_window = max(1, chunk_size // len(token_addresses) // 2)  # Headroom for multi-symbol tokens
 
-            balance_df = flipside_api_results(balance_data_query)
-            balance_df.columns = balance_df.columns.str.upper()
-            print(f'balance_df: {balance_df}')
+    edges = list(pd.date_range(start_day, end_day, freq=f'{days_per_window}D'))
+    if edges[-1] < end_day:
+        edges.append(end_day)
+    windows = [(edges[i].strftime('%Y-%m-%d %H:%M:%S'), edges[i + 1].strftime('%Y-%m-%d %H:%M:%S'))
+               for i in range(len(edges) - 1)]
+
+    def fetch_window(window_start, window_end):
+        return price_window_chunks(token_addresses, window_start, window_end, chunk_size)
+
+    yield from iter_ordered_windows(windows, fetch_window, concurrency)
+
+def get_balance_data(account_address=None, use_cache=False, paginated=False, chunk_size=10000, concurrency=4):
+    """
+    Live results go through the Flipside query cache; errors propagate to the caller's retry.
+    paginated=True fetches the full history in keyset chunks instead of the LIMIT 10000 query.
+    That bounds the size of each Flipside query and response, not memory: the chunks are
+    concatenated into one frame, since the price, dataset and balance-index stages all read the
+    whole history.
+    For testing (use_cache=True) we are using CSV and test address
+    """
 
-            balance_df.to_csv(TEST_BAL_PATH, index=False)
-        except Exception as e:
-            print(f'e: {e}')
-            balance_df = pd.read_csv(TEST_BAL_PATH).dropna(how='all')
+    if not use_cache and paginated:
+        chunks = list(iter_wallet_balance_chunks(account_address, chunk_size, concurrency))
+        balance_df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=BALANCE_COLUMNS)
+        balance_df.columns = balance_df.columns.str.upper()
+    elif not use_cache:
+
+        balance_data_query = wallet_balances(account_address)
+
+        balance_df = flipside_cached(balance_data_query)
+        balance_df.columns = balance_df.columns.str.upper()
     else:
         balance_df = pd.read_csv(TEST_BAL_PATH).dropna(how='all')
     # Strip BOMs or invisible characters from column names
     balance_df.columns = balance_df.columns.str.replace('\ufeff', '', regex=False).str.strip()
 
-    # Optionally: remove rows where any column has just a BOM or is empty/whitespace
-    balance_df = balance_df[~balance_df.apply(lambda row: row.astype(str).str.contains('\ufeff|^\s*$', regex=True)).any(axis=1)]
+    # Optionally: remove rows where any column has just a BOM or is empty/whitespace.
+    # Only text columns can match, so numeric/bool/datetime columns are skipped.
+    bad_rows = np.zeros(len(balance_df), dtype=bool)
+    for col in balance_df.select_dtypes(include=['object', 'string']).columns:
+        bad_rows |= balance_df[col].astype(str).str.contains('\ufeff|^\s*$', regex=True, na=False).to_numpy(dtype=bool)
+    balance_df = balance_df[~bad_rows]
 
     sol_mask = (
         (balance_df['MINT'] == 'So11111111111111111111111111111111111111111') &
@@ -141,31 +427,52 @@ def get_balance_data(account_address=None, use_cache=False):
 
     return balance_df
 
+def fetch_price_range(token_addresses, start_day, end_day, chunk_size=10000, concurrency=4):
+    """
+    Query Flipside for [start_day, end_day) of `token_addresses` and record it in the price store.
+    """
+    store = get_price_store()
+    for chunk in iter_price_chunks(token_addresses, f'{start_day} 00:00:00', chunk_size, concurrency,
+                                   end_date=f'{end_day} 00:00:00'):
+        store.put(chunk)
+    store.mark_covered(token_addresses, start_day, end_day)
+
+price_gap_coalescer = GapCoalescer(fetch_price_range)
+
+def apply_price_aliases(prices_data, token_addresses):
+    """
+    Add rows for requested tokens that are priced through an alias (native SOL uses wSOL).
+    """
+    frames = [prices_data]
+    for token in dict.fromkeys(token_addresses):
+        source = resolve_alias(token)
+        if source != token:
+            aliased = prices_data[prices_data['token_address'] == source].copy()
+            aliased['token_address'] = token
+            frames.append(aliased)
+    return pd.concat(frames, ignore_index=True)
+
 def get_price_data(token_addresses, start_date, use_cache=False):
-    # For now we pull from 
+    """
+    Live prices are read from the local (token, day) price store.  Only days the store has not
+    covered yet are queried from Flipside, and gaps from concurrent jobs go out as one query.
+    """
     if not use_cache:
-        try:
-            prices_query = token_prices(token_addresses,start_date)
-            prices_data = flipside_api_results(prices_query)
-            print(f'prices_data: {prices_data}')
-            prices_data.to_csv(TEST_PRICES_PATH, index=False)
-        except Exception as e:
-            print(f'e: {e}')
-            prices_data = pd.read_csv(TEST_PRICES_PATH).dropna()
-    else:
-        prices_data = pd.read_csv(TEST_PRICES_PATH).dropna()
+        store = get_price_store()
+        start_day = naive_utc(start_date).strftime('%Y-%m-%d')
+        end_day = (naive_utc(pd.Timestamp.now('UTC')).normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
 
-    prices_data['dt'] = pd.to_datetime(pd.to_datetime(prices_data['dt']).dt.strftime('%Y-%m-%d'))
-    prices_data.columns = prices_data.columns.str.lower()
+        source_tokens = sorted({resolve_alias(token) for token in token_addresses})
+        price_gap_coalescer.request(store.gaps(source_tokens, start_day, end_day))
+
+        return store.read(token_addresses, start_day, end_day)
 
-    # Duplicate wrapped SOL rows with native SOL address
-    wrapped_sol_prices = prices_data[prices_data['token_address'] == WRAPPED_SOL].copy()
-    wrapped_sol_prices['token_address'] = NATIVE_SOL
+    prices_data = pd.read_csv(TEST_PRICES_PATH).dropna()
 
-    # Append to original price data
-    prices_data = pd.concat([prices_data, wrapped_sol_prices], ignore_index=True)
+    prices_data['dt'] = pd.to_datetime(pd.to_datetime(prices_data['dt']).dt.strftime('%Y-%m-%d'))
+    prices_data.columns = prices_data.columns.str.lower()
 
-    return prices_data
+    return apply_price_aliases(prices_data, token_addresses)
 
 def get_vybe_identified_accounts(use_cache=True):
     cache_file = os.path.join(CACHE_DIR, "vybe_identified_accounts.json")
@@ -174,9 +481,9 @@ def get_vybe_identified_accounts(use_cache=True):
         with open(cache_file, 'r') as f:
             return json.load(f)
 
-    url = "https://api.vybenetwork.xyz/account/known-accounts"
+    url = f"{VYBE_API_URL}/account/known-accounts"
     headers = {"accept": "application/json", "X-API-KEY": VYBE_API_KEY}
-    response = requests.get(url, headers=headers)
+    response = http_client.get('vybe', url, headers=headers)
     data = response.json()
 
     identified_addresses = {}
@@ -198,9 +505,9 @@ def get_vybe_identified_programs(use_cache=True):
         with open(cache_file, 'r') as f:
             return json.load(f)
 
-    url = "https://api.vybenetwork.xyz/program/known-program-accounts"
+    url = f"{VYBE_API_URL}/program/known-program-accounts"
     headers = {"accept": "application/json", "X-API-KEY": VYBE_API_KEY}
-    response = requests.get(url, headers=headers)
+    response = http_client.get('vybe', url, headers=headers)
     data = response.json()
 
     identified_programs = {}
@@ -220,8 +527,8 @@ def chunked(iterable, size):
     for i in range(0, len(iterable), size):
         yield iterable[i:i + size]
 
-def fetch_address_labels(unique_addresses, chain_id, api_key, delay=0.2):
-    url = "https://aml.blocksec.com/address-label/api/v3/batch-labels"
+def fetch_address_labels(unique_addresses, chain_id, api_key):
+    url = f"{BLOCKSEC_API_URL}/address-label/api/v3/batch-labels"
     headers = {
         "API-KEY": api_key,
         "Content-Type": "application/json"
@@ -229,7 +536,8 @@ def fetch_address_labels(unique_addresses, chain_id, api_key, delay=0.2):
     results = []
 
     for chunk in chunked(unique_addresses, 100):
-        response = requests.post(
+        response = http_client.post(
+            'blocksec',
             url,
             headers=headers,
             json={
@@ -238,18 +546,35 @@ def fetch_address_labels(unique_addresses, chain_id, api_key, delay=0.2):
             }
         )
         data = response.json()
-        print(f'data: {data}')
+        if DEBUG_LOGGING:
+            print(f'data: {data}')
         if data.get("code") == 200000:
             results.extend(data.get("data", []))
         else:
             print(f"[Error] Batch failed: {data}")
-        time.sleep(delay)  # optional delay to avoid rate limits
 
     return results
 
-def flipside_api_results(query=None, query_run_id=None, attempts=10, delay=30):
+def flipside_results_page(url, headers, query_run_id, page_number, page_size):
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "getQueryRunResults",
+        "params": [{"queryRunId": query_run_id, "format": "json", "page": {"number": page_number, "size": page_size}}],
+        "id": 1
+    }
+    response = http_client.post('flipside', url, headers=headers, json=payload)
+    return response.json()
 
-    url = "https://api-v2.flipsidecrypto.xyz/json-rpc"
+def flipside_api_results(query=None, query_run_id=None, timeout=300, initial_delay=1, max_delay=30,
+                         page_size=10000, page_workers=4):
+    """
+    Runs `query` (or resumes `query_run_id`) and returns all result rows as a DataFrame.
+    Polls with exponential backoff capped at `max_delay` until `timeout` seconds have passed.
+    The completed first page is kept, and the remaining pages are fetched concurrently once
+    the total page count is known.
+    """
+
+    url = f"{FLIPSIDE_API_URL}/json-rpc"
     headers = {"Content-Type": "application/json", "x-api-key": FLIPSIDE_API_KEY}
 
     if query_run_id is None:
@@ -261,7 +586,7 @@ def flipside_api_results(query=None, query_run_id=None, attempts=10, delay=30):
                         "dataSource": "snowflake-default", "dataProvider": "flipside"}],
             "id": 1
         }
-        response = requests.post(url, headers=headers, json=payload)
+        response = http_client.post('flipside', url, headers=headers, json=payload)
         response_data = response.json()
         if 'error' in response_data:
             raise Exception(f"Error creating query: {response_data['error']['message']}")
@@ -269,33 +594,44 @@ def flipside_api_results(query=None, query_run_id=None, attempts=10, delay=30):
         if not query_run_id:
             raise KeyError(f"Query creation failed. Response: {response_data}")
 
-    for attempt in range(attempts):
-        status_payload = {
-            "jsonrpc": "2.0",
-            "method": "getQueryRunResults",
-            "params": [{"queryRunId": query_run_id, "format": "json", "page": {"number": 1, "size": 10000}}],
-            "id": 1
-        }
-        response = requests.post(url, headers=headers, json=status_payload)
-        resp_json = response.json()
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        resp_json = flipside_results_page(url, headers, query_run_id, 1, page_size)
 
         if 'result' in resp_json and 'rows' in resp_json['result']:
-            all_rows, page_number = [], 1
-            while True:
-                status_payload["params"][0]["page"]["number"] = page_number
-                response = requests.post(url, headers=headers, json=status_payload)
-                resp_json = response.json()
-                rows = resp_json.get('result', {}).get('rows', [])
-                if not rows:
-                    break
-                all_rows.extend(rows)
-                page_number += 1
-            return pd.DataFrame(all_rows)
+            break
 
         if 'error' in resp_json and 'not yet completed' in resp_json['error'].get('message', '').lower():
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Query did not complete within {timeout}s.")
+            UPSTREAM_RETRIES.inc(provider='flipside', reason='pending')
             time.sleep(delay)
+            delay = min(delay * 2, max_delay)
         else:
             raise Exception(f"Error fetching query results: {resp_json}")
 
-    raise TimeoutError(f"Query did not complete after {attempts} attempts.")
-    
+    first_rows = resp_json['result']['rows'] or []
+    total_pages = (resp_json['result'].get('page') or {}).get('totalPages')
+
+    if total_pages is None:
+        # No page metadata: walk pages until an empty one comes back
+        pages = [first_rows]
+        page_number = 2
+        while pages[-1]:
+            rows = flipside_results_page(url, headers, query_run_id, page_number, page_size).get('result', {}).get('rows', [])
+            pages.append(rows or [])
+            page_number += 1
+    elif total_pages > 1:
+        def fetch_page(page_number):
+            page_json = flipside_results_page(url, headers, query_run_id, page_number, page_size)
+            if 'result' not in page_json:
+                raise Exception(f"Error fetching page {page_number}: {page_json}")
+            return page_json['result'].get('rows') or []
+
+        with ThreadPoolExecutor(max_workers=page_workers) as pool:
+            pages = [first_rows] + list(pool.map(fetch_page, range(2, total_pages + 1)))
+    else:
+        pages = [first_rows]
+
+    return pd.DataFrame([row for rows in pages for row in rows])
@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
 import json
-from src.data_fetching import get_all_signatures, v0_transactions_all, get_price_data
+from src.data_fetching import (V0_FIELDS, get_all_signatures, v0_transactions_into, pipelined_transactions,
+                               get_price_data)
 from src.metadata import LAMPORT_SCALE, WRAPPED_SOL, NATIVE_SOL
+from src.tx_store import get_tx_store
+from src.metrics import DEBUG_LOGGING
 import os
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
@@ -90,61 +93,132 @@ def build_tx_graph(df):
 
     return {"nodes": nodes, "edges": edges}
 
-def get_comprehensive_tx_history(wallet, api_key, use_cache=True):
+def get_comprehensive_tx_history(wallet, api_key, use_cache=True, pipelined=False, concurrency=4, store=None,
+                                 on_progress=None, max_pages=20):
+    """
+    Live runs go through the shared TxStore: only signatures newer than the wallet's watermark are
+    paged, and only transactions no wallet has stored yet are hydrated.  When max_pages runs out
+    before the watermark is reached, the unpaged range is kept as a gap and paged first on the
+    next runs.  pipelined=True overlaps
+    signature paging with v0 hydration across `concurrency` workers and reports to `on_progress`.
+    Transactions are trimmed to the fields the analysis reads unless HELIUS_TX_FIELDS=full.
+    """
 
     if use_cache:
         with open(TEST_TX_PATH) as f:
             parsed_transaction_history = json.load(f)
 
         return parsed_transaction_history
-    
-    else:
-
-        signatures = get_all_signatures(wallet, api_key)
-
-        signatures_dict = {}
-
-        for sig in signatures:
-            time = sig.get('blockTime')
-            signature_str = sig.get('signature')
-
-            signatures_dict[signature_str] = time
-        
-        signatures_array = list(signatures_dict.keys())
-
-        parsed_transaction_history = v0_transactions_all(signatures_array, api_key)
 
-        with open(TEST_TX_PATH, 'w') as f:
-            json.dump(parsed_transaction_history, f)
+    store = store or get_tx_store()
+    watermark = store.get_watermark(wallet)
+
+    def ingest(until, before=None):
+        status = {}
+        if pipelined:
+            pipelined_transactions(wallet, api_key, concurrency=concurrency, max_pages=max_pages, until=until,
+                                   store=store, on_progress=on_progress, before=before, status=status)
+        else:
+            signatures = get_all_signatures(wallet, api_key, max_pages=max_pages, until=until, raise_on_error=True,
+                                            before=before, status=status)
+            store.add_address_signatures(wallet, signatures)
+
+            signatures_array = list(dict.fromkeys(sig.get('signature') for sig in signatures))
+            v0_transactions_into(store, store.missing(signatures_array), api_key)
+        return status
+
+    # Ranges an earlier run stopped paging in (more new signatures than max_pages covers)
+    for before, until in store.signature_gaps(wallet):
+        status = ingest(until, before)
+        if status['complete']:
+            store.clear_signature_gap(wallet, until)
+        elif status['last'] != before:
+            store.set_signature_gap(wallet, status['last'], until)
+
+    status = ingest(watermark)
+    if watermark and not status['complete'] and status['last']:
+        # Everything between the oldest page fetched and the old watermark is still unpaged
+        store.set_signature_gap(wallet, status['last'], watermark)
+
+    # Linked but never stored, e.g. a v0 batch that failed on an earlier run
+    missing = store.missing_for_address(wallet)
+    if missing:
+        v0_transactions_into(store, missing, api_key)
+
+    store.advance_watermark(wallet)
+
+    return store.address_history(wallet, V0_FIELDS)
 
-        return parsed_transaction_history
-    
 def get_instruction_data(tx, wallet):
     instructions_data = {}
 
     for i in tx.get('instructions'):
         accounts = i['accounts']
         if accounts and wallet in accounts:
-            data = i['data']
+            data = i.get('data')  # Not kept by the trimmed ingest (src.tx_stream.TX_FIELDS)
             program_id = i['programId']
             instructions_data['data'] = data
             instructions_data['programId'] = program_id
 
     return instructions_data
 
-def summarize_transaction(tx, wallet):
-    base = {
-        "timestamp": tx.get("timestamp"),
-        "signature": tx.get("signature"),
-        "type": tx.get("type", "UNKNOWN"),
-        "source": tx.get("source", "UNKNOWN"),
-        "tx_status": int(tx.get("transactionError") is None),
-        "block_number": tx.get("slot"),
-    }
-
-    # Track counterparties
+class TxFields:
+    """
+    Fields every transfer row of one transaction shares.  Rows keep a reference to it instead of
+    repeating the values in a dict per row.
+    """
+    __slots__ = ('timestamp', 'signature', 'type', 'source', 'tx_status', 'block_number')
+
+    def __init__(self, tx):
+        self.timestamp = tx.get("timestamp")
+        self.signature = tx.get("signature")
+        self.type = tx.get("type", "UNKNOWN")
+        self.source = tx.get("source", "UNKNOWN")
+        self.tx_status = int(tx.get("transactionError") is None)
+        self.block_number = tx.get("slot")
+
+# Only compressed NFT rows carry a symbol; other rows leave the column out entirely
+_NO_SYMBOL = object()
+
+class TransferRecord:
+    __slots__ = ('tx', 'token_address', 'token_amount', 'direction', 'sender', 'receiver', 'counterparty', 'symbol')
+
+    def __init__(self, tx, token_address, token_amount, direction, sender, receiver, counterparty, symbol=_NO_SYMBOL):
+        self.tx = tx
+        self.token_address = token_address
+        self.token_amount = token_amount
+        self.direction = direction
+        self.sender = sender
+        self.receiver = receiver
+        self.counterparty = counterparty
+        self.symbol = symbol
+
+    def as_dict(self):
+        tx = self.tx
+        row = {
+            "timestamp": tx.timestamp,
+            "signature": tx.signature,
+            "type": tx.type,
+            "source": tx.source,
+            "tx_status": tx.tx_status,
+            "block_number": tx.block_number,
+            "token_address": self.token_address,
+            "token_amount": self.token_amount,
+            "direction": self.direction,
+            "sender": self.sender,
+            "receiver": self.receiver,
+            "counterparty": self.counterparty,
+        }
+        if self.symbol is not _NO_SYMBOL:
+            row["symbol"] = self.symbol
+        return row
+
+def transfer_records(tx, wallet):
+    """
+    The wallet's transfers in one parsed Helius transaction as TransferRecords sharing one TxFields.
+    """
+    base = None
     rows = []
-    counterparties = set()
 
     # Native transfers
     seen_native = set()
@@ -152,86 +226,81 @@ def summarize_transaction(tx, wallet):
         amount = t.get("amount", 0) / LAMPORT_SCALE
         from_user = t.get("fromUserAccount")
         to_user = t.get("toUserAccount")
-        
+
         transfer_id = (from_user, to_user, amount)
         if transfer_id in seen_native:
             continue
         seen_native.add(transfer_id)
 
         if wallet in [from_user, to_user]:
-            row = base.copy()
-            row.update({
-                "token_address": NATIVE_SOL,
-                # "symbol": "SOL",
-                "token_amount": amount,
-                "direction": "sent" if from_user == wallet else "received",
-                "sender": from_user,
-                "receiver": to_user,
-                "counterparty": to_user if from_user == wallet else from_user,
-            })
-            rows.append(row)
-
+            base = base or TxFields(tx)
+            sent = from_user == wallet
+            rows.append(TransferRecord(base, NATIVE_SOL, amount, "sent" if sent else "received", from_user, to_user,
+                                       to_user if sent else from_user))
 
     # Token transfers
     for t in tx.get("tokenTransfers", []):
+        from_user = t.get("fromUserAccount")
+        to_user = t.get("toUserAccount")
+        if wallet not in [from_user, to_user]:
+            continue
+
         try:
             amount = float(t.get("tokenAmount", 0))
         except (ValueError, TypeError):
             amount = 0.0
 
-        mint = t.get("mint", "UNKNOWN")
-        from_user = t.get("fromUserAccount")
-        to_user = t.get("toUserAccount")
+        base = base or TxFields(tx)
+        sent = from_user == wallet
+        rows.append(TransferRecord(base, t.get("mint", "UNKNOWN"), amount, "sent" if sent else "received",
+                                   from_user, to_user, to_user if sent else from_user))
 
-        row = base.copy()
-        row.update({
-            "token_address": mint,
-            "token_amount": amount,
-            "direction": "sent" if from_user == wallet else "received",
-            "sender": from_user,
-            "receiver": to_user,
-            "counterparty": to_user if from_user == wallet else from_user,
-        })
-        if wallet in [from_user, to_user]:
-            counterparties.add(row["counterparty"])
-            rows.append(row)
     if not rows:
         for acc in tx.get("accountData", []):
-            acct = acc.get("account")
-            native_change = acc.get("nativeBalanceChange", 0) / LAMPORT_SCALE
-            if acct == wallet:
-                row = base.copy()
-                row.update({
-                    "token_address": NATIVE_SOL,
-                    "token_amount": abs(native_change),
-                    "direction": "received" if native_change > 0 else "sent",
-                    "sender": None,
-                    "receiver": wallet,
-                    "counterparty": None,
-                })
-                rows.append(row)
+            if acc.get("account") == wallet:
+                native_change = acc.get("nativeBalanceChange", 0) / LAMPORT_SCALE
+                base = base or TxFields(tx)
+                rows.append(TransferRecord(base, NATIVE_SOL, abs(native_change),
+                                           "received" if native_change > 0 else "sent", None, wallet, None))
 
     for event in tx.get("events", {}).get("compressed", []):
         if event.get("type") == "COMPRESSED_NFT_MINT":
             if event.get("newLeafOwner") == wallet:
-                row = base.copy()
-                row.update({
-                    "token_address": "COMPRESSED_NFT",
-                    "token_amount": 1,
-                    "direction": "received",
-                    "sender": event.get("treeDelegate"),
-                    "receiver": wallet,
-                    "counterparty": event.get("treeDelegate"),
-                    "symbol": event.get("metadata", {}).get("name", "NFT"),
-                })
-                rows.append(row)
+                base = base or TxFields(tx)
+                rows.append(TransferRecord(base, "COMPRESSED_NFT", 1, "received", event.get("treeDelegate"), wallet,
+                                           event.get("treeDelegate"), event.get("metadata", {}).get("name", "NFT")))
 
     return rows
 
+def summarize_transaction(tx, wallet):
+    return [record.as_dict() for record in transfer_records(tx, wallet)]
+
+BALANCE_INDEX_KEYS = ['signature', 'token_address']
+
+def build_balance_index(balance_df):
+    """
+    Key the Flipside balance timeseries by (TX_ID, MINT) once per job.  Duplicate keys are kept
+    so joins against the index expand rows exactly like the old per-transaction left merge.
+    """
+    balance_df = balance_df.rename(columns=str.upper)
+    balance_index = balance_df[['TX_ID','MINT','PRE_BALANCE','BALANCE','SYMBOL','NAME']].rename(
+        columns={'TX_ID':'signature', 'MINT':'token_address'})
+
+    return balance_index.set_index(BALANCE_INDEX_KEYS)
+
+def add_balance_data(token_tx_df, balance_index):
+    """
+    Enrich transfer rows with PRE_BALANCE/BALANCE/SYMBOL/NAME in one vectorized left join.
+    """
+    combined_df = token_tx_df.join(balance_index, on=BALANCE_INDEX_KEYS, how='left')
+
+    return combined_df.reset_index(drop=True)
+
 #Helper function to create row from helius and flipside data
-def create_row(tx, wallet, balance_df):
+def create_row(tx, wallet, balance_df=None, balance_index=None):
     """
-    Takes in a tx from helius data, a wallet address, and balance timeseries data from Flipside.  Returns a df row for analysis 
+    Takes in a tx from helius data, a wallet address, and balance timeseries data from Flipside
+    (raw, or prebuilt with build_balance_index).  Returns a df row for analysis 
     """
     tx_summary = summarize_transaction(tx, wallet)
     instructions_data = get_instruction_data(tx, wallet)
@@ -245,18 +314,114 @@ def create_row(tx, wallet, balance_df):
     token_tx_df['program_id'] = instructions_data.get('programId')
     token_tx_df['tx_status'] = tx_status #if no tx error, can assume it succeeded so we use binary 1 and 0 instead of just leaving nan
 
-    balance_df.columns = balance_df.columns.str.upper()
-
-    filtered_balance_timeseries = balance_df[['PRE_BALANCE','BALANCE','SYMBOL','NAME','MINT','TX_ID']].rename(columns={'MINT':'token_address'})
-    filtered_balance_timeseries = filtered_balance_timeseries.rename(columns={'TX_ID':'signature'})
+    if balance_index is None:
+        balance_index = build_balance_index(balance_df)
 
     if not token_tx_df.empty:
-        combined_df = pd.merge(token_tx_df, filtered_balance_timeseries, on=['signature','token_address'], how='left')
+        combined_df = add_balance_data(token_tx_df, balance_index)
     else:
         combined_df = pd.DataFrame()
         
     return combined_df 
 
+TX_COLUMNS = ['timestamp', 'signature', 'type', 'source', 'tx_status', 'block_number',
+              'token_address', 'token_amount', 'direction', 'sender', 'receiver', 'counterparty']
+# Stored once per transaction and expanded to rows when the frame is built
+TX_LEVEL_COLUMNS = ['timestamp', 'signature', 'type', 'source', 'tx_status', 'block_number', 'tx_fee', 'program_id']
+RECORD_COLUMNS = ['token_address', 'token_amount', 'direction', 'sender', 'receiver', 'counterparty']
+
+class TransferColumns:
+    """
+    Column buffers for TransferRecords.  Transaction-level values are appended once per
+    transaction together with its row count, so nothing per row repeats timestamps, signatures or
+    types, and the few symbol values are kept by row position.  to_frame() expands them into the
+    create_row schema.
+    """
+    def __init__(self):
+        self.tx_columns = {col: [] for col in TX_LEVEL_COLUMNS}
+        self.row_counts = []
+        self.columns = {col: [] for col in RECORD_COLUMNS}
+        self.symbols = {}
+
+    @property
+    def has_symbol(self):
+        return bool(self.symbols)
+
+    def add(self, records, tx_status, tx_fee, program_id):
+        fields = records[0].tx
+        for col, value in (('timestamp', fields.timestamp), ('signature', fields.signature), ('type', fields.type),
+                           ('source', fields.source), ('tx_status', tx_status), ('block_number', fields.block_number),
+                           ('tx_fee', tx_fee), ('program_id', program_id)):
+            self.tx_columns[col].append(value)
+        self.row_counts.append(len(records))
+
+        token_address, token_amount, direction = (self.columns['token_address'], self.columns['token_amount'],
+                                                  self.columns['direction'])
+        sender, receiver, counterparty = self.columns['sender'], self.columns['receiver'], self.columns['counterparty']
+        for record in records:
+            if record.symbol is not _NO_SYMBOL:
+                self.symbols[len(token_address)] = record.symbol
+            token_address.append(record.token_address)
+            token_amount.append(record.token_amount)
+            direction.append(record.direction)
+            sender.append(record.sender)
+            receiver.append(record.receiver)
+            counterparty.append(record.counterparty)
+
+    def __len__(self):
+        return len(self.columns['token_address'])
+
+    def to_frame(self):
+        """
+        Build the frame, releasing each buffer once its column exists, so call it only once.
+        Every buffered transaction has at least one row, so a transaction-level column holds the
+        same set of values as a per-row list would and pandas infers the same dtype for it.
+        """
+        n_rows = len(self)
+        row_tx = np.repeat(np.arange(len(self.row_counts)), self.row_counts)
+        data = {}
+        for col in TX_COLUMNS + ['tx_fee', 'program_id']:
+            if col in self.tx_columns:
+                data[col] = pd.Series(self.tx_columns.pop(col)).array.take(row_tx)
+            else:
+                data[col] = pd.Series(self.columns.pop(col)).array
+        frame = pd.DataFrame(data, copy=False)
+
+        if self.symbols:
+            symbols = [np.nan] * n_rows
+            for position, symbol in self.symbols.items():
+                symbols[position] = symbol
+            frame['symbol'] = symbols
+        return frame
+
+def build_tx_frame(parsed_transaction_history, wallet, balance_index):
+    """
+    Single pass replacement for concatenating create_row outputs.  TransferRecords from
+    transfer_records are appended to TransferColumns, the DataFrame is built once and enriched
+    from the prebuilt balance index in one left join.  Schema matches the concatenated create_row frames.
+    """
+    buffers = TransferColumns()
+
+    for tx in parsed_transaction_history:
+        records = transfer_records(tx, wallet)
+        if not records:
+            continue
+
+        instructions_data = get_instruction_data(tx, wallet)
+        tx_status = "failed" if tx.get("transactionError") else "success"
+        buffers.add(records, tx_status, tx.get('fee') / LAMPORT_SCALE, instructions_data.get('programId'))
+
+    if not len(buffers):
+        return pd.DataFrame()
+
+    combined_df = add_balance_data(buffers.to_frame(), balance_index)
+
+    # Compressed NFT rows add a lowercase 'symbol' column, which the concat placed after the balance columns
+    if buffers.has_symbol:
+        combined_df['symbol'] = combined_df.pop('symbol')
+
+    return combined_df
+
 def clean_wallet_addresses(df):
     for col in ['sender', 'receiver', 'counterparty']:
         if col in df.columns:
@@ -265,34 +430,24 @@ def clean_wallet_addresses(df):
             df = df[~df[col].isnull()] 
     return df
 
-def construct_tx_dataset(parsed_transaction_history,prices_data,address,balance_df):
-    tx_level_data = pd.DataFrame()
-
+def construct_tx_dataset(parsed_transaction_history,prices_data,address,balance_df,balance_index=None):
     print(f'address: {address}')
-    print(f'prices_data: {prices_data}')
-    print(f'balance_df: {balance_df}')
 
-    for i in parsed_transaction_history:
-        row = create_row(i, address, balance_df)
-        tx_level_data = pd.concat([tx_level_data, row])
+    if balance_index is None:
+        balance_index = build_balance_index(balance_df)
 
-    print(f'tx_level_data: {tx_level_data.columns}\n{tx_level_data}')
-
-    tx_level_data = clean_wallet_addresses(tx_level_data)
+    tx_level_data = build_tx_frame(parsed_transaction_history, address, balance_index)
 
-    # breakpoint()
+    if DEBUG_LOGGING:
+        print(f'tx_level_data: {tx_level_data.columns}\n{tx_level_data}')
 
-    # tx_level_data['timestamp'] = tx_level_data['dt']
+    tx_level_data = clean_wallet_addresses(tx_level_data)
 
     tx_level_data['timestamp'] = pd.to_datetime(tx_level_data['timestamp'], unit='s')
     tx_level_data.rename(columns={'BALANCE':'POST_BALANCE','NAME':'TOKEN_NAME'},inplace=True)
-    
-    print(f'prices_data: {prices_data}')
 
     tx_level_data = add_price_data(tx_level_data, prices_data)
 
-    print(f'tx_level_data in construct dataset: {tx_level_data}')
-
     return tx_level_data
 
 def add_price_data(tx_level_data, prices_data):
@@ -4,12 +4,20 @@ import os
 import pandas as pd
 import time
 import json
+import re
+import sys
+import threading
+import numpy as np
+from functools import lru_cache
 
-from src.data_fetching import get_vybe_identified_accounts, get_vybe_identified_programs
+from src.data_fetching import get_vybe_identified_accounts, get_vybe_identified_programs, CACHE_DIR
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project 
 METASLEUTH_PATH = os.path.join(ROOT_DIR, 'data', 'raw', 'metasleuth_labels.json')
 RAW_DATA_PATH = os.path.join(ROOT_DIR, 'data', 'raw')
+VYBE_ACCOUNTS_PATH = os.path.join(CACHE_DIR, 'vybe_identified_accounts.json')
+VYBE_PROGRAMS_PATH = os.path.join(CACHE_DIR, 'vybe_identified_programs.json')
+LABEL_RELOAD_INTERVAL = float(os.getenv('LABEL_RELOAD_INTERVAL', 30))
 
 # Apply labeling logic
 def label_entity(row):
@@ -22,18 +30,40 @@ def label_entity(row):
     else:
         return 'Normal User'
 
+FLIPSIDE_LABEL_FILES = ['solana_cex_labels','solana_chadmin','solana_dapp_labels','solana_defi_labels']
+FLIPSIDE_CEX_LABEL_FILE = 'solana_cex_labels'
+
+def flipside_label_paths():
+    return [os.path.join(RAW_DATA_PATH, f'{file}.csv') for file in FLIPSIDE_LABEL_FILES]
+
 def load_flipside_labels():
-    flipside_files = ['solana_cex_labels','solana_chadmin','solana_dapp_labels','solana_defi_labels']
-    flipside_labels_df = pd.DataFrame()
-    for file in flipside_files:
-        dir = f'{file}.csv'
-        path = os.path.join(RAW_DATA_PATH, dir)
-        df = pd.read_csv(path, on_bad_lines='skip').dropna()
-        flipside_labels_df = pd.concat([flipside_labels_df,df])
-        flipside_labels_dict = dict(zip(flipside_labels_df['ADDRESS'], flipside_labels_df['ADDRESS_NAME']))
+    frames = []
+    for path in flipside_label_paths():
+        if not os.path.exists(path):
+            print(f'Flipside label file missing, skipping: {path}')
+            continue
+        frames.append(pd.read_csv(path, on_bad_lines='skip').dropna())
+
+    if not frames:
+        return {}
+
+    flipside_labels_df = pd.concat(frames)
+    flipside_labels_dict = dict(zip(flipside_labels_df['ADDRESS'], flipside_labels_df['ADDRESS_NAME']))
 
     return flipside_labels_dict
 
+def load_cex_addresses():
+    """
+    Lower-cased addresses of the Flipside centralized exchange label set.
+    """
+    path = os.path.join(RAW_DATA_PATH, f'{FLIPSIDE_CEX_LABEL_FILE}.csv')
+    if not os.path.exists(path):
+        return frozenset()
+    cex_df = pd.read_csv(path, on_bad_lines='skip')
+    if 'LABEL_TYPE' in cex_df.columns:
+        cex_df = cex_df[cex_df['LABEL_TYPE'].astype(str).str.lower() == 'cex']
+    return frozenset(cex_df['ADDRESS'].dropna().astype(str).str.lower())
+
 def load_vybe_labels():
     vybe_programs_map = get_vybe_identified_programs()
     vybe_addresses_map = get_vybe_identified_accounts()
@@ -63,69 +93,150 @@ def load_metasleuth_labels():
 
     return entities_dict
 
-def classify_category(entity):
-    entity = entity.lower()
-
-    # Exchanges
-    if any(keyword in entity for keyword in ['openbook', 'raydium', 'orca', 'jupiter', 'meteora', 'coinbase']):
-        return 'Exchange'
-
+# Checked in order; the first category with a keyword contained in the label wins
+CATEGORY_KEYWORDS = [
+    ('Exchange', ['openbook', 'raydium', 'orca', 'jupiter', 'meteora', 'coinbase']),
     # NFT Traders or Platforms
-    if any(keyword in entity for keyword in ['magic eden', 'nft', 'digitaleyes', 'tensor']):
-        return 'NFT Trader'
-
+    ('NFT Trader', ['magic eden', 'nft', 'digitaleyes', 'tensor']),
     # Rug pulls (hardcoded suspicious names or memes)
-    if any(keyword in entity for keyword in ['rug', 'bricked', 'scam', 'meme']):
-        return 'Rug Pull'
-    
-    if any(keyword in entity for keyword in ['allbridge']):
-        return 'Bridge'
-    
-    if any(keyword in entity for keyword in ['airdrop','pengu']):
-        return 'Airdrop'
-
+    ('Rug Pull', ['rug', 'bricked', 'scam', 'meme']),
+    ('Bridge', ['allbridge']),
+    ('Airdrop', ['airdrop','pengu']),
     # DeFi protocols
-    if any(keyword in entity for keyword in ['uxd', 'usdh', 'softt', 'vault', 'solend', 'lending','lend','kamino','parcl']):
-        return 'DeFi Protocol'
+    ('DeFi Protocol', ['uxd', 'usdh', 'softt', 'vault', 'solend', 'lending','lend','kamino','parcl']),
+]
+CATEGORY_PATTERNS = [(category, re.compile('|'.join(re.escape(k) for k in keywords)))
+                     for category, keywords in CATEGORY_KEYWORDS]
+
+@lru_cache(maxsize=65536)
+def classify_category(entity):
+    entity = entity.lower()
+
+    for category, pattern in CATEGORY_PATTERNS:
+        if pattern.search(entity):
+            return category
 
     # Default fallback
     return 'Other'
 
-def add_entity_labels(df_og, address):
-
-    df = df_og.copy()
+def map_unique(values, fn, na_value):
+    """
+    Apply `fn` once per distinct value and broadcast the results back by factorized codes.
+    Missing values get `na_value`.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([fn(u) for u in uniques] + [na_value], dtype=object)
+    return pd.Series(mapped[codes], index=values.index)
+
+def label_addresses(addresses, label_map, default):
+    return map_unique(addresses.astype(str), lambda addr: label_map.get(addr.lower(), default), default)
+
+def classify_labels(labels):
+    return map_unique(labels, classify_category, None)
+
+class LabelIndex:
+    """
+    Immutable, lower-cased address and program label maps built from every label source.
+    Precedence for addresses is Vybe < MetaSleuth < Flipside.  `cex_addresses` is the Flipside
+    CEX label set.  Shared read-only by all jobs.
+    """
+    def __init__(self, address_labels, program_labels, source_mtimes, load_seconds, cex_addresses=frozenset()):
+        self.address_labels = address_labels
+        self.program_labels = program_labels
+        self.cex_addresses = cex_addresses
+        self.source_mtimes = source_mtimes
+        self.load_seconds = load_seconds
+
+    def stats(self):
+        approx_bytes = 0
+        for mapping in (self.address_labels, self.program_labels):
+            approx_bytes += sys.getsizeof(mapping)
+            approx_bytes += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in mapping.items())
+        return {
+            'addresses': len(self.address_labels),
+            'programs': len(self.program_labels),
+            'cex_addresses': len(self.cex_addresses),
+            'load_seconds': round(self.load_seconds, 4),
+            'approx_bytes': approx_bytes,
+        }
+
+def label_source_paths():
+    return flipside_label_paths() + [VYBE_ACCOUNTS_PATH, VYBE_PROGRAMS_PATH, METASLEUTH_PATH]
+
+def label_source_mtimes():
+    return {path: os.path.getmtime(path) if os.path.exists(path) else None for path in label_source_paths()}
+
+def build_label_index():
+    started = time.perf_counter()
+    source_mtimes = label_source_mtimes()
 
     flipside_labels_dict = load_flipside_labels()
     vybe_programs_map, vybe_addresses_map = load_vybe_labels()
     entities_dict = load_metasleuth_labels()
 
-    # Normalize mapping keys
+    # Normalize mapping keys; later sources win
+    combined_address_label_map = {}
+    for source in (vybe_addresses_map, entities_dict, flipside_labels_dict): # vybe < metasleuth < flipside
+        combined_address_label_map.update((str(k).lower(), v) for k, v in source.items())
     vybe_programs_map = {k.lower(): v for k, v in vybe_programs_map.items()}
-    vybe_addresses_map = {k.lower(): v for k, v in vybe_addresses_map.items()}
-    entities_dict = {k.lower(): v for k, v in entities_dict.items()} # metasleuth
-    flipside_labels_dict = {k.lower(): v for k, v in flipside_labels_dict.items()} # flipside
-    combined_address_label_map = {
-        **vybe_addresses_map,
-        **entities_dict,
-        **flipside_labels_dict
-    }
-
-    # Apply human-readable labels to tx-level DataFrame
-    df['sender_name'] = df['sender'].astype(str).str.lower().map(
-        lambda addr: combined_address_label_map.get(addr, 'Unknown Address'))
-
-    df['receiver_name'] = df['receiver'].astype(str).str.lower().map(
-        lambda addr: combined_address_label_map.get(addr, 'Unknown Address'))
-
-    df['counterparty_name'] = df['counterparty'].astype(str).str.lower().map(
-        lambda addr: combined_address_label_map.get(addr, 'Unknown Address'))
-
-    df['program_name'] = df['program_id'].astype(str).str.lower().map(
-        lambda pid: vybe_programs_map.get(pid, 'Unknown Program'))
-    
-    df['sender_category'] = df['sender_name'].apply(classify_category)
-    df['receiver_category'] = df['receiver_name'].apply(classify_category)
-    df['program_category'] = df['program_name'].apply(classify_category)
+
+    index = LabelIndex(combined_address_label_map, vybe_programs_map, source_mtimes, time.perf_counter() - started,
+                       load_cex_addresses())
+    print(f'Label index loaded: {index.stats()}')
+    return index
+
+_label_index = None
+_label_index_checked = 0.0
+_label_index_lock = threading.Lock()
+
+def get_label_index(max_staleness=LABEL_RELOAD_INTERVAL):
+    """
+    Process-wide label index.  Built on first use; at most every `max_staleness` seconds the
+    source files are checked and, if any changed on disk, a new index is built and swapped in.
+    Jobs already holding the old index keep using it.
+    """
+    global _label_index, _label_index_checked
+
+    index = _label_index
+    if index is not None and time.monotonic() - _label_index_checked < max_staleness:
+        return index
+
+    # One thread checks/rebuilds; others keep serving the current index meanwhile
+    if not _label_index_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _label_index is None or label_source_mtimes() != _label_index.source_mtimes:
+            _label_index = build_label_index()
+        _label_index_checked = time.monotonic()
+        return _label_index
+    finally:
+        _label_index_lock.release()
+
+def load_label_maps():
+    """
+    Returns (combined_address_label_map, vybe_programs_map) with lower-cased keys from the
+    shared label index.  Independent of the wallet, so it can load while transactions are fetched.
+    """
+    index = get_label_index()
+    return index.address_labels, index.program_labels
+
+def add_entity_labels(df_og, address, label_maps=None):
+
+    df = df_og.copy()
+
+    if label_maps is None:
+        label_maps = load_label_maps()
+    combined_address_label_map, vybe_programs_map = label_maps
+
+    # Apply human-readable labels to tx-level DataFrame, looking up each distinct address once
+    df['sender_name'] = label_addresses(df['sender'], combined_address_label_map, 'Unknown Address')
+    df['receiver_name'] = label_addresses(df['receiver'], combined_address_label_map, 'Unknown Address')
+    df['counterparty_name'] = label_addresses(df['counterparty'], combined_address_label_map, 'Unknown Address')
+    df['program_name'] = label_addresses(df['program_id'], vybe_programs_map, 'Unknown Program')
+
+    df['sender_category'] = classify_labels(df['sender_name'])
+    df['receiver_category'] = classify_labels(df['receiver_name'])
+    df['program_category'] = classify_labels(df['program_name'])
     
     df['wallet_entity_label'] = combined_address_label_map.get(address.lower(), 'Unknown Entity')
 
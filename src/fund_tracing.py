@@ -0,0 +1,196 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.data_fetching import V0_BATCH_SIZE, V0_FIELDS, hydrate_batch_into, iter_signature_pages
+from src.entity_labeling import classify_category, get_label_index
+from src.metadata import LAMPORT_SCALE, NATIVE_SOL
+from src.tx_store import get_tx_store
+
+# Expansion stops at wallets labeled with one of these categories (funds leave traceable custody)
+TRACE_STOP_CATEGORIES = ('Exchange', 'Bridge')
+# ...and at centralized exchanges: the Flipside CEX label set, or labels from other sources naming one.
+# classify_category's 'Exchange' keywords are mostly DEXes, so these need their own check.
+CEX_LABEL_PATTERN = re.compile(r'binance|coinbase|kraken|okx|bybit|kucoin|bitget|gate\.io|huobi|\bhtx\b|mexc|'
+                               r'bitfinex|crypto\.com|\bftx\b|upbit|bitstamp|gemini|bitmart|\bcex\b', re.IGNORECASE)
+
+DIRECTIONS = {
+    'upstream': ('upstream',),
+    'downstream': ('downstream',),
+    'both': ('upstream', 'downstream'),
+}
+
+def transfer_edges(tx):
+    """
+    (sender, receiver, token_address, amount) for every native and token transfer in a parsed
+    Helius transaction.  Native amounts are in SOL.
+    """
+    edges = []
+    for t in tx.get('nativeTransfers') or []:
+        edges.append((t.get('fromUserAccount'), t.get('toUserAccount'), NATIVE_SOL,
+                      (t.get('amount') or 0) / LAMPORT_SCALE))
+    for t in tx.get('tokenTransfers') or []:
+        try:
+            amount = float(t.get('tokenAmount', 0))
+        except (ValueError, TypeError):
+            amount = 0.0
+        edges.append((t.get('fromUserAccount'), t.get('toUserAccount'), t.get('mint', 'UNKNOWN'), amount))
+    return [edge for edge in edges if edge[0] and edge[1] and edge[0] != edge[1]]
+
+def terminal_reason(wallet, label, category, cex_addresses, stop_categories=TRACE_STOP_CATEGORIES):
+    """
+    Why tracing should not expand past `wallet`: 'cex' for a centralized exchange, 'label' for a
+    label in `stop_categories`, otherwise None.
+    """
+    if wallet.lower() in cex_addresses or (label and CEX_LABEL_PATTERN.search(label)):
+        return 'cex'
+    if category in stop_categories:
+        return 'label'
+    return None
+
+def past(deadline):
+    return deadline is not None and time.monotonic() > deadline
+
+def fetch_level_signatures(wallets, helius_api_key, store, max_pages=1, limit=100, concurrency=4, deadline=None):
+    """
+    One batch of getSignaturesForAddress calls for a whole frontier.  Returns {wallet: [signature, ...]}.
+    Past the monotonic `deadline` no further page is requested.
+    """
+    def fetch(wallet):
+        infos = []
+        if past(deadline):
+            return infos
+        for page in iter_signature_pages(wallet, helius_api_key, max_pages=max_pages, limit=limit):
+            infos.extend(page)
+            if past(deadline):
+                break
+        return infos
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        infos_by_wallet = dict(zip(wallets, pool.map(fetch, wallets)))
+
+    store.add_signature_map(infos_by_wallet)
+    return {wallet: [info['signature'] for info in infos if info.get('signature')]
+            for wallet, infos in infos_by_wallet.items()}
+
+def hydrate_signatures(signatures, helius_api_key, store, concurrency=4, deadline=None):
+    """
+    Parsed transactions for `signatures`, fetching only those not already in the TxStore.
+    Batches not started by the monotonic `deadline` are skipped.  Returns (transactions,
+    number fetched upstream).
+    """
+    missing = store.missing(signatures)
+    batches = [missing[i:i + V0_BATCH_SIZE] for i in range(0, len(missing), V0_BATCH_SIZE)]
+
+    def hydrate(args):
+        batch_number, batch = args
+        if past(deadline):
+            return 0
+        hydrate_batch_into(store, batch, helius_api_key, batch_number)
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        fetched = sum(pool.map(hydrate, enumerate(batches)))
+
+    return store.get_many(signatures, V0_FIELDS), fetched
+
+def trace_funds(address, helius_api_key, max_hops=3, direction='both', max_nodes=10000, max_transactions=100000,
+                time_budget=300, max_pages=1, limit=100, concurrency=4, stop_categories=TRACE_STOP_CATEGORIES,
+                label_index=None, store=None):
+    """
+    Follow funds from `address` up to `max_hops` hops upstream (who paid in) and/or downstream
+    (where it went).  Each hop expands the whole frontier as one batch: signatures for every
+    frontier wallet, then one hydration pass over the signatures not seen at an earlier hop.
+    Wallets are visited at most once, centralized exchanges and labeled wallets in
+    `stop_categories` are kept as leaves (see terminal_reason), and expansion stops early once
+    the node, transaction or time budget runs out.  The time budget is also checked between
+    signature pages and hydration batches, so one large hop cannot overrun it.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f'direction must be one of {sorted(DIRECTIONS)}')
+    store = store or get_tx_store()
+    label_index = label_index or get_label_index()
+    address_labels = label_index.address_labels
+    started = time.monotonic()
+    deadline = started + time_budget
+
+    def node_entry(wallet, hop, node_direction):
+        label = address_labels.get(wallet.lower())
+        category = classify_category(label) if label else None
+        return {'address': wallet, 'hop': hop, 'direction': node_direction, 'label': label, 'category': category,
+                'stopped': terminal_reason(wallet, label, category, label_index.cex_addresses, stop_categories)}
+
+    nodes = {address: node_entry(address, 0, direction)}
+    nodes[address]['stopped'] = None  # Always expand the wallet under analysis
+    frontier = {address: DIRECTIONS[direction]}
+    edges = []
+    seen_signatures = set()
+    stats = {'levels': 0, 'signatures': 0, 'hydrated': 0, 'truncated': None}
+
+    for hop in range(1, max_hops + 1):
+        if not frontier:
+            break
+        if past(deadline):
+            stats['truncated'] = 'time'
+            break
+
+        signature_map = fetch_level_signatures(list(frontier), helius_api_key, store, max_pages, limit, concurrency,
+                                               deadline)
+        level_signatures = []
+        for signatures in signature_map.values():
+            for signature in signatures:
+                if signature not in seen_signatures:
+                    seen_signatures.add(signature)
+                    level_signatures.append(signature)
+
+        remaining = max_transactions - stats['signatures']
+        if len(level_signatures) > remaining:
+            level_signatures = level_signatures[:remaining]
+            stats['truncated'] = 'transactions'
+        if past(deadline):
+            stats['truncated'] = 'time'
+            break
+
+        txs, hydrated = hydrate_signatures(level_signatures, helius_api_key, store, concurrency, deadline)
+        if past(deadline):
+            # Edges from what was hydrated in time are kept, but the trace goes no deeper
+            stats['truncated'] = 'time'
+        stats['levels'] = hop
+        stats['signatures'] += len(level_signatures)
+        stats['hydrated'] += hydrated
+
+        next_frontier = {}
+        for tx in txs:
+            for sender, receiver, token_address, amount in transfer_edges(tx):
+                followed = []
+                if 'upstream' in frontier.get(receiver, ()):
+                    followed.append((sender, 'upstream'))
+                if 'downstream' in frontier.get(sender, ()):
+                    followed.append((receiver, 'downstream'))
+                if not followed:
+                    continue
+
+                edges.append({'signature': tx.get('signature'), 'timestamp': tx.get('timestamp'), 'hop': hop,
+                              'sender': sender, 'receiver': receiver, 'token_address': token_address,
+                              'amount': amount})
+
+                for counterparty, edge_direction in followed:
+                    if counterparty in nodes:
+                        continue
+                    if len(nodes) >= max_nodes:
+                        stats['truncated'] = 'nodes'
+                        continue
+                    nodes[counterparty] = node_entry(counterparty, hop, edge_direction)
+                    if nodes[counterparty]['stopped'] is None:
+                        next_frontier[counterparty] = (edge_direction,)
+
+        if stats['truncated'] is not None:
+            break
+        frontier = next_frontier
+
+    stats['nodes'] = len(nodes)
+    stats['edges'] = len(edges)
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    print(f'Fund trace for {address}: {stats}')
+
+    return {'address': address, 'nodes': list(nodes.values()), 'edges': edges, 'stats': stats}
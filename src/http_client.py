@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metrics import RATE_LIMIT_WAIT, UPSTREAM_RETRIES, observe_upstream
+from src.transport import transport_from_env
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Requests per second and burst size per upstream provider.  Override with e.g.
+# HELIUS_RATE_LIMIT=20 HELIUS_BURST=40 or at runtime with configure_limit().
+DEFAULT_LIMITS = {
+    'helius': (10, 10),
+    'flipside': (5, 5),
+    'vybe': (5, 5),
+    'blocksec': (5, 5),
+}
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+MAX_429_RETRIES = 3
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.  acquire() blocks until a token is available and returns the
+    seconds spent waiting.  One bucket per provider is shared by every job in the process.
+    """
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds):
+        # Upstream said slow down: push the whole provider budget back by `seconds`
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= seconds * self.rate
+
+_buckets = {}
+_sessions = {}
+_transport = None
+_lock = threading.Lock()
+
+def _env_limit(provider):
+    rate, burst = DEFAULT_LIMITS.get(provider, (5, 5))
+    prefix = provider.upper()
+    return float(os.getenv(f'{prefix}_RATE_LIMIT', rate)), float(os.getenv(f'{prefix}_BURST', burst))
+
+def configure_limit(provider, rate, burst=None):
+    with _lock:
+        _buckets[provider] = TokenBucket(rate, burst if burst is not None else rate)
+
+def get_bucket(provider):
+    with _lock:
+        if provider not in _buckets:
+            _buckets[provider] = TokenBucket(*_env_limit(provider))
+        return _buckets[provider]
+
+def get_session(url):
+    """
+    One keep-alive session per scheme://host, shared across worker threads.
+    """
+    parts = urlsplit(url)
+    host = f'{parts.scheme}://{parts.netloc}'
+    with _lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount(host, adapter)
+            _sessions[host] = session
+        return _sessions[host]
+
+def set_transport(transport):
+    """
+    Route every upstream request through `transport` (see src.transport): live, recording to
+    cassettes, or replaying them.  By default it comes from UPSTREAM_TRANSPORT.
+    """
+    global _transport
+    with _lock:
+        _transport = transport
+
+def get_transport():
+    global _transport
+    with _lock:
+        if _transport is None:
+            _transport = transport_from_env()
+        return _transport
+
+def _body_size(body):
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+def _response_size(response, streamed):
+    # A streamed body is left for the caller to read, so fall back to its declared length
+    if streamed and not response._content_consumed:
+        return int(response.headers.get('Content-Length') or 0)
+    return len(response.content)
+
+def _send(provider, session, method, url, kwargs):
+    # One upstream round trip, recorded in src.metrics (latency, status, bytes each way)
+    transport = get_transport()
+    start = time.monotonic()
+    try:
+        response = transport.send(provider, session, method, url, kwargs)
+    except requests.RequestException:
+        observe_upstream(provider, 'error', time.monotonic() - start, 0, 0)
+        raise
+    observe_upstream(provider, str(response.status_code), time.monotonic() - start,
+                     _body_size(response.request.body), _response_size(response, kwargs.get('stream')))
+    return response
+
+def request(provider, method, url, **kwargs):
+    """
+    Rate-limited request through the shared session for `url`'s host.  429s penalize the
+    provider bucket (honouring Retry-After) and are retried up to MAX_429_RETRIES times.
+    """
+    bucket = get_bucket(provider)
+    session = get_session(url)
+
+    for attempt in range(MAX_429_RETRIES + 1):
+        RATE_LIMIT_WAIT.observe(bucket.acquire(), provider=provider)
+        response = _send(provider, session, method, url, kwargs)
+        if response.status_code != 429 or attempt == MAX_429_RETRIES:
+            return response
+        retry_after = response.headers.get('Retry-After')
+        try:
+            backoff = float(retry_after)
+        except (TypeError, ValueError):
+            backoff = 2 ** attempt
+        response.close()  # hand the pooled connection back before waiting for the retry
+        print(f'[{provider}] 429 received, backing off {backoff}s')
+        UPSTREAM_RETRIES.inc(provider=provider, reason='rate_limited')
+        bucket.penalize(backoff)
+
+def post(provider, url, **kwargs):
+    return request(provider, 'POST', url, **kwargs)
+
+def get(provider, url, **kwargs):
+    return request(provider, 'GET', url, **kwargs)
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
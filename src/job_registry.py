@@ -0,0 +1,176 @@
+import itertools
+import math
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+# Lower runs first.  Interactive requests jump ahead of queued batch backfills.
+PRIORITIES = {'interactive': 0, 'batch': 1}
+JOB_QUEUE_LIMITS = {
+    'interactive': int(os.getenv('JOB_QUEUE_LIMIT_INTERACTIVE', 16)),
+    'batch': int(os.getenv('JOB_QUEUE_LIMIT_BATCH', 64)),
+}
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', 1000))
+DEFAULT_JOB_SECONDS = 30
+
+class QueueFull(Exception):
+    def __init__(self, priority, retry_after):
+        super().__init__(f'{priority} queue is full, retry after {retry_after}s')
+        self.priority = priority
+        self.retry_after = retry_after
+
+class Job:
+    def __init__(self, job_id, fn, args, priority):
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.state = 'queued'
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.submissions = 1
+        self.events = []
+
+    def status(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.state,
+            'priority': self.priority,
+            'submissions': self.submissions,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+def _without_result(data):
+    if isinstance(data, dict) and 'result' in data:
+        return {key: value for key, value in data.items() if key != 'result'}
+    return data
+
+class JobRegistry:
+    """
+    Tracks every job from submission to completion and runs them on `max_workers` threads.
+    A job_id that is already queued or running is merged into the existing job instead of
+    starting a second run.  Each priority lane holds at most JOB_QUEUE_LIMITS queued jobs;
+    beyond that submit() raises QueueFull with a Retry-After estimate.  Finished jobs are kept
+    (most recent JOB_HISTORY_SIZE) so status polls are answered from memory.
+
+    Jobs can publish(job_id, event, data) progress and partial results while they run; the
+    registry appends a final 'done' or 'failed' event.  wait_events() lets streaming clients
+    follow a job's event log.  Once a job finishes, the 'result' payloads are dropped from its
+    events: the final result lives in the ResultStore, and retained jobs keep only the metadata.
+    """
+    def __init__(self, max_workers=4, queue_limits=None, history_size=JOB_HISTORY_SIZE):
+        self.max_workers = max_workers
+        self.queue_limits = dict(queue_limits or JOB_QUEUE_LIMITS)
+        self.history_size = history_size
+        self.active = {}
+        self.finished = OrderedDict()
+        self.queued_counts = {priority: 0 for priority in PRIORITIES}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.avg_seconds = None
+
+        for i in range(max_workers):
+            threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True).start()
+
+    def submit(self, job_id, fn, *args, priority='interactive'):
+        """
+        Returns (job, created).  created is False when the submission was merged into a job
+        that is already queued or running.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f'priority must be one of {sorted(PRIORITIES)}')
+
+        with self.lock:
+            job = self.active.get(job_id)
+            if job is not None:
+                job.submissions += 1
+                return job, False
+
+            if self.queued_counts[priority] >= self.queue_limits[priority]:
+                raise QueueFull(priority, self._retry_after(priority))
+
+            job = Job(job_id, fn, args, priority)
+            self.active[job_id] = job
+            self.finished.pop(job_id, None)
+            self.queued_counts[priority] += 1
+            self.queue.put((PRIORITIES[priority], next(self.sequence), job))
+        return job, True
+
+    def _retry_after(self, priority):
+        # Jobs that run before a new one in this lane, spread over the workers
+        ahead = sum(count for lane, count in self.queued_counts.items() if PRIORITIES[lane] <= PRIORITIES[priority])
+        avg_seconds = self.avg_seconds or DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(ahead * avg_seconds / self.max_workers))
+
+    def _worker(self):
+        while True:
+            _, _, job = self.queue.get()
+            with self.lock:
+                self.queued_counts[job.priority] -= 1
+                job.state = 'running'
+                job.started_at = time.time()
+
+            try:
+                job.fn(*job.args)
+                state, error = 'done', None
+            except Exception as e:
+                print(f'[Job {job.job_id}] failed: {e}')
+                state, error = 'failed', str(e)
+
+            with self.lock:
+                job.state = state
+                job.error = error
+                job.finished_at = time.time()
+                job.events = [(event, _without_result(data)) for event, data in job.events]
+                job.events.append((state, {'job_id': job.job_id, 'error': error}))
+                self.changed.notify_all()
+                duration = job.finished_at - job.started_at
+                self.avg_seconds = duration if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * duration
+                del self.active[job.job_id]
+                self.finished[job.job_id] = job
+                while len(self.finished) > self.history_size:
+                    self.finished.popitem(last=False)
+
+    def publish(self, job_id, event, data):
+        with self.lock:
+            job = self.active.get(job_id)
+            if job is None:
+                return
+            job.events.append((event, data))
+            self.changed.notify_all()
+
+    def wait_events(self, job, after=0, timeout=15):
+        """
+        Events of `job` from index `after` on, waiting up to `timeout` seconds for a new one.
+        Returns (events, finished).
+        """
+        with self.changed:
+            if len(job.events) <= after and job.state not in ('done', 'failed'):
+                self.changed.wait(timeout)
+            return job.events[after:], job.state in ('done', 'failed')
+
+    def get(self, job_id):
+        with self.lock:
+            return self.active.get(job_id) or self.finished.get(job_id)
+
+    def forget_finished(self):
+        with self.lock:
+            self.finished.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': dict(self.queued_counts),
+                'running': sum(1 for job in self.active.values() if job.state == 'running'),
+                'finished': len(self.finished),
+                'avg_job_seconds': self.avg_seconds,
+            }
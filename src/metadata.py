@@ -1,3 +1,5 @@
 LAMPORT_SCALE = 1e9
 WRAPPED_SOL = "So11111111111111111111111111111111111111112"
-NATIVE_SOL  = "So11111111111111111111111111111111111111111" # We apply wSOL price to SOL price
\ No newline at end of file
+NATIVE_SOL  = "So11111111111111111111111111111111111111111" # We apply wSOL price to SOL price
+# Tokens priced through another token's feed, resolved at price lookup time
+PRICE_ALIASES = {NATIVE_SOL: WRAPPED_SOL}
@@ -0,0 +1,192 @@
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Formatting whole DataFrames into log lines is slow on large wallets; only do it when asked
+DEBUG_LOGGING = os.getenv('DEBUG_LOGGING', '').lower() in ('1', 'true', 'yes')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** exponent for exponent in range(10, 34, 2))  # 1 KiB .. 8 GiB
+ROWS_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+# ru_maxrss is KiB on Linux and bytes on macOS
+_MAXRSS_SCALE = 1 if sys.platform == 'darwin' else 1024
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f'expected labels {labelnames}, got {sorted(labels)}')
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # key -> [per-bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, counts in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(counts[-1])}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f'metric {metric.name} already registered')
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram('pipeline_stage_seconds', 'Wall time of pipeline stages, all attempts included.',
+                                   ['stage', 'status'])
+STAGE_CPU_SECONDS = REGISTRY.histogram('pipeline_stage_cpu_seconds', 'CPU time of the last attempt of a stage.',
+                                       ['stage'])
+STAGE_RSS_DELTA = REGISTRY.histogram('pipeline_stage_peak_rss_delta_bytes',
+                                     'Growth of the peak RSS of the process running a stage.', ['stage'],
+                                     buckets=(0,) + BYTES_BUCKETS)
+STAGE_ROWS = REGISTRY.histogram('pipeline_stage_rows', 'Rows or records produced by a stage.', ['stage'],
+                                buckets=ROWS_BUCKETS)
+STAGE_RETRIES = REGISTRY.counter('pipeline_stage_retries_total', 'Stage attempts that failed and were retried.',
+                                 ['stage'])
+
+UPSTREAM_SECONDS = REGISTRY.histogram('upstream_request_seconds', 'Upstream HTTP request latency.',
+                                      ['provider', 'status'])
+UPSTREAM_BYTES = REGISTRY.counter('upstream_bytes_total', 'Bytes sent to and received from upstream providers.',
+                                  ['provider', 'direction'])
+UPSTREAM_RETRIES = REGISTRY.counter('upstream_retries_total', 'Upstream calls retried, by reason.',
+                                    ['provider', 'reason'])
+RATE_LIMIT_WAIT = REGISTRY.histogram('upstream_rate_limit_wait_seconds',
+                                     'Time spent waiting on the shared per-provider rate limiter.', ['provider'])
+
+QUERY_CACHE_EVENTS = REGISTRY.counter('query_cache_events_total',
+                                      'Flipside query cache lookups and evictions, by outcome.', ['event'])
+
+def peak_rss_bytes():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_SCALE
+
+@contextmanager
+def resource_usage(usage, cpu_clock=time.thread_time):
+    """
+    Fills `usage` with the CPU seconds (of the calling thread by default) and the growth of the
+    process peak RSS over the block.  Concurrent stages share one process peak, so the RSS delta
+    is attributed to whichever stage pushed the peak up.
+    """
+    cpu_start = cpu_clock()
+    rss_start = peak_rss_bytes()
+    try:
+        yield usage
+    finally:
+        usage['cpu_seconds'] = cpu_clock() - cpu_start
+        usage['peak_rss_delta_bytes'] = peak_rss_bytes() - rss_start
+
+def row_count(result):
+    # Anything sized counts (frames, lists, lazy histories); tuples are several results, not rows
+    if isinstance(result, (str, bytes, tuple)) or not hasattr(result, '__len__'):
+        return None
+    return len(result)
+
+def observe_stage(entry):
+    """
+    Record a finished run_stages timeline entry.
+    """
+    stage = entry['stage']
+    STAGE_SECONDS.observe(entry['duration'], stage=stage, status=entry['status'])
+    if entry['attempts'] > 1:
+        STAGE_RETRIES.inc(entry['attempts'] - 1, stage=stage)
+    if entry.get('cpu_seconds') is not None:
+        STAGE_CPU_SECONDS.observe(entry['cpu_seconds'], stage=stage)
+    if entry.get('peak_rss_delta_bytes') is not None:
+        STAGE_RSS_DELTA.observe(entry['peak_rss_delta_bytes'], stage=stage)
+    if entry.get('rows') is not None:
+        STAGE_ROWS.observe(entry['rows'], stage=stage)
+
+def observe_upstream(provider, status, seconds, sent_bytes, received_bytes):
+    UPSTREAM_SECONDS.observe(seconds, provider=provider, status=status)
+    UPSTREAM_BYTES.inc(sent_bytes, provider=provider, direction='sent')
+    UPSTREAM_BYTES.inc(received_bytes, provider=provider, direction='received')
+
+def render_metrics():
+    return REGISTRY.render()
@@ -0,0 +1,220 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from src.columnar import decode_value, encode_value
+from src.metrics import observe_stage, resource_usage, row_count
+from src.profiling import failure_stats, profile_stats
+
+class StageError(Exception):
+    def __init__(self, stage, error):
+        super().__init__(f'{stage} failed: {error}')
+        self.stage = stage
+        self.error = error
+
+class Stage:
+    """
+    One node of the analysis DAG.  `fn` is called with the results of `deps` as keyword
+    arguments (named after the dependency stages).  Each attempt is bounded by `timeout`
+    seconds and failed attempts are retried `retries` times, `retry_delay` seconds apart.  A
+    timed-out attempt cannot be stopped, so it is only retried if that attempt exits within
+    `retry_delay`; two copies of a stage never run at once.
+    `cpu=True` marks a CPU-bound stage that runs on the process pool when run_stages has one;
+    its `fn` must then be picklable (a module-level function or a partial of one).
+    `optional=True` marks a side step whose failure is logged and recorded in the timeline but
+    does not fail the run; no other stage may depend on it.
+    """
+    def __init__(self, name, fn, deps=(), retries=0, retry_delay=2, timeout=None, cpu=False, optional=False):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.cpu = cpu
+        self.optional = optional
+
+class StageTimeout(TimeoutError):
+    def __init__(self, timeout, worker):
+        super().__init__(f'timed out after {timeout}s')
+        self.worker = worker
+
+def call_with_timeout(fn, kwargs, timeout):
+    if timeout is None:
+        return fn(**kwargs)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn(**kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    # The worker cannot be killed; on timeout it is abandoned and its result discarded
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise StageTimeout(timeout, worker)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+def call_measured(fn, usage, **kwargs):
+    with resource_usage(usage):
+        return fn(**kwargs)
+
+def run_encoded(fn, encoded_kwargs, profile=False):
+    # Process-pool side of a CPU stage: DataFrames arrive and leave in columnar form.  A worker
+    # runs one stage at a time, so its whole process CPU time belongs to this stage.
+    usage = {}
+    stats = None
+    with resource_usage(usage, cpu_clock=time.process_time):
+        kwargs = {name: decode_value(value) for name, value in encoded_kwargs.items()}
+        if profile:
+            result, stats = profile_stats(fn, **kwargs)
+        else:
+            result = fn(**kwargs)
+        encoded = encode_value(result)
+    return encoded, usage, stats
+
+def call_in_process(process_pool, stage, encoded_results, usage, profiler, **kwargs):
+    """
+    Run `stage` on the process pool.  Results of earlier CPU stages are forwarded in the
+    columnar form they came back in instead of being encoded again.  The worker's resource
+    usage is copied into `usage` and its profile, if any, merged into `profiler`.
+    """
+    encoded_kwargs = {name: encoded_results[name] if name in encoded_results else encode_value(value)
+                      for name, value in kwargs.items()}
+    future = process_pool.submit(run_encoded, stage.fn, encoded_kwargs, profiler is not None)
+    stats = None
+    try:
+        encoded, worker_usage, stats = future.result()
+    except BaseException as e:
+        # The worker's partial profile comes back pickled with the exception
+        stats = failure_stats(e)
+        raise
+    finally:
+        if stats is not None:
+            profiler.add(stats)
+    usage.update(worker_usage)
+    encoded_results[stage.name] = encoded
+    return decode_value(encoded)
+
+def _run_stage(stage, kwargs, started_at, process_pool=None, encoded_results=None, profiler=None):
+    entry = {'stage': stage.name, 'start': time.monotonic() - started_at, 'attempts': 0}
+    last_exception = None
+    usage = {}
+    if process_pool is not None:
+        fn = functools.partial(call_in_process, process_pool, stage, encoded_results, usage, profiler)
+    elif profiler is not None:
+        fn = functools.partial(call_measured, functools.partial(profiler.call, stage.fn), usage)
+    else:
+        fn = functools.partial(call_measured, stage.fn, usage)
+
+    for attempt in range(stage.retries + 1):
+        entry['attempts'] = attempt + 1
+        try:
+            result = call_with_timeout(fn, kwargs, stage.timeout)
+            entry['status'] = 'done'
+            break
+        except Exception as e:
+            print(f"[Retry {attempt+1}/{stage.retries+1}] {stage.name} failed: {e}")
+            last_exception = e
+            if attempt == stage.retries:
+                break
+            if isinstance(e, StageTimeout):
+                # Retrying next to a still running attempt would duplicate its upstream calls and store writes
+                e.worker.join(stage.retry_delay)
+                if e.worker.is_alive():
+                    print(f"{stage.name}: timed-out attempt is still running, not retrying")
+                    break
+            else:
+                time.sleep(stage.retry_delay)
+
+    if entry.get('status') != 'done':
+        entry['status'] = 'failed'
+        entry['error'] = str(last_exception)
+        result = None
+
+    if stage.cpu:
+        entry['executor'] = 'process' if process_pool is not None else 'thread'
+
+    entry['end'] = time.monotonic() - started_at
+    entry['duration'] = entry['end'] - entry['start']
+    entry.update(usage)
+    entry['rows'] = row_count(result)
+    observe_stage(entry)
+    return result, entry, last_exception
+
+def validate_stages(stages):
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError('Duplicate stage names')
+    optional = {stage.name for stage in stages if stage.optional}
+    for stage in stages:
+        missing = set(stage.deps) - names
+        if missing:
+            raise ValueError(f'{stage.name} depends on unknown stages {sorted(missing)}')
+        # A failed optional stage has no result to pass on
+        if optional.intersection(stage.deps):
+            raise ValueError(f'{stage.name} depends on optional stages {sorted(optional.intersection(stage.deps))}')
+
+def run_stages(stages, max_workers=4, process_pool=None, on_stage_done=None, profiler=None):
+    """
+    Run a stage DAG, starting every stage as soon as its dependencies are done.  Returns
+    (results by stage name, timeline).  Timeline entries carry start/end offsets in seconds
+    from the start of the run, plus CPU seconds, peak RSS growth and result rows, which are also
+    recorded in src.metrics.  The first stage to exhaust its retries raises StageError once
+    running stages have finished; stages that have not started are skipped.  Optional stages
+    that fail are left out of the results without failing the run.  With a
+    `process_pool`, cpu stages run there and I/O stages stay on the thread pool.
+    `on_stage_done(entry, result)` is called as each stage finishes, e.g. to publish partial output.
+    With a `profiler` (src.profiling.JobProfile) every stage runs under cProfile.
+    """
+    validate_stages(stages)
+    pending = {stage.name: stage for stage in stages}
+    results = {}
+    timeline = []
+    running = {}
+    failure = None
+    started_at = time.monotonic()
+    encoded_results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            if failure is None:
+                ready = [stage for stage in pending.values() if all(dep in results for dep in stage.deps)]
+                for stage in ready:
+                    del pending[stage.name]
+                    kwargs = {dep: results[dep] for dep in stage.deps}
+                    stage_pool = process_pool if stage.cpu else None
+                    running[pool.submit(_run_stage, stage, kwargs, started_at, stage_pool, encoded_results,
+                                        profiler)] = stage
+
+            if not running:
+                if pending and failure is None:
+                    raise ValueError(f'Dependency cycle between stages {sorted(pending)}')
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result, entry, error = future.result()
+                timeline.append(entry)
+                if entry['status'] == 'done':
+                    results[stage.name] = result
+                elif stage.optional:
+                    print(f'Optional stage {stage.name} failed, continuing: {error}')
+                elif failure is None:
+                    failure = StageError(stage.name, error)
+                if on_stage_done is not None:
+                    on_stage_done(entry, result)
+
+    timeline.sort(key=lambda entry: entry['start'])
+    if failure is not None:
+        failure.timeline = timeline
+        raise failure
+    return results, timeline
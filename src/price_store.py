@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.metadata import PRICE_ALIASES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
+PRICE_STORE_PATH = os.getenv('PRICE_STORE_PATH', os.path.join(ROOT_DIR, 'data', 'store', 'prices.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    token_address TEXT NOT NULL,
+    day TEXT NOT NULL,
+    symbol TEXT NOT NULL DEFAULT '',
+    price REAL,
+    PRIMARY KEY (token_address, day, symbol)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    token_address TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (token_address, day)
+);
+"""
+
+DAY_FORMAT = '%Y-%m-%d'
+
+def resolve_alias(token_address):
+    return PRICE_ALIASES.get(token_address, token_address)
+
+def day_range(start_day, end_day):
+    """
+    'YYYY-MM-DD' strings for [start_day, end_day).
+    """
+    return [d.strftime(DAY_FORMAT) for d in pd.date_range(start_day, end_day, inclusive='left')]
+
+def contiguous_ranges(days):
+    """
+    Collapse sorted 'YYYY-MM-DD' days into [(start, end_exclusive), ...].
+    """
+    ranges = []
+    for day in days:
+        current = pd.Timestamp(day)
+        if ranges and pd.Timestamp(ranges[-1][1]) == current:
+            ranges[-1][1] = (current + pd.Timedelta(days=1)).strftime(DAY_FORMAT)
+        else:
+            ranges.append([day, (current + pd.Timedelta(days=1)).strftime(DAY_FORMAT)])
+    return [tuple(r) for r in ranges]
+
+class PriceStore:
+    """
+    Daily token prices keyed by (token_address, day), plus which (token, day) pairs have already
+    been asked of Flipside so days without any price are not re-queried.  The current UTC day is
+    never marked covered because its average is still moving.
+    """
+    def __init__(self, path=PRICE_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, prices_data):
+        """
+        Upsert Flipside rows (dt, symbol, token_address, price).
+        """
+        if prices_data.empty:
+            return 0
+        days = pd.to_datetime(prices_data['dt'], utc=True).dt.strftime(DAY_FORMAT)
+        rows = list(zip(prices_data['token_address'], days,
+                        prices_data['symbol'].fillna(''), prices_data['price'].astype(float)))
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def mark_covered(self, token_addresses, start_day, end_day, today=None):
+        today = today or pd.Timestamp.now('UTC').strftime(DAY_FORMAT)
+        days = [day for day in day_range(start_day, end_day) if day < today]
+        rows = [(token, day) for token in token_addresses for day in days]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO coverage VALUES (?, ?)', rows)
+
+    def gaps(self, token_addresses, start_day, end_day):
+        """
+        {token: [(start, end_exclusive), ...]} of days in [start_day, end_day) not yet covered.
+        """
+        wanted = day_range(start_day, end_day)
+        gaps = {}
+        with self._connect() as conn:
+            for token in token_addresses:
+                covered = {row[0] for row in conn.execute(
+                    'SELECT day FROM coverage WHERE token_address = ? AND day >= ? AND day < ?',
+                    (token, start_day, end_day))}
+                missing = [day for day in wanted if day not in covered]
+                if missing:
+                    gaps[token] = contiguous_ranges(missing)
+        return gaps
+
+    def read(self, token_addresses, start_day, end_day):
+        """
+        Prices for the requested tokens, with aliases (e.g. native SOL -> wSOL) resolved here so
+        each requested address gets rows under its own token_address.
+        """
+        frames = []
+        with self._connect() as conn:
+            for token in dict.fromkeys(token_addresses):
+                source = resolve_alias(token)
+                rows = conn.execute(
+                    'SELECT day, symbol, price FROM prices WHERE token_address = ? AND day >= ? AND day < ?',
+                    (source, start_day, end_day)).fetchall()
+                if rows:
+                    frame = pd.DataFrame(rows, columns=['dt', 'symbol', 'price'])
+                    frame['token_address'] = token
+                    frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=['dt', 'symbol', 'token_address', 'price'])
+
+        prices_data = pd.concat(frames, ignore_index=True)[['dt', 'symbol', 'token_address', 'price']]
+        prices_data['symbol'] = prices_data['symbol'].replace('', None)
+        prices_data['dt'] = pd.to_datetime(prices_data['dt'])
+        return prices_data.sort_values(['dt', 'symbol', 'token_address'], ignore_index=True)
+
+def merge_ranges(ranges):
+    """
+    Union of [(start, end_exclusive), ...] day ranges, merging overlapping and adjacent ones.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+def group_gaps(gaps):
+    """
+    Turn {token: [(start, end_exclusive), ...]} into [(start, end_exclusive, tokens), ...]: one
+    entry per distinct range, listing only the tokens missing exactly that range.  A token that
+    only lacks today is never queried together with another token's years of history.
+    """
+    by_range = {}
+    for token, ranges in gaps.items():
+        for start, end in merge_ranges(ranges):
+            by_range.setdefault((start, end), []).append(token)
+    return [(start, end, sorted(tokens)) for (start, end), tokens in sorted(by_range.items())]
+
+class _GapBatch:
+    def __init__(self):
+        self.gaps = {}
+        self.done = threading.Event()
+        self.error = None
+
+    def add(self, gaps):
+        for token, ranges in gaps.items():
+            self.gaps.setdefault(token, []).extend(ranges)
+
+class GapCoalescer:
+    """
+    Merges gap requests from concurrent jobs.  The first request opens a batch and waits
+    `window` seconds for others to join; the batch is then fetched with one upstream query per
+    distinct date range, each covering only the tokens missing that range (see group_gaps).
+    """
+    def __init__(self, fetch, window=0.25):
+        self.fetch = fetch
+        self.window = window
+        self.lock = threading.Lock()
+        self.open_batch = None
+
+    def request(self, gaps):
+        if not gaps:
+            return
+        with self.lock:
+            leader = self.open_batch is None
+            if leader:
+                self.open_batch = _GapBatch()
+            batch = self.open_batch
+            batch.add(gaps)
+
+        if leader:
+            time.sleep(self.window)
+            with self.lock:
+                self.open_batch = None
+            try:
+                for start, end, tokens in group_gaps(batch.gaps):
+                    self.fetch(tokens, start, end)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_price_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
@@ -0,0 +1,113 @@
+import cProfile
+import os
+import pstats
+import random
+import threading
+
+# Share of analysis jobs profiled without being asked to; 0 profiles only on request
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.path.join('jobs', 'processed')
+PROFILE_SORT_KEYS = ('tottime', 'cumtime', 'calls')
+
+def parse_profile_flag(value):
+    """
+    The `profile` request field: a JSON boolean, or 'true'/'false' (also 1/0, yes/no) as a
+    string.  Anything else raises ValueError rather than counting as truthy.
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower() if isinstance(value, (str, int)) else None
+    if text in ('true', '1', 'yes'):
+        return True
+    if text in ('false', '0', 'no', ''):
+        return False
+    raise ValueError(f'profile must be a boolean, got {value!r}')
+
+def should_profile(requested=False, sample_rate=PROFILE_SAMPLE_RATE):
+    return bool(requested) or (sample_rate > 0 and random.random() < sample_rate)
+
+def profile_path(job_id):
+    return os.path.join(PROFILE_DIR, f'{job_id}.prof')
+
+def profile_stats(fn, **kwargs):
+    """
+    Call fn under cProfile.  Returns (result, raw stats), the stats being picklable so worker
+    processes can send them back.  If fn raises, the stats so far ride on the exception as
+    `profile_stats` (see failure_stats).
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = fn(**kwargs)
+    except BaseException as e:
+        profile.disable()
+        profile.create_stats()
+        e.profile_stats = profile.stats
+        raise
+    profile.disable()
+    profile.create_stats()
+    return result, profile.stats
+
+def failure_stats(exception):
+    return getattr(exception, 'profile_stats', None)
+
+class _StatsSnapshot:
+    # What pstats.Stats.add() expects from a profile: raw stats behind create_stats()
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+class JobProfile:
+    """
+    cProfile stats of every stage in one job, merged across stage threads and worker processes.
+    Threads a stage starts itself (e.g. concurrent Helius fetches) are not profiled; their time
+    shows up as waiting in the stage.
+    """
+    def __init__(self):
+        self.stats = None
+        self.lock = threading.Lock()
+
+    def call(self, fn, **kwargs):
+        # A failed attempt's stats are merged too: its time was spent all the same
+        stats = None
+        try:
+            result, stats = profile_stats(fn, **kwargs)
+        except BaseException as e:
+            stats = failure_stats(e)
+            raise
+        finally:
+            if stats is not None:
+                self.add(stats)
+        return result
+
+    def add(self, stats):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(_StatsSnapshot(stats))
+            else:
+                self.stats.add(_StatsSnapshot(stats))
+
+    def save(self, path):
+        with self.lock:
+            if self.stats is None:
+                return False
+            self.stats.dump_stats(path)
+        return True
+
+def top_functions(path, top=25, sort='tottime'):
+    """
+    Hot-function summary of a saved profile, `top` functions ordered by `sort`.
+    """
+    if sort not in PROFILE_SORT_KEYS:
+        raise ValueError(f'sort must be one of {PROFILE_SORT_KEYS}')
+    stats = pstats.Stats(path)
+    functions = [
+        {'function': name, 'file': filename, 'line': line, 'calls': calls, 'primitive_calls': primitive_calls,
+         'tottime': tottime, 'cumtime': cumtime}
+        for (filename, line, name), (primitive_calls, calls, tottime, cumtime, _) in stats.stats.items()
+    ]
+    functions.sort(key=lambda f: f[sort], reverse=True)
+    return {'total_calls': stats.total_calls, 'total_seconds': stats.total_tt, 'sort': sort,
+            'functions': functions[:top]}
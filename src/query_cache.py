@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from src.metrics import QUERY_CACHE_EVENTS
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
+QUERY_CACHE_DIR = os.getenv('QUERY_CACHE_DIR', os.path.join(ROOT_DIR, 'data', 'store', 'query_cache'))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 3600))
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+QUERY_CACHE_HOT_ENTRIES = int(os.getenv('QUERY_CACHE_HOT_ENTRIES', 32))
+
+def query_key(sql):
+    return hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+class QueryCache:
+    """
+    Flipside query results keyed by a hash of the SQL text.  A small in-memory LRU sits in front
+    of a size-bounded on-disk LRU of pickled DataFrames (dtypes preserved, no CSV parsing on a hit).
+    Entries older than `ttl` seconds are treated as misses.  Hits, misses and evictions are also
+    exported on /api/metrics as query_cache_events_total.
+    """
+    def __init__(self, directory=QUERY_CACHE_DIR, ttl=QUERY_CACHE_TTL, max_bytes=QUERY_CACHE_MAX_BYTES,
+                 hot_entries=QUERY_CACHE_HOT_ENTRIES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self.hot = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+        QUERY_CACHE_EVENTS.inc(event=name)
+
+    def _remember(self, key, created, df):
+        with self.lock:
+            self.hot[key] = (created, df)
+            self.hot.move_to_end(key)
+            while len(self.hot) > self.hot_entries:
+                self.hot.popitem(last=False)
+
+    def get(self, sql):
+        """
+        Returns a copy of the cached DataFrame for `sql`, or None.
+        """
+        key = query_key(sql)
+        now = time.time()
+
+        with self.lock:
+            entry = self.hot.get(key)
+            if entry is not None:
+                self.hot.move_to_end(key)
+        if entry is not None and now - entry[0] <= self.ttl:
+            self._count('memory_hits')
+            return entry[1].copy()
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                created, df = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self._count('misses')
+            return None
+
+        if now - created > self.ttl:
+            self._count('expired')
+            self._count('misses')
+            return None
+
+        os.utime(path)  # mtime doubles as last access for disk LRU
+        self._remember(key, created, df)
+        self._count('disk_hits')
+        return df.copy()
+
+    def put(self, sql, df):
+        key = query_key(sql)
+        created = time.time()
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((created, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        self._remember(key, created, df.copy())
+        self._evict()
+
+    def get_or_fetch(self, sql, fetch):
+        df = self.get(sql)
+        if df is None:
+            df = fetch(sql)
+            self.put(sql, df)
+        return df
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self.lock:
+                self.hot.pop(name[:-len('.pkl')], None)
+            self._count('evictions')
+
+    def clear(self):
+        with self.lock:
+            self.hot.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['hot_entries'] = len(self.hot)
+        stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+        return stats
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_query_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = QueryCache()
+        return _default_cache
@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+RESULT_STORE_DIR = os.getenv('RESULT_STORE_DIR', os.path.join('jobs', 'processed'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+RESULT_COMPRESSLEVEL = int(os.getenv('RESULT_COMPRESSLEVEL', 6))
+
+def etag_for(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class ResultStore:
+    """
+    Finished job results.  Each result is serialized to JSON once; the response bytes and their
+    ETag sit in a byte-bounded in-memory LRU in front of gzip files on disk ({job_id}.json.gz,
+    written atomically).  Results written before this store (plain {job_id}.json) still load.
+    """
+    def __init__(self, directory=RESULT_STORE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES, compresslevel=RESULT_COMPRESSLEVEL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self.hot = OrderedDict()
+        self.hot_bytes = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json.gz')
+
+    def _legacy_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _remember(self, job_id, body, etag):
+        with self.lock:
+            old = self.hot.pop(job_id, None)
+            if old is not None:
+                self.hot_bytes -= len(old[0])
+            if len(body) > self.max_bytes:
+                return
+            self.hot[job_id] = (body, etag)
+            self.hot_bytes += len(body)
+            while self.hot_bytes > self.max_bytes:
+                _, (evicted, _) = self.hot.popitem(last=False)
+                self.hot_bytes -= len(evicted)
+
+    def put(self, job_id, result):
+        """
+        Store a JSON-safe result.  Returns (body, etag).
+        """
+        body = json.dumps(result).encode('utf-8')
+        etag = etag_for(body)
+
+        path = self._path(job_id)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(body, compresslevel=self.compresslevel))
+            os.replace(tmp_path, path)  # Readers see the old file or the whole new one, never a partial write
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._remember(job_id, body, etag)
+        return body, etag
+
+    def get(self, job_id):
+        """
+        (body, etag) of the stored result, or None.
+        """
+        with self.lock:
+            entry = self.hot.get(job_id)
+            if entry is not None:
+                self.hot.move_to_end(job_id)
+                return entry
+
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                body = gzip.decompress(f.read())
+        except FileNotFoundError:
+            try:
+                with open(self._legacy_path(job_id), 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                return None
+
+        etag = etag_for(body)
+        self._remember(job_id, body, etag)
+        return body, etag
+
+    def clear(self):
+        """
+        Evict every result from memory and disk.  Returns the deleted file names.
+        """
+        with self.lock:
+            self.hot.clear()
+            self.hot_bytes = 0
+        removed = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json.gz') or name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed.append(name)
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    def stats(self):
+        with self.lock:
+            return {'hot_entries': len(self.hot), 'hot_bytes': self.hot_bytes}
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_result_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ResultStore()
+        return _default_store
@@ -1,6 +1,6 @@
 import datetime as dt
 
-def token_prices(token_addresses, start_date, network='solana'):
+def token_prices(token_addresses, start_date, network='solana', end_date=None, limit=10000):
     """
     Generate a SQL query to fetch median token prices by time frequency.
 
@@ -8,6 +8,8 @@ def token_prices(token_addresses, start_date, network='solana'):
     - token_addresses (list): List of token addresses (strings).
     - network (str): The blockchain network (e.g. ethereum, optimism).
     - start_date (str): Start datetime string in 'YYYY-MM-DD HH:MM:SS' format.
+    - end_date (str, optional): Exclusive end datetime, same format.  Used for day windows.
+    - limit (int): Row cap for the query.
 
     Returns:
     - str: SQL query string.
@@ -16,6 +18,11 @@ def token_prices(token_addresses, start_date, network='solana'):
     start_dt = dt.datetime.strptime(start_date, '%Y-%m-%d %H:%M:%S')
     formatted_start = f"'{start_dt.strftime('%Y-%m-%d %H:%M:%S')}'"
 
+    end_clause = ''
+    if end_date is not None:
+        end_dt = dt.datetime.strptime(end_date, '%Y-%m-%d %H:%M:%S')
+        end_clause = f"AND hour < TO_TIMESTAMP('{end_dt.strftime('%Y-%m-%d %H:%M:%S')}', 'YYYY-MM-DD HH24:MI:SS')"
+
     # Format token list into VALUES clause
     addresses_clause = ", ".join(f"(LOWER('{address}'))" for address in token_addresses)
 
@@ -37,17 +44,18 @@ def token_prices(token_addresses, start_date, network='solana'):
     WHERE 
         lower(token_address) IN (SELECT token_address FROM addresses)
         AND hour >= DATE_TRUNC('day', TO_TIMESTAMP({formatted_start}, 'YYYY-MM-DD HH24:MI:SS'))
+        {end_clause}
     GROUP BY 
         1, 2, 3
     ORDER BY 
-        dt asc, symbol
-    LIMIT 10000
+        dt asc, symbol, token_address
+    LIMIT {limit}
     """
 
     return query
 
-def wallet_balances(user_address):
-    query = f"""
+def balance_rows(user_address):
+    return f"""
         with balance_data as (
 
         select * from solana.core.fact_sol_balances where ACCOUNT_ADDRESS in('{user_address}')
@@ -55,6 +63,11 @@ def wallet_balances(user_address):
         select * from solana.core.fact_token_balances WHERE owner in('{user_address}')
 
         )
+    """
+
+def wallet_balances(user_address):
+    query = f"""
+        {balance_rows(user_address)}
 
         select block_timestamp, owner, mint, pre_balance, balance, tx_id, SUCCEEDED, m.symbol, m.name
         from balance_data b
@@ -66,4 +79,45 @@ def wallet_balances(user_address):
 
         """
     
-    return query
\ No newline at end of file
+    return query
+
+def wallet_balance_bounds(user_address):
+    """
+    First/last block_timestamp and row count of a wallet's balance history, used to split
+    paginated balance queries into time windows.
+    """
+    query = f"""
+        {balance_rows(user_address)}
+
+        select min(block_timestamp) as first_ts, max(block_timestamp) as last_ts, count(*) as n_rows
+        from balance_data
+        """
+
+    return query
+
+def wallet_balances_page(user_address, window_start, window_end, after=None, limit=10000):
+    """
+    One keyset page of a wallet's balance history inside [window_start, window_end).
+    Rows come in (block_timestamp, tx_id) order; `after` is the last (block_timestamp, tx_id)
+    already fetched.  Timestamps are 'YYYY-MM-DD HH:MM:SS.ffffff' strings.
+    """
+    keyset_clause = ''
+    if after is not None:
+        after_ts, after_tx = after
+        keyset_clause = f"""and (block_timestamp > '{after_ts}'::timestamp_ntz
+             or (block_timestamp = '{after_ts}'::timestamp_ntz and tx_id > '{after_tx}'))"""
+
+    query = f"""
+        {balance_rows(user_address)}
+
+        select block_timestamp, owner, mint, pre_balance, balance, tx_id, SUCCEEDED, m.symbol, m.name
+        from balance_data b
+        left join solana.price.ez_asset_metadata m on b.MINT = m.TOKEN_ADDRESS
+        where block_timestamp >= '{window_start}'::timestamp_ntz
+          and block_timestamp < '{window_end}'::timestamp_ntz
+          {keyset_clause}
+        order by block_timestamp asc, tx_id asc, mint asc
+        LIMIT {limit}
+        """
+
+    return query
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
+CASSETTE_PATH = os.getenv('CASSETTE_PATH', os.path.join(ROOT_DIR, 'data', 'store', 'cassettes.db'))
+
+# live: talk to the providers; record: talk to them and store every response; replay: answer from the store
+UPSTREAM_TRANSPORT = os.getenv('UPSTREAM_TRANSPORT', 'live')
+# Empty replays each response after the latency it was recorded with (times REPLAY_LATENCY_SCALE)
+REPLAY_LATENCY = os.getenv('REPLAY_LATENCY', '')
+REPLAY_LATENCY_SCALE = float(os.getenv('REPLAY_LATENCY_SCALE', 1.0))
+REPLAY_ERROR_RATE = float(os.getenv('REPLAY_ERROR_RATE', 0))
+REPLAY_ERROR_STATUS = int(os.getenv('REPLAY_ERROR_STATUS', 503))
+
+# Credentials never reach the cassette store or the request keys
+SECRET_PARAMS = {'api-key', 'api_key', 'apikey'}
+STORED_HEADERS = ('Content-Type', 'Retry-After')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interactions (
+    request_key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    provider TEXT,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body_digest TEXT NOT NULL,
+    elapsed REAL NOT NULL,
+    recorded_at REAL,
+    PRIMARY KEY (request_key, seq)
+);
+"""
+
+class CassetteMiss(Exception):
+    def __init__(self, method, url):
+        super().__init__(f'No recorded response for {method} {url}')
+        self.method = method
+        self.url = url
+
+def redact_url(url):
+    """
+    Path and query of `url` without the host and without credentials, so recordings made against
+    the real providers also match requests sent to a local stand-in.
+    """
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in SECRET_PARAMS]
+    path = parts.path or '/'
+    return f'{path}?{urlencode(sorted(query))}' if query else path
+
+def canonical_body(body):
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')).encode('utf-8')
+    except ValueError:
+        return body
+
+def request_key(method, url, body):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(method.upper().encode('ascii'))
+    digest.update(b'\0' + redact_url(url).encode('utf-8') + b'\0')
+    digest.update(canonical_body(body))
+    return digest.hexdigest()
+
+class CassetteStore:
+    """
+    Recorded upstream responses in sqlite.  Each request key (method, redacted path and query,
+    canonical JSON body) maps to the sequence of responses it got, e.g. Flipside's 'not yet
+    completed' polls followed by the result.  Bodies are zlib-compressed and stored once per
+    distinct content.
+    """
+    def __init__(self, path=CASSETTE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def clear_key(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM interactions WHERE request_key = ?', (key,))
+
+    def add(self, key, provider, method, url, status, headers, body, elapsed):
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO bodies VALUES (?, ?)', (digest, zlib.compress(body, 6)))
+            seq = conn.execute('SELECT COUNT(*) FROM interactions WHERE request_key = ?', (key,)).fetchone()[0]
+            conn.execute('INSERT INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, seq, provider, method.upper(), redact_url(url), status, json.dumps(headers), digest,
+                          elapsed, time.time()))
+
+    def responses(self, key):
+        """
+        [(status, headers, compressed body, elapsed), ...] recorded for `key`, in order.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT i.status, i.headers, b.data, i.elapsed FROM interactions i '
+                'JOIN bodies b ON b.digest = i.body_digest WHERE i.request_key = ? ORDER BY i.seq', (key,)).fetchall()
+        return [(status, json.loads(headers), data, elapsed) for status, headers, data, elapsed in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            interactions, keys = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT request_key) FROM interactions').fetchone()
+            bodies, stored_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM bodies').fetchone()
+        return {'requests': keys, 'responses': interactions, 'distinct_bodies': bodies, 'stored_bytes': stored_bytes}
+
+class Replayer:
+    """
+    Looks up recorded responses and applies the configured latency and error injection.  Shared
+    by ReplayTransport (in process) and the cassette server (over HTTP).  Repeated requests walk
+    through the recorded sequence and then keep getting its last response.
+    """
+    def __init__(self, store, latency=None, latency_scale=1.0, error_rate=0.0, error_status=503, seed=None):
+        self.store = store
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.recorded = {}
+        self.cursors = {}
+        self.lock = threading.Lock()
+
+    def _recorded(self, key):
+        with self.lock:
+            if key in self.recorded:
+                return self.recorded[key]
+        responses = self.store.responses(key)
+        with self.lock:
+            return self.recorded.setdefault(key, responses)
+
+    def respond(self, method, url, body):
+        """
+        (status, headers, body bytes) for the request, after sleeping for the replay latency.
+        Raises CassetteMiss when nothing was recorded for it.
+        """
+        key = request_key(method, url, body)
+        responses = self._recorded(key)
+        if not responses:
+            raise CassetteMiss(method, redact_url(url))
+
+        with self.lock:
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+            inject_error = self.error_rate > 0 and self.random.random() < self.error_rate
+        status, headers, data, elapsed = responses[min(index, len(responses) - 1)]
+
+        time.sleep(self.latency if self.latency is not None else elapsed * self.latency_scale)
+        if inject_error:
+            body = json.dumps({'error': {'message': 'Injected upstream error'}}).encode('utf-8')
+            return self.error_status, {'Content-Type': 'application/json', 'Retry-After': '1'}, body
+        return status, headers, zlib.decompress(data)
+
+def _prepare(session, method, url, kwargs):
+    request = requests.Request(method, url, headers=kwargs.get('headers'), params=kwargs.get('params'),
+                               data=kwargs.get('data'), json=kwargs.get('json'))
+    return session.prepare_request(request)
+
+class LiveTransport:
+    def send(self, provider, session, method, url, kwargs):
+        return session.request(method, url, **kwargs)
+
+class RecordingTransport:
+    """
+    Live requests whose responses are stored in a CassetteStore.  The first time a request is
+    seen in this process its earlier recordings are replaced, so re-recording does not mix runs.
+    """
+    def __init__(self, store, inner=None):
+        self.store = store
+        self.inner = inner or LiveTransport()
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def send(self, provider, session, method, url, kwargs):
+        start = time.monotonic()
+        response = self.inner.send(provider, session, method, url, kwargs)
+        elapsed = time.monotonic() - start
+
+        key = request_key(method, response.request.url, response.request.body)
+        with self.lock:
+            first = key not in self.seen
+            self.seen.add(key)
+        if first:
+            self.store.clear_key(key)
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        self.store.add(key, provider, method, response.request.url, response.status_code, headers, response.content,
+                       elapsed)
+        return response
+
+class ReplayTransport:
+    """
+    Answers requests from recorded cassettes without touching the network.
+    """
+    def __init__(self, replayer):
+        self.replayer = replayer
+
+    def send(self, provider, session, method, url, kwargs):
+        prepared = _prepare(session, method, url, kwargs)
+        status, headers, body = self.replayer.respond(method, prepared.url, prepared.body)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response._content_consumed = True  # so iter_content() serves the body for stream=True callers
+        response.encoding = 'utf-8'
+        response.url = prepared.url
+        response.request = prepared
+        return response
+
+def replayer_from_env(store=None):
+    return Replayer(store or CassetteStore(), latency=float(REPLAY_LATENCY) if REPLAY_LATENCY else None,
+                    latency_scale=REPLAY_LATENCY_SCALE, error_rate=REPLAY_ERROR_RATE,
+                    error_status=REPLAY_ERROR_STATUS)
+
+def transport_from_env(mode=UPSTREAM_TRANSPORT):
+    if mode == 'live':
+        return LiveTransport()
+    if mode == 'record':
+        return RecordingTransport(CassetteStore())
+    if mode == 'replay':
+        return ReplayTransport(replayer_from_env())
+    raise ValueError(f'UPSTREAM_TRANSPORT must be live, record or replay, not {mode!r}')
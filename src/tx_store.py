@@ -0,0 +1,262 @@
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from src.tx_stream import select_fields
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
+TX_STORE_PATH = os.getenv('TX_STORE_PATH', os.path.join(ROOT_DIR, 'data', 'store', 'transactions.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    signature TEXT PRIMARY KEY,
+    slot INTEGER,
+    timestamp INTEGER,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS raw_transactions (
+    signature TEXT PRIMARY KEY,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS address_signatures (
+    address TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    slot INTEGER,
+    block_time INTEGER,
+    PRIMARY KEY (address, signature)
+);
+CREATE INDEX IF NOT EXISTS idx_address_signatures_slot ON address_signatures (address, slot);
+CREATE TABLE IF NOT EXISTS signature_gaps (
+    address TEXT NOT NULL,
+    until_signature TEXT NOT NULL,
+    before_signature TEXT NOT NULL,
+    PRIMARY KEY (address, until_signature)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    address TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    slot INTEGER,
+    updated_at REAL
+);
+"""
+
+SQLITE_MAX_VARS = 900
+
+def _chunks(items, size=SQLITE_MAX_VARS):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def encode_tx(tx):
+    return zlib.compress(json.dumps(tx, separators=(',', ':')).encode('utf-8'))
+
+def decode_tx(payload, fields=None):
+    return select_fields(json.loads(zlib.decompress(payload)), fields)
+
+def _select_payloads(conn, signatures):
+    placeholders = ','.join('?' * len(signatures))
+    cursor = conn.execute(f'SELECT signature, payload FROM transactions WHERE signature IN ({placeholders})',
+                          signatures)
+    return dict(cursor.fetchall())
+
+class TxStore:
+    """
+    Parsed Helius transactions keyed by signature and shared across wallets, plus the
+    signatures seen for each analyzed address and a per-address "newest seen" watermark.
+    Payloads are zlib-compressed JSON, optionally with the untrimmed upstream JSON kept beside
+    them for audit.  Safe to use from concurrent jobs.
+    """
+    def __init__(self, path=TX_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -- transactions --------------------------------------------------------
+
+    def put_many(self, txs):
+        rows = [(tx['signature'], tx.get('slot'), tx.get('timestamp'), encode_tx(tx))
+                for tx in txs if tx and tx.get('signature')]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def put_raw_many(self, raw):
+        """
+        Keep raw upstream JSON for audit: `raw` is (signature, JSON bytes) pairs.
+        """
+        rows = [(signature, zlib.compress(payload)) for signature, payload in raw]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO raw_transactions VALUES (?, ?)', rows)
+        return len(rows)
+
+    def get_raw(self, signature):
+        """
+        The raw upstream JSON bytes stored for `signature`, or None.
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT payload FROM raw_transactions WHERE signature = ?', (signature,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def get_many(self, signatures, fields=None):
+        """
+        Returns the stored transactions for `signatures`, in the order given, skipping unknowns.
+        With `fields` (see src.tx_stream.TX_FIELDS) each is trimmed as it is decoded.
+        """
+        found = {}
+        with self._connect() as conn:
+            for chunk in _chunks(list(signatures)):
+                found.update(_select_payloads(conn, chunk))
+        return [decode_tx(found[sig], fields) for sig in signatures if sig in found]
+
+    def missing(self, signatures):
+        """
+        Subset of `signatures` (order kept) that still needs hydrating.
+        """
+        signatures = list(signatures)
+        present = set()
+        with self._connect() as conn:
+            for chunk in _chunks(signatures):
+                placeholders = ','.join('?' * len(chunk))
+                cursor = conn.execute(
+                    f'SELECT signature FROM transactions WHERE signature IN ({placeholders})', chunk)
+                present.update(row[0] for row in cursor)
+        return [sig for sig in signatures if sig not in present]
+
+    # -- per-address history -------------------------------------------------
+
+    def add_address_signatures(self, address, signature_infos):
+        """
+        Link getSignaturesForAddress results to `address`.  Pages arrive newest first, so
+        insertion order breaks ties within a slot.
+        """
+        self.add_signature_map({address: signature_infos})
+
+    def add_signature_map(self, signature_infos_by_address):
+        """
+        add_address_signatures for several addresses in one transaction.
+        """
+        rows = [(address, s.get('signature'), s.get('slot'), s.get('blockTime'))
+                for address, signature_infos in signature_infos_by_address.items() for s in signature_infos]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO address_signatures VALUES (?, ?, ?, ?)', rows)
+
+    def address_signatures(self, address):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT signature FROM address_signatures WHERE address = ? ORDER BY slot DESC, rowid ASC',
+                (address,))
+            return [row[0] for row in cursor]
+
+    def missing_for_address(self, address):
+        """
+        Linked signatures whose transaction is not stored yet (new, or a failed earlier batch).
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT a.signature FROM address_signatures a '
+                'LEFT JOIN transactions t ON t.signature = a.signature '
+                'WHERE a.address = ? AND t.signature IS NULL ORDER BY a.slot DESC, a.rowid ASC',
+                (address,))
+            return [row[0] for row in cursor]
+
+    def address_history(self, address, fields=None):
+        """
+        Full parsed history for `address`, newest first, ready for construct_tx_dataset.  Read
+        lazily (see AddressHistory); wrap it in list() for random access.
+        """
+        return AddressHistory(self, address, fields)
+
+    # -- watermarks ----------------------------------------------------------
+
+    def get_watermark(self, address):
+        with self._connect() as conn:
+            row = conn.execute('SELECT signature FROM watermarks WHERE address = ?', (address,)).fetchone()
+        return row[0] if row else None
+
+    def advance_watermark(self, address):
+        """
+        Move the watermark to the newest signature linked to `address`.  Ranges below it that
+        paging did not get through are tracked separately (see signature_gaps).
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT signature, slot FROM address_signatures WHERE address = ? ORDER BY slot DESC, rowid ASC LIMIT 1',
+                (address,)).fetchone()
+            if row:
+                conn.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?)',
+                             (address, row[0], row[1], time.time()))
+        return row[0] if row else None
+
+    # -- signature gaps ------------------------------------------------------
+
+    def signature_gaps(self, address):
+        """
+        Unpaged signature ranges of `address` as (before, until) pairs, oldest first: paging
+        stopped at `before` without reaching `until`, the watermark at the time.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT g.before_signature, g.until_signature FROM signature_gaps g '
+                'LEFT JOIN address_signatures a ON a.address = g.address AND a.signature = g.until_signature '
+                'WHERE g.address = ? ORDER BY a.slot ASC', (address,))
+            return cursor.fetchall()
+
+    def set_signature_gap(self, address, before, until):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO signature_gaps VALUES (?, ?, ?)', (address, until, before))
+
+    def clear_signature_gap(self, address, until):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM signature_gaps WHERE address = ? AND until_signature = ?', (address, until))
+
+class AddressHistory:
+    """
+    An address's stored transactions, decoded from the store a chunk at a time on each pass, so
+    the builder consumes them without the whole history sitting in memory.  Holds only the
+    signature list and store path, so it pickles cheaply to process-pool stages.
+    """
+    def __init__(self, store, address, fields=None):
+        self.path = store.path
+        self.address = address
+        self.fields = fields
+        self.signatures = store.address_signatures(address)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __iter__(self):
+        # A plain read-only connection: the schema and WAL mode were set up when the store was created
+        conn = sqlite3.connect(pathlib.Path(self.path).resolve().as_uri() + '?mode=ro', uri=True, timeout=30)
+        try:
+            for chunk in _chunks(self.signatures):
+                found = _select_payloads(conn, chunk)
+                for signature in chunk:
+                    if signature in found:
+                        yield decode_tx(found[signature], self.fields)
+        finally:
+            conn.close()
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_tx_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TxStore()
+        return _default_store
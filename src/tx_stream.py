@@ -0,0 +1,140 @@
+"""
+Streaming, field-selective parsing of Helius v0/transactions responses.
+
+A batch response is a JSON array of up to 100 parsed transactions, most of which is never read
+(innerInstructions, tokenBalanceChanges, descriptions, instruction data).  iter_json_array decodes
+the array one element at a time as the body streams in, and trim_transaction keeps only the
+fields the analysis reads, so a full payload never outlives its own element.
+"""
+import codecs
+import json
+
+# Fields read by summarize_transaction / transfer_records, get_instruction_data and
+# fund_tracing.transfer_edges.  None keeps the value as is; a dict keeps those keys of an object
+# (or of every object in a list).
+TX_FIELDS = {
+    'signature': None,
+    'timestamp': None,
+    'slot': None,
+    'fee': None,
+    'type': None,
+    'source': None,
+    'transactionError': None,
+    'nativeTransfers': {'fromUserAccount': None, 'toUserAccount': None, 'amount': None},
+    'tokenTransfers': {'fromUserAccount': None, 'toUserAccount': None, 'tokenAmount': None, 'mint': None},
+    'accountData': {'account': None, 'nativeBalanceChange': None},
+    'instructions': {'accounts': None, 'programId': None},
+    'events': {'compressed': {'type': None, 'newLeafOwner': None, 'treeDelegate': None,
+                              'metadata': {'name': None}}},
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+class NotJSONArray(ValueError):
+    """
+    The body was valid JSON but not an array (e.g. a {"error": ...} response); `value` holds it.
+    """
+    def __init__(self, value):
+        super().__init__(f'expected a JSON array, got {type(value).__name__}')
+        self.value = value
+
+def select_fields(value, fields):
+    """
+    Copy of `value` restricted to `fields` (see TX_FIELDS).  Missing keys stay missing, so
+    `.get(key, default)` on the result behaves as on the full payload.
+    """
+    if fields is None:
+        return value
+    if isinstance(value, list):
+        return [select_fields(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: select_fields(value[key], sub) for key, sub in fields.items() if key in value}
+
+def trim_transaction(tx, fields=TX_FIELDS):
+    return select_fields(tx, fields)
+
+def _skip_whitespace(buf, pos):
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+def iter_json_array(chunks, keep_text=False):
+    """
+    Yield the elements of a top-level JSON array from an iterable of byte chunks, decoding each
+    element as soon as it is complete.  With keep_text=True yields (element, raw JSON text).
+    Raises NotJSONArray when the body is some other JSON value, ValueError when it is malformed.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos, final = '', 0, False
+    want = 1  # characters to have buffered past `pos` before decoding the next element
+    state = 'open'  # open: '[' / first: element or ']' / item: element / next: ',' or ']' / closed
+
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos < len(buf):
+            char = buf[pos]
+            if state == 'open':
+                if char != '[':
+                    # Not an array: parse the whole body, e.g. to surface an error object
+                    rest = buf[pos:] + ''.join(utf8.decode(chunk) for chunk in chunks) + utf8.decode(b'', final=True)
+                    raise NotJSONArray(json.loads(rest))
+                pos, state = pos + 1, 'first'
+                continue
+            if state == 'next':
+                if char not in ',]':
+                    raise ValueError(f'unexpected {char!r} between array elements')
+                pos, state = pos + 1, 'item' if char == ',' else 'closed'
+                continue
+            if state == 'closed':
+                raise ValueError(f'unexpected {char!r} after the array')
+            if state == 'first' and char == ']':
+                pos, state = pos + 1, 'closed'
+                continue
+
+            if final or len(buf) - pos >= want:
+                try:
+                    value, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                else:
+                    # Wait for the delimiter: a number at the end of the buffer may continue in the next chunk
+                    if final or (end < len(buf) and buf[end] in _DELIMITERS):
+                        yield (value, buf[pos:end]) if keep_text else value
+                        pos, state, want = end, 'next', 1
+                        continue
+                # Incomplete: buffer twice as much before decoding again, so large elements stay linear
+                want = 2 * (len(buf) - pos)
+        elif final:
+            if state == 'closed':
+                return
+            raise ValueError('truncated JSON array')
+
+        pending, size = [buf[pos:]], len(buf) - pos
+        while size < want or len(pending) == 1:
+            chunk = next(chunks, None)
+            if chunk is None:
+                pending.append(utf8.decode(b'', final=True))
+                final = True
+                break
+            pending.append(utf8.decode(chunk))
+            size += len(pending[-1])
+        buf, pos = ''.join(pending), 0
+
+def stream_transactions(chunks, fields=TX_FIELDS, raw=None):
+    """
+    Trimmed transactions from a streamed v0/transactions body.  With a `raw` list, each
+    transaction's (signature, raw JSON bytes) is appended to it for audit.
+    """
+    keep_text = raw is not None
+    for item in iter_json_array(chunks, keep_text=keep_text):
+        tx, text = item if keep_text else (item, None)
+        if keep_text and isinstance(tx, dict) and tx.get('signature'):
+            raw.append((tx['signature'], text.encode('utf-8')))
+        yield trim_transaction(tx, fields)
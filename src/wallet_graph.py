@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This resolves to project root
+WALLET_GRAPH_PATH = os.getenv('WALLET_GRAPH_PATH', os.path.join(ROOT_DIR, 'data', 'store', 'wallet_graph.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    signature TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    PRIMARY KEY (signature, sender, receiver)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    tx_count INTEGER NOT NULL,
+    first_seen INTEGER,
+    last_seen INTEGER,
+    PRIMARY KEY (sender, receiver)
+);
+CREATE INDEX IF NOT EXISTS idx_edges_receiver ON edges (receiver);
+CREATE TABLE IF NOT EXISTS nodes (
+    address TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyzed (
+    address TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    analyzed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_analyzed_root ON analyzed (root);
+"""
+
+SQLITE_MAX_VARS = 900
+
+def _chunks(items, size=SQLITE_MAX_VARS):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _epoch(seconds):
+    return None if pd.isna(seconds) else int(seconds)
+
+class _UnionFind:
+    """
+    Union-find over the persisted `nodes` table for the duration of one write transaction.
+    Nodes are read lazily, compressed paths and new links are written back by flush().
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.parent = {}
+        self.size = {}
+        self.dirty = set()
+        self.absorbed = []
+
+    def _load(self, address):
+        row = self.conn.execute('SELECT parent, size FROM nodes WHERE address = ?', (address,)).fetchone()
+        if row is None:
+            row = (address, 1)
+            self.dirty.add(address)
+        self.parent[address], self.size[address] = row
+
+    def find(self, address):
+        if address not in self.parent:
+            self._load(address)
+        root = address
+        while True:
+            parent = self.parent[root]
+            if parent == root:
+                break
+            if parent not in self.parent:
+                self._load(parent)
+            root = parent
+
+        # Path compression
+        while self.parent[address] != root:
+            self.dirty.add(address)
+            self.parent[address], address = root, self.parent[address]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.dirty.update((root_a, root_b))
+        self.absorbed.append(root_b)
+
+    def flush(self):
+        # Analyzed wallets keep their current root so cluster lookups are a single indexed read
+        moved = [(self.find(old_root), old_root) for old_root in self.absorbed]
+        self.conn.executemany('UPDATE analyzed SET root = ? WHERE root = ?', moved)
+        self.conn.executemany('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)',
+                              [(a, self.parent[a], self.size[a]) for a in self.dirty])
+
+class WalletGraph:
+    """
+    Wallet-to-wallet transfer edges accumulated across every analysis job, with connected
+    components maintained incrementally by a persisted union-find (union by size, path
+    compression).  Each analyzed wallet records its current component root, so "which analyzed
+    wallets share a cluster with X" needs no graph rebuild.  Safe to use from concurrent jobs.
+    """
+    def __init__(self, path=WALLET_GRAPH_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _new_transfers(self, conn, transfers):
+        """
+        Drop transfers already merged by an earlier job (the same transaction shows up in the
+        history of both of its wallets).
+        """
+        seen = set()
+        for chunk in _chunks(transfers['signature'].unique().tolist()):
+            placeholders = ','.join('?' * len(chunk))
+            seen.update(conn.execute(
+                f'SELECT signature, sender, receiver FROM transfers WHERE signature IN ({placeholders})', chunk))
+        if not seen:
+            return transfers
+        keys = pd.Series(list(zip(transfers['signature'], transfers['sender'], transfers['receiver'])),
+                         index=transfers.index)
+        return transfers[~keys.isin(seen)]
+
+    def merge_transactions(self, address, tx_level_data):
+        """
+        Merge one job's tx-level data into the graph and mark `address` as analyzed.  Re-merging
+        the same transactions is a no-op.  Returns the number of new transfers.
+        """
+        transfers = tx_level_data[['signature', 'sender', 'receiver', 'timestamp']].dropna(
+            subset=['signature', 'sender', 'receiver'])
+        transfers = transfers.astype({'signature': str, 'sender': str, 'receiver': str})
+        transfers = transfers.drop_duplicates(['signature', 'sender', 'receiver'])
+        transfers['timestamp'] = (pd.to_datetime(transfers['timestamp'], utc=True)
+                                  - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            transfers = self._new_transfers(conn, transfers)
+            conn.executemany('INSERT INTO transfers VALUES (?, ?, ?)',
+                             transfers[['signature', 'sender', 'receiver']].itertuples(index=False, name=None))
+
+            edges = transfers.groupby(['sender', 'receiver'], sort=False).agg(
+                tx_count=('signature', 'size'), first_seen=('timestamp', 'min'), last_seen=('timestamp', 'max'))
+            conn.executemany(
+                'INSERT INTO edges VALUES (?, ?, ?, ?, ?) ON CONFLICT (sender, receiver) DO UPDATE SET '
+                'tx_count = tx_count + excluded.tx_count, '
+                'first_seen = min(coalesce(first_seen, excluded.first_seen), coalesce(excluded.first_seen, first_seen)), '
+                'last_seen = max(coalesce(last_seen, excluded.last_seen), coalesce(excluded.last_seen, last_seen))',
+                [(s, r, int(n), _epoch(first), _epoch(last)) for (s, r), n, first, last in edges.itertuples(name=None)])
+
+            union_find = _UnionFind(conn)
+            for sender, receiver in edges.index:
+                union_find.union(sender, receiver)
+            root = union_find.find(address)
+            union_find.flush()
+            conn.execute('INSERT OR REPLACE INTO analyzed VALUES (?, ?, ?)', (address, root, time.time()))
+
+        return len(transfers)
+
+    def component_root(self, address, conn=None):
+        if conn is None:
+            with self._connect() as conn:
+                return self.component_root(address, conn)
+        root = address
+        while True:
+            row = conn.execute('SELECT parent FROM nodes WHERE address = ?', (root,)).fetchone()
+            if row is None or row[0] == root:
+                return root
+            root = row[0]
+
+    def cluster_peers(self, address):
+        """
+        Previously analyzed wallets in the same connected component as `address`.
+        """
+        with self._connect() as conn:
+            root = self.component_root(address, conn)
+            cursor = conn.execute('SELECT address FROM analyzed WHERE root = ? AND address != ? ORDER BY address',
+                                  (root, address))
+            return [row[0] for row in cursor]
+
+    def neighbors(self, address):
+        """
+        Direct counterparties of `address` in either direction, with the number of transfers.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'SELECT counterparty, SUM(tx_count) FROM ('
+                'SELECT receiver AS counterparty, tx_count FROM edges WHERE sender = ? '
+                'UNION ALL SELECT sender AS counterparty, tx_count FROM edges WHERE receiver = ?'
+                ') GROUP BY counterparty ORDER BY SUM(tx_count) DESC',
+                (address, address))
+            return cursor.fetchall()
+
+    def stats(self):
+        with self._connect() as conn:
+            return {
+                'edges': conn.execute('SELECT COUNT(*) FROM edges').fetchone()[0],
+                'wallets': conn.execute('SELECT COUNT(*) FROM nodes').fetchone()[0],
+                'components': conn.execute('SELECT COUNT(*) FROM nodes WHERE parent = address').fetchone()[0],
+                'analyzed': conn.execute('SELECT COUNT(*) FROM analyzed').fetchone()[0],
+            }
+
+_default_graph = None
+_default_graph_lock = threading.Lock()
+
+def get_wallet_graph():
+    global _default_graph
+    with _default_graph_lock:
+        if _default_graph is None:
+            _default_graph = WalletGraph()
+        return _default_graph
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from src import http_client
+
+
+class FakeHelius:
+    """
+    Transport answering getSignaturesForAddress and v0/transactions like the Helius endpoints:
+    `signatures` maps an address to its signatures (newest first), `transactions` maps a
+    signature to its parsed transaction (a bare one by default).  Signatures end in a number,
+    lower for newer ones.
+    """
+    def __init__(self):
+        self.signatures = {}
+        self.transactions = {}
+        self.v0_latency = 0
+
+    @staticmethod
+    def slot(signature):
+        return 10**6 - int(signature.lstrip('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'))
+
+    def send(self, provider, session, method, url, kwargs):
+        body = json.loads(kwargs['data'])
+        if 'method' in body:
+            address, options = body['params']
+            signatures = self.signatures.get(address, [])
+            start = signatures.index(options['before']) + 1 if 'before' in options else 0
+            page = signatures[start:start + options['limit']]
+            if options.get('until') in page:
+                page = page[:page.index(options['until'])]
+            out = {'result': [{'signature': s, 'slot': self.slot(s), 'blockTime': 0} for s in page]}
+        else:
+            time.sleep(self.v0_latency)
+            out = [self.transactions.get(s, {'signature': s, 'slot': self.slot(s), 'timestamp': 0})
+                   for s in body['transactions']]
+
+        return json_response(method, url, kwargs, out)
+
+
+def json_response(method, url, kwargs, out, status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps(out).encode('utf-8')
+    response._content_consumed = True
+    response.request = requests.Request(method, url, data=kwargs.get('data'), json=kwargs.get('json')).prepare()
+    return response
+
+
+class FakeFlipside:
+    """
+    Transport answering createQueryRun and getQueryRunResults: the query 'runs' for `pending`
+    result polls (answered with `pending_message`), then serves `rows` in pages of the requested size.  `throttled` requests
+    are answered 429 first, `page_latency` maps a page number to seconds to wait before
+    answering it, and `with_page_count=False` leaves out the page metadata.  Every result
+    request is recorded in `requested_pages`.
+    """
+    def __init__(self, rows=(), pending=0):
+        self.rows = list(rows)
+        self.pending = pending
+        self.throttled = 0
+        self.page_latency = {}
+        self.with_page_count = True
+        self.pending_message = 'QueryRun is not yet completed'
+        self.requested_pages = []
+        self.lock = threading.Lock()
+
+    def send(self, provider, session, method, url, kwargs):
+        body = kwargs['json'] if 'json' in kwargs else json.loads(kwargs['data'])
+        with self.lock:
+            if self.throttled:
+                self.throttled -= 1
+                return json_response(method, url, kwargs, {}, status_code=429, headers={'Retry-After': '0'})
+        if body['method'] == 'createQueryRun':
+            return json_response(method, url, kwargs, {'result': {'queryRun': {'id': 'run-1'}}})
+
+        page = body['params'][0]['page']
+        with self.lock:
+            self.requested_pages.append(page['number'])
+            if self.pending:
+                self.pending -= 1
+                return json_response(method, url, kwargs, {'error': {'message': self.pending_message}})
+        time.sleep(self.page_latency.get(page['number'], 0))
+        start = (page['number'] - 1) * page['size']
+        result = {'rows': self.rows[start:start + page['size']]}
+        if self.with_page_count:
+            result['page'] = {'totalPages': max(-(-len(self.rows) // page['size']), 1)}
+        return json_response(method, url, kwargs, {'result': result})
+
+
+@pytest.fixture
+def flipside(monkeypatch):
+    fake = FakeFlipside()
+    # The fake answers instantly; do not pace it at the real Flipside rate
+    monkeypatch.setitem(http_client._buckets, 'flipside', http_client.TokenBucket(1000, 1000))
+    previous = http_client.get_transport()
+    http_client.set_transport(fake)
+    yield fake
+    http_client.set_transport(previous)
+
+
+@pytest.fixture
+def helius():
+    fake = FakeHelius()
+    previous = http_client.get_transport()
+    http_client.set_transport(fake)
+    yield fake
+    http_client.set_transport(previous)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from src.columnar import decode_frame, decode_value, encode_frame, encode_value
+
+
+def roundtrip(df):
+    return decode_frame(encode_frame(df))
+
+
+def test_roundtrip_keeps_values_and_dtypes():
+    df = pd.DataFrame({
+        'signature': ['a', 'b', 'a', 'c'],
+        'amount': [1.5, np.nan, 3.0, 4.25],
+        'slot': np.arange(4, dtype=np.int64),
+        'success': [True, False, True, True],
+        'time': pd.to_datetime([1, 2, 3, 4], unit='s'),
+        'time_utc': pd.to_datetime([1, 2, 3, 4], unit='s', utc=True),
+        'type': pd.Categorical(['SWAP', 'TRANSFER', 'SWAP', 'SWAP']),
+    })
+    pd.testing.assert_frame_equal(roundtrip(df), df)
+
+
+def test_missing_strings_decode_as_missing_not_none():
+    df = pd.DataFrame({'mint': ['So1', np.nan, 'EPj', np.nan]})
+    out = roundtrip(df)
+    pd.testing.assert_frame_equal(out, df)
+    assert out['mint'].isna().tolist() == [False, True, False, True]
+
+    objects = pd.DataFrame({'label': pd.Series(['x', np.nan, 'x'], dtype=object)})
+    out = roundtrip(objects)
+    pd.testing.assert_frame_equal(out, objects)
+    assert out['label'].iloc[1] is not None and np.isnan(out['label'].iloc[1])
+
+
+def test_missing_none_in_object_column_stays_none():
+    df = pd.DataFrame({'label': pd.Series([None, 'x', None], dtype=object)})
+    out = roundtrip(df)
+    pd.testing.assert_frame_equal(out, df)
+    assert out['label'].iloc[0] is None
+
+
+def test_unhashable_objects_and_non_range_index():
+    df = pd.DataFrame({'accounts': [['a', 'b'], [], ['c']]}, index=[10, 20, 30])
+    pd.testing.assert_frame_equal(roundtrip(df), df)
+
+
+def test_empty_frames():
+    assert roundtrip(pd.DataFrame(index=range(3))).shape == (3, 0)
+    df = pd.DataFrame({'signature': pd.Series([], dtype=object), 'amount': pd.Series([], dtype=float)})
+    pd.testing.assert_frame_equal(roundtrip(df), df)
+
+
+def test_encode_value_handles_tuples_of_frames():
+    df = pd.DataFrame({'a': ['x', 'y']})
+    first, second, raw = decode_value(encode_value((df, df.iloc[:1], {'n': 1})))
+    pd.testing.assert_frame_equal(first, df)
+    pd.testing.assert_frame_equal(second, df.iloc[:1])
+    assert raw == {'n': 1}
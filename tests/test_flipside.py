@@ -0,0 +1,73 @@
+import pytest
+
+from src import data_fetching
+from src.data_fetching import flipside_api_results
+
+ROWS = [{'MINT': f'mint{i}', 'BALANCE': i} for i in range(25)]
+
+
+class Clock:
+    # Stands in for the time module in data_fetching: backoff sleeps are recorded, not waited out
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(data_fetching, 'time', clock)
+    return clock.sleeps
+
+
+def test_pending_query_is_polled_with_exponential_backoff(flipside, sleeps):
+    flipside.rows, flipside.pending = ROWS, 4
+    df = flipside_api_results('select 1', initial_delay=1, max_delay=3, page_size=100)
+    assert df.to_dict(orient='records') == ROWS
+    assert sleeps == [1, 2, 3, 3]
+    assert flipside.requested_pages == [1] * 5
+
+
+def test_pending_query_times_out(flipside, sleeps):
+    flipside.rows, flipside.pending = ROWS, 100
+    with pytest.raises(TimeoutError):
+        flipside_api_results('select 1', timeout=10, initial_delay=1, max_delay=4)
+    # The next wait would pass the deadline, so it gives up instead of sleeping
+    assert sleeps == [1, 2, 4]
+
+
+def test_throttled_request_is_retried(flipside, sleeps):
+    flipside.rows, flipside.throttled = ROWS, 2
+    assert len(flipside_api_results('select 1', page_size=100)) == len(ROWS)
+    assert flipside.throttled == 0
+
+
+def test_first_page_is_fetched_once_and_pages_keep_their_order(flipside):
+    flipside.rows = ROWS
+    # Later pages answer first, so completion order is the reverse of page order
+    flipside.page_latency = {2: 0.15, 3: 0.1, 4: 0.05}
+    df = flipside_api_results(query_run_id='run-1', page_size=7, page_workers=4)
+    assert df.to_dict(orient='records') == ROWS
+    assert sorted(flipside.requested_pages) == [1, 2, 3, 4]
+
+
+def test_pages_without_page_count_are_walked_until_empty(flipside):
+    flipside.rows, flipside.with_page_count = ROWS, False
+    df = flipside_api_results(query_run_id='run-1', page_size=10)
+    assert df.to_dict(orient='records') == ROWS
+    assert flipside.requested_pages == [1, 2, 3, 4]
+
+
+def test_query_error_raises(flipside, sleeps):
+    flipside.rows, flipside.pending = ROWS, 1
+    flipside.pending_message = 'Query failed: syntax error'
+    with pytest.raises(Exception, match='syntax error'):
+        flipside_api_results('select', page_size=100)
+    assert sleeps == []
@@ -0,0 +1,56 @@
+from src.entity_labeling import LabelIndex
+from src.fund_tracing import terminal_reason, trace_funds
+from src.tx_store import TxStore
+
+TARGET = 'Target1111111111111111111111111111111111111'
+BINANCE = 'Binance111111111111111111111111111111111111'
+LISTED_CEX = 'ListedCex11111111111111111111111111111111111'
+PAYER = 'Payer11111111111111111111111111111111111111'
+PAYERS_FUNDER = 'Funder1111111111111111111111111111111111111'
+
+
+def label_index(address_labels=None, cex_addresses=()):
+    return LabelIndex({k.lower(): v for k, v in (address_labels or {}).items()}, {}, {}, 0.0,
+                      frozenset(a.lower() for a in cex_addresses))
+
+
+def native_transfer(signature, sender, receiver):
+    return {'signature': signature, 'slot': 1, 'timestamp': 0,
+            'nativeTransfers': [{'fromUserAccount': sender, 'toUserAccount': receiver, 'amount': 10**9}]}
+
+
+def test_terminal_reason_covers_cex_labels_and_the_cex_set():
+    assert terminal_reason(BINANCE, 'Binance Hot Wallet 3', 'Other', frozenset()) == 'cex'
+    assert terminal_reason(BINANCE, 'Coinbase Hot Wallet', 'Exchange', frozenset()) == 'cex'
+    assert terminal_reason(LISTED_CEX, None, None, frozenset({LISTED_CEX.lower()})) == 'cex'
+    assert terminal_reason(PAYER, 'Allbridge Core', 'Bridge', frozenset()) == 'label'
+    assert terminal_reason(PAYER, 'Treasury', 'Other', frozenset()) is None
+
+
+def test_trace_stops_at_centralized_exchanges(tmp_path, helius):
+    for i, sender in enumerate([BINANCE, LISTED_CEX, PAYER]):
+        helius.signatures.setdefault(TARGET, []).append(f'tx{i}')
+        helius.transactions[f'tx{i}'] = native_transfer(f'tx{i}', sender, TARGET)
+    for wallet in (BINANCE, LISTED_CEX, PAYER):
+        helius.signatures[wallet] = [f'up{wallet[:3]}1']
+        helius.transactions[f'up{wallet[:3]}1'] = native_transfer(f'up{wallet[:3]}1', PAYERS_FUNDER, wallet)
+
+    trace = trace_funds(TARGET, 'key', max_hops=2, direction='upstream', store=TxStore(str(tmp_path / 'tx.db')),
+                        label_index=label_index({BINANCE: 'Binance Hot Wallet 3'}, [LISTED_CEX]))
+
+    nodes = {node['address']: node for node in trace['nodes']}
+    assert nodes[BINANCE]['stopped'] == 'cex' and nodes[LISTED_CEX]['stopped'] == 'cex'
+    assert nodes[PAYER]['stopped'] is None
+    # Only the unlabeled payer was expanded at hop 2
+    assert [edge['receiver'] for edge in trace['edges'] if edge['hop'] == 2] == [PAYER]
+
+
+def test_time_budget_is_checked_between_hydration_batches(tmp_path, helius):
+    helius.signatures[TARGET] = [f'sig{i:05d}' for i in range(300)]
+    helius.v0_latency = 0.3
+
+    trace = trace_funds(TARGET, 'key', max_hops=3, max_pages=3, time_budget=0.1, concurrency=1,
+                        store=TxStore(str(tmp_path / 'tx.db')), label_index=label_index())
+
+    assert trace['stats']['truncated'] == 'time'
+    assert trace['stats']['hydrated'] == 100
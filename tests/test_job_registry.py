@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+import app
+from src import job_registry
+from src.job_registry import DEFAULT_JOB_SECONDS, JobRegistry, QueueFull
+
+
+def wait_finished(registry, job, timeout=5):
+    with registry.changed:
+        registry.changed.wait_for(lambda: job.state in ('done', 'failed'), timeout)
+    assert job.state in ('done', 'failed')
+
+
+def test_finished_jobs_drop_result_payloads_from_their_events():
+    registry = JobRegistry(max_workers=1)
+    release = threading.Event()
+
+    def run(job_id):
+        registry.publish(job_id, 'progress', {'pages': 1})
+        registry.publish(job_id, 'stage', {'stage': 'wallet_analysis', 'status': 'done', 'result': {'big': [0] * 1000}})
+        release.wait(5)
+
+    job, _ = registry.submit('job', run, 'job')
+    with registry.changed:
+        registry.changed.wait_for(lambda: len(job.events) == 2, 5)
+    # While the job runs, streaming clients get the partial result
+    assert job.events[1][1]['result'] == {'big': [0] * 1000}
+
+    release.set()
+    wait_finished(registry, job)
+    events, finished = registry.wait_events(job)
+    assert finished
+    assert events == [('progress', {'pages': 1}),
+                      ('stage', {'stage': 'wallet_analysis', 'status': 'done'}),
+                      ('done', {'job_id': 'job', 'error': None})]
+
+
+def blocked_registry(queue_limits=None):
+    # One worker, held by a blocker job until the returned event is set
+    registry = JobRegistry(max_workers=1, queue_limits=queue_limits)
+    started, release = threading.Event(), threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    registry.submit('blocker', blocker)
+    assert started.wait(5)
+    return registry, release
+
+
+def test_identical_submission_joins_the_queued_job():
+    registry, release = blocked_registry()
+    runs = []
+    job, created = registry.submit('wallet', runs.append, 'first')
+    again, created_again = registry.submit('wallet', runs.append, 'second')
+    assert created and not created_again
+    assert again is job and job.submissions == 2
+
+    release.set()
+    wait_finished(registry, job)
+    assert runs == ['first']
+
+    # Once finished, the same job_id starts a new run
+    rerun, created = registry.submit('wallet', runs.append, 'third')
+    assert created and rerun is not job
+    wait_finished(registry, rerun)
+    assert runs == ['first', 'third']
+
+
+def test_full_lane_raises_queue_full_with_retry_after():
+    registry, release = blocked_registry({'interactive': 1, 'batch': 2})
+    registry.submit('a', lambda: None)
+    with pytest.raises(QueueFull) as raised:
+        registry.submit('b', lambda: None)
+    assert raised.value.priority == 'interactive'
+    # One job ahead of it on one worker, at the default job duration
+    assert raised.value.retry_after == DEFAULT_JOB_SECONDS
+
+    # The batch lane has its own limit; its estimate counts the interactive jobs that run first
+    registry.submit('c', lambda: None, priority='batch')
+    registry.submit('d', lambda: None, priority='batch')
+    with pytest.raises(QueueFull) as raised:
+        registry.submit('e', lambda: None, priority='batch')
+    assert raised.value.retry_after == 3 * DEFAULT_JOB_SECONDS
+    release.set()
+
+
+def test_interactive_jobs_run_before_queued_batch_jobs():
+    registry, release = blocked_registry()
+    order = []
+    jobs = [registry.submit(name, order.append, name, priority=priority)[0]
+            for name, priority in [('batch-1', 'batch'), ('batch-2', 'batch'), ('interactive-1', 'interactive'),
+                                   ('interactive-2', 'interactive')]]
+    assert registry.stats()['queued'] == {'interactive': 2, 'batch': 2}
+
+    release.set()
+    for job in jobs:
+        wait_finished(registry, job)
+    assert order == ['interactive-1', 'interactive-2', 'batch-1', 'batch-2']
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        JobRegistry(max_workers=0).submit('job', lambda: None, priority='urgent')
+
+
+def test_full_lane_is_answered_429_with_retry_after(monkeypatch):
+    monkeypatch.setitem(job_registry.JOB_QUEUE_LIMITS, 'batch', 0)
+    client = app.create_app().test_client()
+    response = client.post('/api/analyze_address', json={'address': 'QueueFullTestWallet', 'priority': 'batch'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(response.get_json()['retry_after'])
+    assert int(response.headers['Retry-After']) >= 1
@@ -0,0 +1,95 @@
+import contextlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.pipeline import Stage, StageError, run_stages
+from src.profiling import JobProfile, parse_profile_flag
+
+
+def test_timed_out_stage_is_not_retried_while_still_running():
+    running = []
+    active = threading.Semaphore(1)
+    release = threading.Event()
+
+    def slow():
+        assert active.acquire(blocking=False), 'two attempts ran at once'
+        running.append(1)
+        release.wait(5)
+        active.release()
+
+    with pytest.raises(StageError) as raised:
+        run_stages([Stage('slow', slow, retries=2, retry_delay=0.05, timeout=0.05)])
+    release.set()
+
+    assert len(running) == 1
+    entry, = raised.value.timeline
+    assert entry['status'] == 'failed' and entry['attempts'] == 1
+
+
+def test_timed_out_stage_is_retried_once_its_attempt_exits():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+        return 'ok'
+
+    results, timeline = run_stages([Stage('flaky', flaky, retries=1, retry_delay=1, timeout=0.05)])
+    assert results['flaky'] == 'ok'
+    assert timeline[0]['attempts'] == 2
+
+
+def busy_then_fail():
+    sum(range(10000))
+    raise ValueError('boom')
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_profile_keeps_stats_of_failed_attempts(use_processes):
+    profiler = JobProfile()
+    stages = [Stage('fails', busy_then_fail, retries=1, retry_delay=0, cpu=True)]
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(ProcessPoolExecutor(1)) if use_processes else None
+        with pytest.raises(StageError):
+            run_stages(stages, process_pool=pool, profiler=profiler)
+
+    # Both attempts raised, and both show up in the job profile
+    calls = sum(calls for (_, _, name), (_, calls, *_) in profiler.stats.stats.items() if name == 'busy_then_fail')
+    assert calls == 2
+
+
+def test_failed_optional_stage_does_not_fail_the_run():
+    def broken(value):
+        raise RuntimeError('graph store locked')
+
+    results, timeline = run_stages([
+        Stage('value', lambda: 1),
+        Stage('side_step', broken, deps=['value'], retries=1, retry_delay=0, optional=True),
+        Stage('doubled', lambda value: value * 2, deps=['value']),
+    ])
+    assert results == {'value': 1, 'doubled': 2}
+    side_step, = [entry for entry in timeline if entry['stage'] == 'side_step']
+    assert side_step['status'] == 'failed' and side_step['attempts'] == 2
+
+
+def test_stages_cannot_depend_on_optional_stages():
+    with pytest.raises(ValueError, match='optional'):
+        run_stages([Stage('side_step', lambda: 1, optional=True),
+                    Stage('next', lambda side_step: 2, deps=['side_step'])])
+
+
+@pytest.mark.parametrize('value, expected', [(True, True), (False, False), ('false', False), ('0', False),
+                                             ('False', False), ('', False), (0, False), ('true', True),
+                                             ('1', True), (1, True)])
+def test_profile_flag_parses_strings_explicitly(value, expected):
+    assert parse_profile_flag(value) is expected
+
+
+@pytest.mark.parametrize('value', ['maybe', 2, None, [], {'on': True}])
+def test_profile_flag_rejects_other_values(value):
+    with pytest.raises(ValueError):
+        parse_profile_flag(value)
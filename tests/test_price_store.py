@@ -0,0 +1,68 @@
+import threading
+
+import pandas as pd
+
+from src.price_store import GapCoalescer, PriceStore, contiguous_ranges, group_gaps, merge_ranges
+
+SOL = 'So11111111111111111111111111111111111111112'
+USDC = 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v'
+NEW = 'NewToken11111111111111111111111111111111111'
+
+
+def test_gaps_of_an_empty_store_cover_the_whole_range(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    assert store.gaps([SOL], '2024-01-01', '2024-01-05') == {SOL: [('2024-01-01', '2024-01-05')]}
+
+
+def test_gaps_skip_covered_days(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    store.mark_covered([SOL, USDC], '2024-01-01', '2024-01-10', today='2024-02-01')
+    store.mark_covered([SOL], '2024-01-12', '2024-01-13', today='2024-02-01')
+
+    assert store.gaps([SOL, USDC], '2024-01-01', '2024-01-15') == {
+        SOL: [('2024-01-10', '2024-01-12'), ('2024-01-13', '2024-01-15')],
+        USDC: [('2024-01-10', '2024-01-15')],
+    }
+    assert store.gaps([SOL], '2024-01-02', '2024-01-09') == {}
+
+
+def test_today_is_never_covered(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    store.mark_covered([SOL], '2024-01-01', '2024-01-04', today='2024-01-03')
+    assert store.gaps([SOL], '2024-01-01', '2024-01-04') == {SOL: [('2024-01-03', '2024-01-04')]}
+
+
+def test_put_and_read_round_trip(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    store.put(pd.DataFrame({'dt': ['2024-01-01', '2024-01-02'], 'symbol': ['USDC', 'USDC'],
+                            'token_address': [USDC, USDC], 'price': [1.0, 0.99]}))
+    prices = store.read([USDC], '2024-01-01', '2024-01-03')
+    assert prices['price'].tolist() == [1.0, 0.99]
+    assert prices['dt'].dt.strftime('%Y-%m-%d').tolist() == ['2024-01-01', '2024-01-02']
+
+
+def test_contiguous_and_merged_ranges():
+    assert contiguous_ranges(['2024-01-01', '2024-01-02', '2024-01-05']) == [
+        ('2024-01-01', '2024-01-03'), ('2024-01-05', '2024-01-06')]
+    assert merge_ranges([('2024-01-05', '2024-01-08'), ('2024-01-01', '2024-01-03'), ('2024-01-03', '2024-01-06')]) == [
+        ('2024-01-01', '2024-01-08')]
+
+
+def test_group_gaps_does_not_widen_short_gaps():
+    today = ('2024-06-01', '2024-06-02')
+    gaps = {SOL: [today], USDC: [today], NEW: [('2022-01-01', '2024-06-02')]}
+    assert group_gaps(gaps) == [('2022-01-01', '2024-06-02', [NEW]), ('2024-06-01', '2024-06-02', sorted([SOL, USDC]))]
+
+
+def test_coalescer_merges_concurrent_requests_per_range():
+    calls = []
+    coalescer = GapCoalescer(lambda tokens, start, end: calls.append((tokens, start, end)), window=0.2)
+    requests = [{SOL: [('2024-06-01', '2024-06-02')]},
+                {SOL: [('2024-06-01', '2024-06-02')], NEW: [('2023-01-01', '2024-06-02')]}]
+    threads = [threading.Thread(target=coalescer.request, args=(gaps,)) for gaps in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(calls) == [([NEW], '2023-01-01', '2024-06-02'), ([SOL], '2024-06-01', '2024-06-02')]
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from src.metrics import QUERY_CACHE_EVENTS, render_metrics
+from src.query_cache import QueryCache
+
+
+def event_counts():
+    return {key[0]: value for key, value in QUERY_CACHE_EVENTS.values.items()}
+
+
+def test_hits_misses_and_evictions_are_counted_and_exported(tmp_path):
+    before = event_counts()
+    cache = QueryCache(str(tmp_path))
+    df = pd.DataFrame({'MINT': ['a', 'b'], 'BALANCE': [1.0, 2.0]})
+
+    assert cache.get('select 1') is None
+    cache.put('select 1', df)
+    pd.testing.assert_frame_equal(cache.get('select 1'), df)
+
+    # Room for one result on disk: the next put evicts the least recently used one
+    (first,) = tmp_path.iterdir()
+    os.utime(first, (0, 0))
+    cache.max_bytes = first.stat().st_size
+    cache.put('select 2', df)
+    assert cache.get('select 1') is None
+    pd.testing.assert_frame_equal(QueryCache(str(tmp_path)).get('select 2'), df)
+
+    assert cache.stats() == {'memory_hits': 1, 'disk_hits': 0, 'misses': 2, 'expired': 0, 'evictions': 1,
+                             'hot_entries': 1, 'hits': 1}
+    after = event_counts()
+    delta = {event: after[event] - before.get(event, 0) for event in after if after[event] != before.get(event, 0)}
+    assert delta == {'memory_hits': 1, 'disk_hits': 1, 'misses': 2, 'evictions': 1}
+
+    rendered = render_metrics()
+    assert '# TYPE query_cache_events_total counter' in rendered
+    assert f'query_cache_events_total{{event="evictions"}} {after["evictions"]}' in rendered
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import app
+from src import result_store
+from src.result_store import ResultStore, etag_for
+
+
+def test_put_writes_gzip_and_reads_back(tmp_path):
+    store = ResultStore(str(tmp_path))
+    body, etag = store.put('job', {'wallet_analysis': {'n': 1}, 'tx_graph': []})
+    assert json.loads(body) == {'wallet_analysis': {'n': 1}, 'tx_graph': []}
+    assert etag == etag_for(body)
+    assert os.listdir(tmp_path) == ['job.json.gz']
+    assert gzip.decompress((tmp_path / 'job.json.gz').read_bytes()) == body
+
+    # A fresh store (e.g. after a restart) reads it from disk with the same ETag
+    assert ResultStore(str(tmp_path)).get('job') == (body, etag)
+    assert store.get('missing') is None
+
+
+def test_failed_write_keeps_the_previous_result(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    old = store.put('job', {'version': 1})
+
+    def crash(*args):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(result_store.os, 'replace', crash)
+    with pytest.raises(OSError):
+        store.put('job', {'version': 2})
+    monkeypatch.undo()
+
+    # No partial file is left behind, and the last complete result is still served
+    assert os.listdir(tmp_path) == ['job.json.gz']
+    assert ResultStore(str(tmp_path)).get('job') == old
+
+
+def test_legacy_plain_json_results_still_load(tmp_path):
+    (tmp_path / 'old.json').write_bytes(b'{"tx_graph": []}')
+    body, etag = ResultStore(str(tmp_path)).get('old')
+    assert body == b'{"tx_graph": []}' and etag == etag_for(body)
+
+
+def test_memory_tier_evicts_least_recently_used_by_bytes(tmp_path):
+    one = len(json.dumps({'pad': 'x' * 100}))
+    store = ResultStore(str(tmp_path), max_bytes=2 * one)
+    for job_id in 'ab':
+        store.put(job_id, {'pad': 'x' * 100})
+    store.get('a')  # a is now the most recently used
+    store.put('c', {'pad': 'x' * 100})
+    assert list(store.hot) == ['a', 'c']
+    assert store.stats() == {'hot_entries': 2, 'hot_bytes': 2 * one}
+
+    # Evicted results still come from disk, and a result larger than the budget is never held
+    assert store.get('b') is not None and list(store.hot) == ['c', 'b']
+    store.put('big', {'pad': 'x' * 1000})
+    assert 'big' not in store.hot and store.stats()['hot_bytes'] == 2 * one
+    assert json.loads(store.get('big')[0]) == {'pad': 'x' * 1000}
+
+
+def test_replacing_a_result_updates_the_byte_count(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.put('job', {'pad': 'x' * 100})
+    body, _ = store.put('job', {'pad': 'y'})
+    assert store.stats() == {'hot_entries': 1, 'hot_bytes': len(body)}
+
+
+def test_clear_removes_memory_and_files(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.put('a', {'n': 1})
+    (tmp_path / 'legacy.json').write_text('{}')
+    (tmp_path / 'notes.txt').write_text('kept')
+    assert sorted(store.clear()) == ['a.json.gz', 'legacy.json']
+    assert store.stats() == {'hot_entries': 0, 'hot_bytes': 0}
+    assert store.get('a') is None
+    assert os.listdir(tmp_path) == ['notes.txt']
+
+
+def test_get_results_answers_304_for_a_matching_etag(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    monkeypatch.setattr(result_store, '_default_store', store)
+    body, etag = store.put('wallet', {'tx_graph': [1, 2]})
+    client = app.create_app().test_client()
+
+    response = client.get('/api/get_results?job_id=wallet')
+    assert response.status_code == 200 and response.data == body
+    assert response.headers['ETag'] == f'"{etag}"'
+
+    response = client.get('/api/get_results?job_id=wallet', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == f'"{etag}"'
+
+    response = client.get('/api/get_results?job_id=wallet', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200 and response.data == body
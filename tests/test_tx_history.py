@@ -0,0 +1,59 @@
+import pickle
+
+import pytest
+
+from src.data_processing import get_comprehensive_tx_history
+from src.tx_store import TxStore
+
+WALLET = 'Wa11et111111111111111111111111111111111111'
+
+
+def history(store):
+    return [tx['signature'] for tx in store.address_history(WALLET)]
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_paging_cap_leaves_a_gap_that_later_runs_fill(tmp_path, helius, pipelined):
+    store = TxStore(str(tmp_path / 'tx.db'))
+
+    def run(max_pages):
+        get_comprehensive_tx_history(WALLET, 'key', use_cache=False, pipelined=pipelined, store=store,
+                                     max_pages=max_pages)
+
+    # sig00000 is the newest signature; the wallet starts with 150 and then receives 250 more
+    helius.signatures[WALLET] = [f'sig{i:05d}' for i in range(250, 400)]
+    run(max_pages=5)
+    assert history(store) == helius.signatures[WALLET]
+    assert store.signature_gaps(WALLET) == []
+
+    helius.signatures[WALLET] = [f'sig{i:05d}' for i in range(400)]
+    run(max_pages=1)
+    assert history(store) == helius.signatures[WALLET][:100] + helius.signatures[WALLET][250:]
+    assert store.signature_gaps(WALLET) == [('sig00099', 'sig00250')]
+    assert store.get_watermark(WALLET) == 'sig00000'
+
+    run(max_pages=1)
+    assert store.signature_gaps(WALLET) == [('sig00199', 'sig00250')]
+    run(max_pages=1)
+    run(max_pages=1)
+    assert history(store) == helius.signatures[WALLET]
+    assert store.signature_gaps(WALLET) == []
+
+
+def test_first_run_cap_records_no_gap(tmp_path, helius):
+    store = TxStore(str(tmp_path / 'tx.db'))
+    helius.signatures[WALLET] = [f'sig{i:05d}' for i in range(300)]
+    get_comprehensive_tx_history(WALLET, 'key', use_cache=False, store=store, max_pages=2)
+    assert history(store) == helius.signatures[WALLET][:200]
+    assert store.signature_gaps(WALLET) == []
+
+
+def test_address_history_rereads_and_pickles(tmp_path, helius):
+    store = TxStore(str(tmp_path / 'tx.db'))
+    helius.signatures[WALLET] = [f'sig{i:05d}' for i in range(250)]
+    get_comprehensive_tx_history(WALLET, 'key', use_cache=False, store=store)
+
+    hist = store.address_history(WALLET, fields={'signature': None})
+    assert len(hist) == 250
+    assert list(hist) == list(hist) == [{'signature': s} for s in helius.signatures[WALLET]]
+    assert list(pickle.loads(pickle.dumps(hist))) == list(hist)
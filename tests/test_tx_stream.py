@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from src.tx_stream import NotJSONArray, iter_json_array, stream_transactions, trim_transaction
+
+ITEMS = [
+    {'signature': 'a', 'amount': 12345.678, 'memo': 'naïve ☃ 🚀', 'nested': {'list': [1, 2, [3]], 'ok': True}},
+    -42,
+    1e-7,
+    'plain "quoted" string\\n',
+    None,
+    [],
+    {},
+]
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1 << 16])
+def test_any_chunking_decodes_the_same_elements(size):
+    body = json.dumps(ITEMS, ensure_ascii=False).encode('utf-8')
+    assert list(iter_json_array(chunked(body, size))) == ITEMS
+
+
+def test_multibyte_characters_split_across_chunks():
+    body = json.dumps(['🚀☃'], ensure_ascii=False).encode('utf-8')
+    # Split inside every multi-byte sequence
+    for cut in range(1, len(body)):
+        assert list(iter_json_array([body[:cut], body[cut:]])) == ['🚀☃']
+
+
+def test_numbers_split_across_chunks_are_not_cut_short():
+    assert list(iter_json_array([b'[12', b'34, 5', b'6.', b'7e', b'2]'])) == [1234, 5670.0]
+    assert list(iter_json_array([b'[1', b'2', b'3', b']'])) == [123]
+
+
+@pytest.mark.parametrize('body', [b'[]', b'  [ ]  ', b'\n[\n]\n'])
+def test_empty_array(body):
+    assert list(iter_json_array(chunked(body, 1))) == []
+
+
+def test_whitespace_between_elements():
+    assert list(iter_json_array([b' [ 1 ,\n 2 ,\t{"a" : 3} ] '])) == [1, 2, {'a': 3}]
+
+
+@pytest.mark.parametrize('value', [{'error': 'rate limited'}, 'text', 7, None])
+def test_non_array_body_raises_with_the_value(value):
+    body = json.dumps(value).encode('utf-8')
+    with pytest.raises(NotJSONArray) as raised:
+        list(iter_json_array(chunked(body, 3)))
+    assert raised.value.value == value
+    assert isinstance(raised.value, ValueError)
+
+
+@pytest.mark.parametrize('body', [b'', b'[', b'[1,', b'[1, 2', b'[{"a": 1}', b'[{"a": ', b'["abc'])
+def test_truncated_body_raises(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(body, 2)))
+
+
+@pytest.mark.parametrize('body', [b'[1 2]', b'[1,,2]', b'[1];', b'[1]]', b'[{"a" 1}]', b'[tru]', b'[,]'])
+def test_malformed_body_raises(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(body, 2)))
+
+
+def test_keep_text_yields_each_element_source():
+    body = b'[{"a": 1,  "b": [2]}, 3.50, "x"]'
+    items = list(iter_json_array(chunked(body, 4), keep_text=True))
+    assert items == [({'a': 1, 'b': [2]}, '{"a": 1,  "b": [2]}'), (3.5, '3.50'), ('x', '"x"')]
+
+
+def test_large_element_spanning_many_chunks():
+    big = {'signature': 's', 'instructions': [{'data': 'x' * 1000, 'accounts': [str(i)] * 10} for i in range(200)]}
+    body = json.dumps([big, big]).encode('utf-8')
+    assert list(iter_json_array(chunked(body, 100))) == [big, big]
+
+
+def test_stream_transactions_trims_and_keeps_raw():
+    tx = {
+        'signature': 'sig1', 'timestamp': 1, 'slot': 2, 'fee': 5000, 'type': 'TRANSFER', 'source': 'SYSTEM_PROGRAM',
+        'description': 'dropped', 'transactionError': None,
+        'nativeTransfers': [{'fromUserAccount': 'a', 'toUserAccount': 'b', 'amount': 3, 'extra': 1}],
+        'accountData': [{'account': 'a', 'nativeBalanceChange': -3, 'tokenBalanceChanges': [{'mint': 'm'}]}],
+        'instructions': [{'accounts': ['a'], 'programId': 'p', 'data': 'dropped', 'innerInstructions': []}],
+        'events': {'compressed': [{'type': 'MINT', 'newLeafOwner': 'a', 'treeDelegate': 'd', 'assetId': 'x',
+                                   'metadata': {'name': 'n', 'symbol': 's'}}]},
+    }
+    body = json.dumps([tx, {'no_signature': True}]).encode('utf-8')
+    raw = []
+    trimmed = list(stream_transactions(chunked(body, 16), raw=raw))
+
+    assert trimmed == [trim_transaction(tx), {}]
+    assert 'description' not in trimmed[0] and 'data' not in trimmed[0]['instructions'][0]
+    assert trimmed[0]['nativeTransfers'] == [{'fromUserAccount': 'a', 'toUserAccount': 'b', 'amount': 3}]
+    assert trimmed[0]['events'] == {'compressed': [{'type': 'MINT', 'newLeafOwner': 'a', 'treeDelegate': 'd',
+                                                    'metadata': {'name': 'n'}}]}
+    # Only transactions with a signature are kept for audit, as the exact bytes received
+    assert [signature for signature, _ in raw] == ['sig1']
+    assert json.loads(raw[0][1]) == tx
+
+    assert list(stream_transactions([body])) == trimmed
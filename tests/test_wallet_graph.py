@@ -0,0 +1,86 @@
+import random
+import sqlite3
+
+import pandas as pd
+
+from src.wallet_graph import SCHEMA, WalletGraph, _UnionFind
+
+
+def transfers(*pairs, start=0):
+    return pd.DataFrame({
+        'signature': [f'sig{start + i}' for i in range(len(pairs))],
+        'sender': [s for s, _ in pairs],
+        'receiver': [r for _, r in pairs],
+        'timestamp': pd.to_datetime([1_700_000_000 + start + i for i in range(len(pairs))], unit='s'),
+    })
+
+
+def components(pairs):
+    # Reference connected components by repeated relabelling
+    label = {}
+    for a, b in pairs:
+        label.setdefault(a, a)
+        label.setdefault(b, b)
+    changed = True
+    while changed:
+        changed = False
+        for a, b in pairs:
+            low = min(label[a], label[b])
+            for node in (a, b):
+                if label[node] != low:
+                    label[node], changed = low, True
+    return label
+
+
+def test_union_find_persists_across_transactions(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'graph.db', isolation_level=None)
+    conn.executescript(SCHEMA)
+    first = _UnionFind(conn)
+    first.union('a', 'b')
+    first.union('c', 'd')
+    first.flush()
+
+    second = _UnionFind(conn)
+    assert second.find('a') == second.find('b') != second.find('c')
+    second.union('b', 'd')
+    second.flush()
+
+    third = _UnionFind(conn)
+    assert len({third.find(node) for node in 'abcd'}) == 1
+    assert conn.execute('SELECT size FROM nodes WHERE parent = address').fetchall() == [(4,)]
+
+
+def test_components_merge_across_jobs(tmp_path):
+    graph = WalletGraph(str(tmp_path / 'graph.db'))
+    assert graph.merge_transactions('A', transfers(('A', 'X'))) == 1
+    assert graph.merge_transactions('B', transfers(('Y', 'B'), start=10)) == 1
+    assert graph.cluster_peers('A') == []
+    assert graph.stats()['components'] == 2
+
+    # A later job links the two clusters through X and Y; both earlier wallets follow the new root
+    assert graph.merge_transactions('C', transfers(('X', 'C'), ('C', 'Y'), start=20)) == 2
+    assert graph.cluster_peers('A') == ['B', 'C']
+    assert graph.cluster_peers('B') == ['A', 'C']
+    assert graph.stats() == {'edges': 4, 'wallets': 5, 'components': 1, 'analyzed': 3}
+
+    # Re-merging the same transactions from the counterparty's job adds nothing
+    assert graph.merge_transactions('X', transfers(('A', 'X'))) == 0
+    assert sorted(graph.neighbors('X')) == [('A', 1), ('C', 1)]
+
+
+def test_random_jobs_match_reference_components(tmp_path):
+    rng = random.Random(7)
+    graph = WalletGraph(str(tmp_path / 'graph.db'))
+    wallets = [f'w{i}' for i in range(60)]
+    seen = []
+    for job in range(25):
+        pairs = [tuple(rng.sample(wallets, 2)) for _ in range(rng.randint(1, 4))]
+        graph.merge_transactions(pairs[0][0], transfers(*pairs, start=job * 10))
+        seen.extend(pairs)
+
+    label = components(seen)
+    roots = {node: graph.component_root(node) for node in label}
+    for a in label:
+        for b in label:
+            assert (roots[a] == roots[b]) == (label[a] == label[b])
+    assert graph.stats()['components'] == len(set(label.values()))